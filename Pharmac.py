@@ -1,593 +1,1356 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import argparse
+import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import itertools
+import json
+import os
+import re
+import shutil
+import statistics
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
-class EssentialOilPharmacopoeiaAnalyzer:
-    def __init__(self, oil_name):
-        self.oil = oil_name
-        self.colors = ['#8B4513', '#228B22', '#FFD700', '#8A2BE2', '#FF6B6B', 
-                      '#4ECDC4', '#45B7D1', '#F9A602', '#6A0572', '#2A9D8F']
-        
-        self.start_year = 2000
-        self.end_year = 2025
-        
-        # Configuration spécifique pour chaque huile essentielle
-        self.config = self._get_oil_config()
-        
-    def _get_oil_config(self):
-        """Retourne la configuration spécifique pour chaque huile essentielle"""
-        configs = {
-            "Lavande": {
-                "production_base": 150,  # tonnes annuelles
-                "price_base": 45,  # €/kg
-                "type": "relaxante",
-                "proprietes": ["calmante", "cicatrisante", "antiseptique", "analgésique"],
-                "regions": ["France", "Bulgarie", "Chine"],
-                "rendement": 0.015  # 1.5% de rendement
-            },
-            "Menthe Poivrée": {
-                "production_base": 80,
-                "price_base": 60,
-                "type": "tonique",
-                "proprietes": ["digestive", "rafraichissante", "antalgique", "decongestionnante"],
-                "regions": ["USA", "France", "Inde"],
-                "rendement": 0.012
-            },
-            "Arbre à Thé": {
-                "production_base": 120,
-                "price_base": 35,
-                "type": "antiseptique",
-                "proprietes": ["antibacterienne", "antifongique", "antivirale", "immunostimulante"],
-                "regions": ["Australie", "Chine", "Afrique du Sud"],
-                "rendement": 0.020
-            },
-            "Eucalyptus": {
-                "production_base": 200,
-                "price_base": 25,
-                "type": "respiratoire",
-                "proprietes": ["expectorante", "decongestionnante", "antiseptique", "febrifuge"],
-                "regions": ["Australie", "Chine", "Portugal"],
-                "rendement": 0.018
-            },
-            "Ravintsara": {
-                "production_base": 40,
-                "price_base": 55,
-                "type": "immunitaire",
-                "proprietes": ["antivirale", "immunostimulante", "expectorante", "neurotonique"],
-                "regions": ["Madagascar", "Comores"],
-                "rendement": 0.008
-            },
-            "Palmarosa": {
-                "production_base": 25,
-                "price_base": 70,
-                "type": "cosmetique",
-                "proprietes": ["regenerante", "hydratante", "antibacterienne", "equilibrante"],
-                "regions": ["Inde", "Nepal", "Indonesie"],
-                "rendement": 0.006
-            },
-            "Ylang-Ylang": {
-                "production_base": 30,
-                "price_base": 85,
-                "type": "aphrodisiaque",
-                "proprietes": ["aphrodisiaque", "sedative", "hypotensive", "regulatrice"],
-                "regions": ["Madagascar", "Comores", "Mayotte"],
-                "rendement": 0.005
-            },
-            "Girofle": {
-                "production_base": 60,
-                "price_base": 40,
-                "type": "antiseptique",
-                "proprietes": ["antiseptique", "antalgique", "antiparasitaire", "stimulante"],
-                "regions": ["Madagascar", "Indonesie", "Sri Lanka"],
-                "rendement": 0.015
-            },
-            "Citron": {
-                "production_base": 180,
-                "price_base": 20,
-                "type": "detoxifiante",
-                "proprietes": ["antibacterienne", "detoxifiante", "tonique", "digestive"],
-                "regions": ["Italie", "Espagne", "USA", "Argentine"],
-                "rendement": 0.003
-            },
-            "Romarin": {
-                "production_base": 90,
-                "price_base": 38,
-                "type": "tonique",
-                "proprietes": ["tonique", "hepatique", "neurotonique", "antioxydante"],
-                "regions": ["France", "Espagne", "Maroc", "Tunisie"],
-                "rendement": 0.010
-            },
-            # Configuration par défaut
-            "default": {
-                "production_base": 50,
-                "price_base": 50,
-                "type": "polyvalente",
-                "proprietes": ["antibacterienne", "antioxydante"],
-                "regions": ["Divers"],
-                "rendement": 0.010
-            }
+# matplotlib n'est importé qu'au premier rendu : les exécutions « données
+# seules » (--data-only, --export, --batch --no-render) ne le chargent jamais.
+
+# Régimes de croissance de chaque métrique simulée.
+# Chaque régime (fin, ordonnee, pente, origine) s'applique jusqu'à l'année `fin`
+# incluse (None = sans limite) et donne le facteur ordonnee + pente * (annee - origine).
+# La valeur simulée vaut base * facteur * bruit, avec bruit ~ N(1, sigma).
+METRIC_SPECS = {
+    # Données de production et marché
+    'Production_Mondiale': {
+        'base': lambda c: c["production_base"],
+        'regimes': [(2005, 1, 0.08, 2000),   # Croissance forte initiale
+                    (2015, 1, 0.12, 2005),   # Expansion du marché
+                    (2020, 1, 0.15, 2015),   # Boom du naturel
+                    (None, 1, 0.10, 2020)],  # Croissance soutenue
+        'sigma': 0.10,
+    },
+    'Prix_Moyen': {
+        'base': lambda c: c["price_base"],
+        'regimes': [(2005, 1, 0.03, 2000),   # Hausse modérée
+                    (2012, 1, 0.05, 2005),   # Hausse due à la demande
+                    (2018, 1, 0.08, 2012),   # Forte hausse qualité bio
+                    (None, 1, 0.06, 2018)],  # Hausse soutenue
+        'sigma': 0.08,
+    },
+    'Demande_Mondiale': {
+        'base': lambda c: c["production_base"] * 0.9,
+        'regimes': [(2010, 1, 0.10, 2000),   # Demande croissante
+                    (2020, 1, 0.14, 2010),   # Forte croissance
+                    (None, 1, 0.12, 2020)],  # Croissance soutenue
+        'sigma': 0.12,
+    },
+    'Surface_Cultivee': {
+        'base': lambda c: c["production_base"] / c["rendement"] * 10,
+        'regimes': [(None, 1, 0.09, 2000)],
+        'sigma': 0.15,
+    },
+    # Données de qualité et composition
+    'Teneur_Principes_Actifs': {
+        'base': 85,
+        'regimes': [(2009, 1, 0, 2010),
+                    (None, 1, 0.005, 2010)],  # Amélioration lente
+        'sigma': 0.04,
+    },
+    'Pureté_Chimique': {
+        'base': 92,
+        'regimes': [(2007, 1, 0, 2008),
+                    (None, 1, 0.008, 2008)],  # Amélioration des techniques
+        'sigma': 0.03,
+    },
+    'Qualite_Bio': {
+        'base': 60,
+        'regimes': [(2014, 1, 0, 2015),
+                    (None, 1, 0.025, 2015)],  # Forte croissance du bio
+        'sigma': 0.06,
+    },
+    # Données thérapeutiques
+    'Efficacite_Therapeutique': {
+        'base': 75,
+        'regimes': [(2009, 1, 0, 2010),
+                    (None, 1, 0.012, 2010)],  # Amélioration des connaissances
+        'sigma': 0.05,
+    },
+    'Etudes_Scientifiques': {
+        'base': 1,
+        'regimes': [(2005, 5, 2, 2000),
+                    (2015, 15, 5, 2005),
+                    (None, 65, 8, 2015)],
+        'sigma': 0.20,
+    },
+    'Demande_Therapeutique': {
+        'base': 60,
+        'regimes': [(2011, 1, 0, 2012),
+                    (None, 1, 0.018, 2012)],  # Croissance forte
+        'sigma': 0.07,
+    },
+    # Applications et utilisations
+    'Usage_Aromatherapie': {
+        'base': 70,
+        'regimes': [(2007, 1, 0, 2008),
+                    (None, 1, 0.015, 2008)],
+        'sigma': 0.06,
+    },
+    'Usage_Cosmetique': {
+        'base': 65,
+        'regimes': [(2009, 1, 0, 2010),
+                    (None, 1, 0.020, 2010)],  # Forte croissance
+        'sigma': 0.08,
+    },
+    'Usage_Pharmaceutique': {
+        'base': 40,
+        'regimes': [(2014, 1, 0, 2015),
+                    (None, 1, 0.025, 2015)],  # Croissance rapide
+        'sigma': 0.10,
+    },
+    'Usage_Alimentaire': {
+        'base': 30,
+        'regimes': [(2017, 1, 0, 2018),
+                    (None, 1, 0.030, 2018)],  # Très forte croissance
+        'sigma': 0.12,
+    },
+    # Indicateurs économiques
+    'Valeur_Marche': {
+        'base': lambda c: c["production_base"] * c["price_base"] / 1000,
+        'regimes': [(None, 1, 0.11, 2000)],
+        'sigma': 0.13,
+    },
+    'Croissance_Marche': {
+        'base': 1,
+        'regimes': [(2005, 8.0, 0, 2000),
+                    (2015, 12.0, 0, 2005),
+                    (2020, 15.0, 0, 2015),
+                    (None, 11.0, 0, 2020)],
+        'sigma': 0.15,
+    },
+    'Exportations': {
+        'base': lambda c: c["production_base"] * 0.7,
+        'regimes': [(None, 1, 0.10, 2000)],
+        'sigma': 0.14,
+    },
+    # Facteurs environnementaux
+    'Impact_Environnemental': {
+        'base': 45,
+        'regimes': [(2009, 1, 0, 2010),
+                    (None, 1, -0.010, 2010)],  # Amélioration
+        'sigma': 0.08,
+    },
+    'Durabilite_Production': {
+        'base': 65,
+        'regimes': [(2011, 1, 0, 2012),
+                    (None, 1, 0.015, 2012)],
+        'sigma': 0.07,
+    },
+    'Rareté_Ressource': {
+        'base': 30,
+        'regimes': [(2014, 1, 0, 2015),
+                    (None, 1, 0.008, 2015)],  # Légère augmentation
+        'sigma': 0.10,
+    },
+}
+
+METRIC_COLUMNS = list(METRIC_SPECS)
+
+# Tendances spécifiques aux huiles essentielles par époque :
+# (première année, dernière année incluse ou None, colonne, facteur multiplicatif)
+TREND_RULES = [
+    # Début de popularité (2000-2005)
+    (2000, 2005, 'Usage_Aromatherapie', 1.2),
+    (2000, 2005, 'Etudes_Scientifiques', 1.3),
+    # Reconnaissance scientifique (2006-2010)
+    (2006, 2010, 'Etudes_Scientifiques', 1.5),
+    (2006, 2010, 'Efficacite_Therapeutique', 1.1),
+    # Boom du naturel (2011-2015)
+    (2011, 2015, 'Qualite_Bio', 1.4),
+    (2011, 2015, 'Demande_Mondiale', 1.3),
+    # Intégration pharmaceutique (2016-2020)
+    (2016, 2020, 'Usage_Pharmaceutique', 1.6),
+    (2016, 2020, 'Prix_Moyen', 1.2),
+    # Durabilité et éthique (2021-2025)
+    (2021, None, 'Durabilite_Production', 1.2),
+    (2021, None, 'Impact_Environnemental', 0.9),
+    (2021, None, 'Qualite_Bio', 1.15),
+]
+
+# Fréquence de la grille de dates simulée, parmi les codes publics de FREQUENCIES
+ANNUAL_FREQ = 'Y'
+FREQUENCIES = ('Y', 'Q', 'M', 'W', 'D')
+# Alias pandas de fin de période de chaque code ('Y', 'Q' et 'M' sont dépréciés
+# depuis pandas 2.2 au profit de 'YE', 'QE' et 'ME')
+PANDAS_FREQUENCIES = {'Y': 'YE', 'Q': 'QE', 'M': 'ME', 'W': 'W', 'D': 'D'}
+
+# Saisonnalité des grilles infra-annuelles : (amplitude, décalage en mois par
+# rapport au mois de récolte de l'huile). Le facteur saisonnier vaut
+# 1 + amplitude * cos(2π (mois - mois_recolte - décalage) / 12) et reste
+# neutre sur une grille annuelle.
+SEASONALITY = {
+    'Production_Mondiale': (0.60, 0),    # Distillation concentrée sur la récolte
+    'Prix_Moyen': (-0.10, 0),            # Prix au plus bas à la récolte
+    'Exportations': (0.30, 2),           # Expéditions après la récolte
+    'Demande_Mondiale': (0.10, 6),       # Demande hivernale
+    'Usage_Aromatherapie': (0.10, 6),
+}
+
+# Liste des huiles essentielles
+HUILES_ESSENTIELLES = [
+    "Lavande", "Menthe Poivrée", "Arbre à Thé", "Eucalyptus", "Ravintsara",
+    "Palmarosa", "Ylang-Ylang", "Girofle", "Citron", "Romarin",
+    "Tea Tree", "Géranium", "Camomille", "Sauge", "Niaouli",
+    "Basilic", "Cèdre", "Encens", "Myrrhe", "Vetiver"
+]
+
+
+def _compile_metric_table(specs):
+    """Compile les régimes de croissance en tableaux NumPy (métriques × régimes)"""
+    n_regimes = max(len(spec['regimes']) for spec in specs.values())
+    shape = (len(specs), n_regimes)
+    table = {
+        'ends': np.full(shape, np.inf),
+        'intercepts': np.zeros(shape),
+        'slopes': np.zeros(shape),
+        'anchors': np.zeros(shape),
+        'sigmas': np.array([spec['sigma'] for spec in specs.values()], dtype=float),
+    }
+    for m, spec in enumerate(specs.values()):
+        regimes = list(spec['regimes'])
+        # Compléter avec le dernier régime pour obtenir un tableau rectangulaire
+        regimes += [regimes[-1]] * (n_regimes - len(regimes))
+        for r, (end, intercept, slope, anchor) in enumerate(regimes):
+            table['ends'][m, r] = np.inf if end is None else end
+            table['intercepts'][m, r] = intercept
+            table['slopes'][m, r] = slope
+            table['anchors'][m, r] = anchor
+    return table
+
+
+METRIC_TABLE = _compile_metric_table(METRIC_SPECS)
+
+# Champs des tables de régimes propres à chaque huile calibrée (cf. OilRegistry.params)
+REGIME_FIELDS = ('ends', 'intercepts', 'slopes', 'anchors')
+
+
+def _calibrated_table(calibration):
+    """Table d'une huile calibrée : régimes et bruit du bloc "calibration", METRIC_SPECS ailleurs.
+    
+    `calibration` associe à une métrique {"regimes": [[fin, ordonnee, pente,
+    origine], ...], "sigma": σ}, au format de METRIC_SPECS (fin null = sans limite).
+    """
+    specs = {}
+    for column, spec in METRIC_SPECS.items():
+        fitted = calibration.get(column, {})
+        specs[column] = {'regimes': [tuple(regime) for regime in fitted.get('regimes', spec['regimes'])],
+                         'sigma': fitted.get('sigma', spec['sigma'])}
+    return _compile_metric_table(specs)
+
+
+def _regime_params(tables):
+    """Tables empilées par huile : huiles × métriques × régimes, et huiles × métriques pour les bruits"""
+    n_regimes = max(table['ends'].shape[1] for table in tables)
+    
+    def pad(values):
+        # Dernier régime répété, comme dans _compile_metric_table
+        return np.concatenate([values, np.repeat(values[:, -1:], n_regimes - values.shape[1], axis=1)], axis=1)
+    
+    params = {field: np.stack([pad(table[field]) for table in tables]) for field in REGIME_FIELDS}
+    params['sigmas'] = np.stack([table['sigmas'] for table in tables])
+    return params
+
+
+def _growth_curves(table, years):
+    """Évalue en une passe les facteurs de croissance de toutes les métriques (métriques × années).
+    
+    `years` est la grille commune, ou un tableau métriques × années propre à
+    chaque métrique. Avec une table empilée par huile
+    (huiles × métriques × régimes) ou des années huiles × métriques × années,
+    le résultat est huiles × métriques × années.
+    """
+    ends = table['ends']
+    years = np.asarray(years, dtype=float)
+    years = np.broadcast_to(years, np.broadcast_shapes(ends.shape[:-1] + (1,), years.shape))
+    # Indice du régime, accumulé régime par régime (mémoire de la taille du résultat)
+    floor = np.floor(years)
+    regime = np.zeros(years.shape, dtype=np.intp)
+    for r in range(ends.shape[-1]):
+        regime += floor > ends[..., r, None]
+    shape = years.shape[:-1] + ends.shape[-1:]
+    intercept = np.take_along_axis(np.broadcast_to(table['intercepts'], shape), regime, axis=-1)
+    slope = np.take_along_axis(np.broadcast_to(table['slopes'], shape), regime, axis=-1)
+    anchor = np.take_along_axis(np.broadcast_to(table['anchors'], shape), regime, axis=-1)
+    return intercept + slope * (years - anchor)
+
+
+class OilRegistry:
+    """Registre compilé des configurations d'huiles.
+    
+    Les paramètres numériques sont rangés dans un tableau structuré NumPy
+    (une ligne par huile, la dernière pour la configuration par défaut) ;
+    types, propriétés et régions sont internés dans des vocabulaires
+    partagés, les listes de chaque huile étant stockées en CSR (décalages +
+    identifiants). La recherche par nom est un accès dictionnaire O(1) et
+    `params` alimente directement les simulateurs vectorisés.
+    """
+    
+    RECORD_DTYPE = np.dtype([
+        ('production_base', 'f8'), ('price_base', 'f8'), ('rendement', 'f8'),
+        ('mois_recolte', 'i1'), ('type', 'i4'),
+    ])
+    
+    def __init__(self, configs, default):
+        # Les alias ("alias": "<nom>") partagent la ligne de l'huile visée
+        aliases = {name: config['alias'] for name, config in configs.items() if 'alias' in config}
+        self._order = list(configs)
+        configs = {name: config for name, config in configs.items() if 'alias' not in config}
+        self.aliases = aliases
+        
+        self.names = list(configs)
+        self.default_row = len(self.names)
+        self._index = {name: row for row, name in enumerate(self.names)}
+        for alias, target in aliases.items():
+            self._index[alias] = self._index[target]
+        
+        self.types = []
+        self.properties = []
+        self.regions = []
+        vocabularies = {'type': {}, 'proprietes': {}, 'regions': {}}
+        
+        def intern(field, value):
+            vocabulary = vocabularies[field]
+            if value not in vocabulary:
+                vocabulary[value] = len(vocabulary)
+                {'type': self.types, 'proprietes': self.properties, 'regions': self.regions}[field].append(value)
+            return vocabulary[value]
+        
+        records = list(configs.values()) + [default]
+        self.records = np.empty(len(records), dtype=self.RECORD_DTYPE)
+        property_ids, region_ids = [], []
+        self.property_offsets = np.zeros(len(records) + 1, dtype=np.int32)
+        self.region_offsets = np.zeros(len(records) + 1, dtype=np.int32)
+        for row, config in enumerate(records):
+            self.records[row] = (config['production_base'], config['price_base'], config['rendement'],
+                                 config.get('mois_recolte', default.get('mois_recolte', 7)),
+                                 intern('type', config['type']))
+            property_ids.extend(intern('proprietes', value) for value in config['proprietes'])
+            region_ids.extend(intern('regions', value) for value in config['regions'])
+            self.property_offsets[row + 1] = len(property_ids)
+            self.region_offsets[row + 1] = len(region_ids)
+        self.property_ids = np.array(property_ids, dtype=np.int32)
+        self.region_ids = np.array(region_ids, dtype=np.int32)
+        
+        # Régimes et bruits calibrés (calibrate_registry), rares : indexés par ligne
+        self.calibrations = {row: config['calibration'] for row, config in enumerate(records)
+                             if config.get('calibration')}
+        self._tables = {row: _calibrated_table(calibration) for row, calibration in self.calibrations.items()}
+    
+    @classmethod
+    def load(cls, path):
+        """Charge un registre JSON {"default": {...}, "huiles": {nom: {...}}}"""
+        with open(path, encoding='utf-8') as f:
+            registry = json.load(f)
+        return cls(registry['huiles'], registry['default'])
+    
+    def to_dict(self):
+        """Registre au format JSON de `load` (alias compris)"""
+        configs = {name: {'alias': self.aliases[name]} if name in self.aliases else self.config(name)
+                   for name in self._order}
+        return {'default': self._config(self.default_row), 'huiles': configs}
+    
+    def save(self, path):
+        """Écrit le registre au format JSON de `load` (listes sur une ligne, comme oil_registry.json)"""
+        registry = self.to_dict()
+        for config in [registry['default']] + list(registry['huiles'].values()):
+            for field in ('production_base', 'price_base'):
+                if field in config and float(config[field]).is_integer():
+                    config[field] = int(config[field])
+        text = json.dumps(registry, ensure_ascii=False, indent=2)
+        # Les chaînes JSON ne contiennent pas de saut de ligne : seuls les blancs de mise en forme sont retirés
+        text = re.sub(r'\[\n\s*([^\[\]{}]*?)\n\s*\]', lambda match: '[' + re.sub(r',\n\s*', ', ', match.group(1)) + ']', text)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def __contains__(self, oil_name):
+        return oil_name in self._index
+    
+    def rows(self, oils):
+        """Lignes du tableau pour une liste d'huiles (configuration par défaut si inconnue)"""
+        return np.fromiter((self._index.get(oil, self.default_row) for oil in oils),
+                           dtype=np.intp, count=len(oils))
+    
+    def params(self, oils):
+        """Paramètres numériques des huiles, en tableaux alignés sur `oils`.
+        
+        Si l'une des huiles est calibrée, s'y ajoutent ses tables de régimes
+        (REGIME_FIELDS) et de bruits ('sigmas'), celles de METRIC_SPECS pour les autres.
+        """
+        rows = self.rows(oils)
+        records = self.records[rows]
+        params = {field: records[field].astype(float) for field in self.RECORD_DTYPE.names if field != 'type'}
+        if self._tables and any(row in self._tables for row in rows.tolist()):
+            params.update(_regime_params([self._tables.get(row, METRIC_TABLE) for row in rows.tolist()]))
+        return params
+    
+    def config(self, oil_name):
+        """Configuration d'une huile au format dict historique"""
+        return self._config(self._index.get(oil_name, self.default_row))
+    
+    def _config(self, row):
+        record = self.records[row]
+        properties = self.property_ids[self.property_offsets[row]:self.property_offsets[row + 1]]
+        regions = self.region_ids[self.region_offsets[row]:self.region_offsets[row + 1]]
+        config = {
+            "production_base": record['production_base'].item(),
+            "price_base": record['price_base'].item(),
+            "type": self.types[record['type']],
+            "proprietes": [self.properties[i] for i in properties],
+            "regions": [self.regions[i] for i in regions],
+            "rendement": record['rendement'].item(),
+            "mois_recolte": record['mois_recolte'].item(),
         }
-        
-        return configs.get(self.oil, configs["default"])
+        if row in self.calibrations:
+            config["calibration"] = self.calibrations[row]
+        return config
+
+
+# Registre livré avec le script (oil_registry.json, à côté de Pharmac.py)
+OIL_REGISTRY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'oil_registry.json')
+
+
+@functools.lru_cache(maxsize=None)
+def load_oil_registry(path=OIL_REGISTRY_FILE):
+    """Registre compilé d'un fichier, construit une seule fois par processus"""
+    return OilRegistry.load(path)
+
+
+OIL_REGISTRY = load_oil_registry()
+
+
+def get_oil_config(oil_name):
+    """Retourne la configuration spécifique pour chaque huile essentielle"""
+    return OIL_REGISTRY.config(oil_name)
+
+
+def _config_params(configs):
+    """Paramètres numériques d'une liste de configurations dict, au format de OilRegistry.params"""
+    params = {key: np.array([config[key] for config in configs], dtype=float)
+              for key in ('production_base', 'price_base', 'rendement', 'mois_recolte')}
+    if any(config.get('calibration') for config in configs):
+        params.update(_regime_params([_calibrated_table(config['calibration']) if config.get('calibration')
+                                      else METRIC_TABLE for config in configs]))
+    return params
+
+
+def _catalogue_bases(params):
+    """Niveaux de base de chaque métrique à partir des paramètres des huiles (huiles × métriques)"""
+    bases = np.empty((len(params['production_base']), len(METRIC_SPECS)))
+    for m, spec in enumerate(METRIC_SPECS.values()):
+        bases[:, m] = spec['base'](params) if callable(spec['base']) else spec['base']
+    return bases
+
+
+def _date_grid(start_year, end_year, freq=ANNUAL_FREQ):
+    """Grille de dates de la période analysée à la fréquence demandée (une de FREQUENCIES)"""
+    if freq not in FREQUENCIES:
+        raise ValueError(f"fréquence non prise en charge: {freq} (fréquences: {', '.join(FREQUENCIES)})")
+    return pd.date_range(start=f'{start_year}-01-01', 
+                         end=f'{end_year}-12-31', freq=PANDAS_FREQUENCIES[freq])
+
+
+def _time_coordinate(dates):
+    """Temps en années décimales au début de chaque période.
     
-    def generate_pharmacopoeia_data(self):
-        """Génère des données pour l'huile essentielle"""
-        print(f"🌿 Génération des données pharmacologiques pour {self.oil}...")
-        
-        # Créer une base de données annuelle
-        dates = pd.date_range(start=f'{self.start_year}-01-01', 
-                             end=f'{self.end_year}-12-31', freq='Y')
-        
-        data = {'Annee': [date.year for date in dates]}
-        
-        # Données de production et marché
-        data['Production_Mondiale'] = self._simulate_global_production(dates)
-        data['Prix_Moyen'] = self._simulate_average_price(dates)
-        data['Demande_Mondiale'] = self._simulate_global_demand(dates)
-        data['Surface_Cultivee'] = self._simulate_cultivation_area(dates)
-        
-        # Données de qualité et composition
-        data['Teneur_Principes_Actifs'] = self._simulate_active_compounds(dates)
-        data['Pureté_Chimique'] = self._simulate_chemical_purity(dates)
-        data['Qualite_Bio'] = self._simulate_organic_quality(dates)
-        
-        # Données thérapeutiques
-        data['Efficacite_Therapeutique'] = self._simulate_therapeutic_efficacy(dates)
-        data['Etudes_Scientifiques'] = self._simulate_scientific_studies(dates)
-        data['Demande_Therapeutique'] = self._simulate_therapeutic_demand(dates)
-        
-        # Applications et utilisations
-        data['Usage_Aromatherapie'] = self._simulate_aromatherapy_use(dates)
-        data['Usage_Cosmetique'] = self._simulate_cosmetic_use(dates)
-        data['Usage_Pharmaceutique'] = self._simulate_pharmaceutical_use(dates)
-        data['Usage_Alimentaire'] = self._simulate_food_use(dates)
-        
-        # Indicateurs économiques
-        data['Valeur_Marche'] = self._simulate_market_value(dates)
-        data['Croissance_Marche'] = self._simulate_market_growth(dates)
-        data['Exportations'] = self._simulate_exports(dates)
-        
-        # Facteurs environnementaux
-        data['Impact_Environnemental'] = self._simulate_environmental_impact(dates)
-        data['Durabilite_Production'] = self._simulate_production_sustainability(dates)
-        data['Rareté_Ressource'] = self._simulate_resource_scarcity(dates)
-        
-        df = pd.DataFrame(data)
-        
-        # Ajouter des tendances spécifiques
-        self._add_essential_oil_trends(df)
-        
+    Le début de période est borné à l'année civile de la date : une grille
+    annuelle donne exactement les années entières (2000.0, 2001.0...), une
+    grille mensuelle 2000.0, 2000.085...
+    """
+    years = np.asarray(dates.year)
+    starts = dates.to_period().start_time
+    fraction = (np.asarray(starts.dayofyear) - 1) / (365 + np.asarray(starts.is_leap_year))
+    return years + np.where(np.asarray(starts.year) == years, fraction, 0.0)
+
+
+def _is_subannual(t):
+    """Vrai si la grille compte plusieurs périodes dans une même année"""
+    return len(np.unique(np.floor(t))) < len(t)
+
+
+def _period_frame(dates, values):
+    """DataFrame d'une huile (périodes × métriques) : Annee, précédée de Date sur une grille infra-annuelle"""
+    df = pd.DataFrame(values, columns=METRIC_COLUMNS)
+    df.insert(0, 'Annee', np.asarray(dates.year, dtype=np.int64))
+    if _is_subannual(_time_coordinate(dates)):
+        df.insert(0, 'Date', dates)
+    return df
+
+
+def _annual_view(df):
+    """Moyennes annuelles d'un DataFrame infra-annuel (inchangé s'il est déjà annuel)"""
+    if 'Date' not in df:
         return df
+    return df.drop(columns='Date').groupby('Annee', as_index=False).mean()
+
+
+def _seasonal_factors(t, harvest_months):
+    """Facteurs saisonniers (huiles × métriques × périodes), ou None sur une grille annuelle"""
+    if not _is_subannual(t):
+        return None
+    amplitudes = np.zeros(len(METRIC_COLUMNS))
+    lags = np.zeros(len(METRIC_COLUMNS))
+    for column, (amplitude, lag) in SEASONALITY.items():
+        amplitudes[METRIC_COLUMNS.index(column)] = amplitude
+        lags[METRIC_COLUMNS.index(column)] = lag
     
-    def _simulate_global_production(self, dates):
-        """Simule la production mondiale (tonnes)"""
-        base_production = self.config["production_base"]
-        
-        production = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year <= 2005:
-                growth = 1 + 0.08 * i  # Croissance forte initiale
-            elif 2006 <= year <= 2015:
-                growth = 1 + 0.12 * (i-5)  # Expansion du marché
-            elif 2016 <= year <= 2020:
-                growth = 1 + 0.15 * (i-15)  # Boom du naturel
-            else:
-                growth = 1 + 0.10 * (i-20)  # Croissance soutenue
-            
-            noise = np.random.normal(1, 0.10)
-            production.append(base_production * growth * noise)
-        
-        return production
+    months = 12 * (t - np.floor(t))
+    peaks = np.asarray(harvest_months, dtype=float)[:, None] - 1 + lags[None, :]   # huiles × métriques
+    phase = 2 * np.pi * (months[None, None, :] - peaks[:, :, None]) / 12
+    return 1 + amplitudes[None, :, None] * np.cos(phase)
+
+
+def _oil_growth(params, t):
+    """Facteurs de croissance huiles × métriques × périodes (1 × ... s'ils sont communs à toutes les huiles).
     
-    def _simulate_average_price(self, dates):
-        """Simule le prix moyen (€/kg)"""
-        base_price = self.config["price_base"]
-        
-        prices = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year <= 2005:
-                variation = 1 + 0.03 * i  # Hausse modérée
-            elif 2006 <= year <= 2012:
-                variation = 1 + 0.05 * (i-5)  # Hausse due à la demande
-            elif 2013 <= year <= 2018:
-                variation = 1 + 0.08 * (i-12)  # Forte hausse qualité bio
-            else:
-                variation = 1 + 0.06 * (i-18)  # Hausse soutenue
-            
-            noise = np.random.normal(1, 0.08)
-            prices.append(base_price * variation * noise)
-        
-        return prices
+    Les huiles calibrées (ou les scénarios aux ruptures déplacées) suivent
+    leurs propres régimes, passés dans `params` (champs REGIME_FIELDS).
+    """
+    if 'slopes' not in params:
+        return _growth_curves(METRIC_TABLE, t)[None]
+    table = {field: params[field] for field in REGIME_FIELDS}
+    years = np.broadcast_to(t, (len(params['production_base']), len(METRIC_COLUMNS), len(t)))
+    return _growth_curves(table, years)
+
+
+def _deterministic_curves(params, t):
+    """Partie déterministe du modèle (base × croissance × saison) : huiles × métriques × périodes"""
+    curves = _catalogue_bases(params)[:, :, None] * _oil_growth(params, t)
+    seasonal = _seasonal_factors(t, params['mois_recolte'])
+    if seasonal is not None:
+        curves *= seasonal
+    return curves
+
+
+# Percentiles retenus pour les bandes d'incertitude des ensembles Monte-Carlo
+ENSEMBLE_PERCENTILES = {'p5': 5, 'p50': 50, 'p95': 95}
+
+
+def _trend_factors(years):
+    """Facteurs multiplicatifs des tendances spécifiques (périodes × métriques), selon l'année civile"""
+    years = np.floor(np.asarray(years, dtype=float))
+    factors = np.ones((len(years), len(METRIC_COLUMNS)))
+    for start, end, column, factor in TREND_RULES:
+        in_era = (years >= start) & (years <= (np.inf if end is None else end))
+        factors[in_era, METRIC_COLUMNS.index(column)] *= factor
+    return factors
+
+
+def _apply_trends(values, years):
+    """Applique les tendances à un tableau (..., périodes, métriques) : une huile, le catalogue ou un ensemble"""
+    values *= _trend_factors(years)
+    return values
+
+
+class _EnsembleReducer:
+    """Réduit les réplicats à la volée : moyenne exacte et percentiles par histogramme.
     
-    def _simulate_global_demand(self, dates):
-        """Simule la demande mondiale (tonnes)"""
-        base_demand = self.config["production_base"] * 0.9
-        
-        demand = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year <= 2010:
-                growth = 1 + 0.10 * i  # Demande croissante
-            elif 2011 <= year <= 2020:
-                growth = 1 + 0.14 * (i-10)  # Forte croissance
-            else:
-                growth = 1 + 0.12 * (i-20)  # Croissance soutenue
-            
-            noise = np.random.normal(1, 0.12)
-            demand.append(base_demand * growth * noise)
-        
-        return demand
+    Les réplicats arrivent en écarts réduits z = (bruit - 1) / sigma, de loi
+    N(0, 1) connue d'avance : chaque cellule (huile, période, métrique) garde
+    un histogramme de `n_bins` classes sur [-Z_RANGE, Z_RANGE], fixé avant
+    le premier lot, plus une classe ouverte de chaque côté bornée par le
+    minimum et le maximum observés. Aucun réplicat n'est écrêté, et la
+    mémoire de l'état (state_bytes) ne dépend que du nombre de cellules.
+    """
     
-    def _simulate_cultivation_area(self, dates):
-        """Simule la surface cultivée (hectares)"""
-        base_area = self.config["production_base"] / self.config["rendement"] * 10
-        
-        areas = []
-        for i, date in enumerate(dates):
-            growth = 1 + 0.09 * i
-            noise = np.random.normal(1, 0.15)
-            areas.append(base_area * growth * noise)
-        
-        return areas
+    Z_RANGE = 6.0
+    # Cellules comptées par bincount : comptages int64 d'environ 0,5 Mo, qui restent en cache
+    COUNT_BLOCK = 256
     
-    def _simulate_active_compounds(self, dates):
-        """Simule la teneur en principes actifs (%)"""
-        compounds = []
-        for i, date in enumerate(dates):
-            base_level = 85  # Niveau de base en %
-            
-            year = date.year
-            if year >= 2010:
-                improvement = 1 + 0.005 * (year - 2010)  # Amélioration lente
-            else:
-                improvement = 1
-            
-            noise = np.random.normal(1, 0.04)
-            compounds.append(base_level * improvement * noise)
-        
-        return compounds
+    def __init__(self, shape, n_bins=256):
+        self.n_bins = n_bins
+        self.count = 0
+        self.total = np.zeros(shape)
+        self.low = np.full(shape, np.inf)
+        self.high = np.full(shape, -np.inf)
+        self.hist = np.zeros(shape + (n_bins + 2,), dtype=np.uint32)
+        self._offsets = np.arange(self.total.size).reshape(shape) * (n_bins + 2)
     
-    def _simulate_chemical_purity(self, dates):
-        """Simule la pureté chimique (%)"""
-        purity = []
-        for i, date in enumerate(dates):
-            base_purity = 92  # Pureté de base en %
-            
-            year = date.year
-            if year >= 2008:
-                improvement = 1 + 0.008 * (year - 2008)  # Amélioration des techniques
-            else:
-                improvement = 1
-            
-            noise = np.random.normal(1, 0.03)
-            purity.append(base_purity * improvement * noise)
-        
-        return purity
+    @staticmethod
+    def state_bytes(cells, n_bins):
+        """Mémoire de l'état pour `cells` cellules : comptages, sommes, extrêmes et décalages"""
+        return cells * (4 * (n_bins + 2) + 4 * 8)
     
-    def _simulate_organic_quality(self, dates):
-        """Simule la qualité bio (%)"""
-        quality = []
-        for i, date in enumerate(dates):
-            base_quality = 60  # Part bio de base en %
-            
-            year = date.year
-            if year >= 2015:
-                growth = 1 + 0.025 * (year - 2015)  # Forte croissance du bio
-            else:
-                growth = 1
-            
-            noise = np.random.normal(1, 0.06)
-            quality.append(base_quality * growth * noise)
-        
-        return quality
+    def update(self, z):
+        """Ajoute un lot de réplicats (réplicats × forme de la cellule) ; `z` sert de tampon et est écrasé"""
+        self.count += len(z)
+        self.total += z.sum(axis=0)
+        np.minimum(self.low, z.min(axis=0), out=self.low)
+        np.maximum(self.high, z.max(axis=0), out=self.high)
+        
+        # Classe 0 et n_bins + 1 : au-delà de ±Z_RANGE, comptées à part
+        z += self.Z_RANGE
+        z *= self.n_bins / (2 * self.Z_RANGE)
+        np.floor(z, out=z)
+        np.clip(z, -1, self.n_bins, out=z)
+        # Indices de classe cellule par cellule (cellules × réplicats) : les réplicats
+        # d'un bloc de cellules sont contigus et comptés par un seul bincount
+        bins = np.empty(self.total.shape + (len(z),), dtype=np.intp)
+        np.copyto(np.moveaxis(bins, -1, 0), z, casting='unsafe')
+        bins = bins.reshape(-1, len(z))
+        width = self.n_bins + 2
+        hist = self.hist.reshape(-1, width)
+        offsets = self._offsets.reshape(-1, 1)
+        # Comptages int64 d'un bloc bornés aussi par la place des tirages d'un flux (3e terme du budget)
+        block = max(min(self.COUNT_BLOCK, len(z) * len(hist) // width), 1)
+        for start in range(0, len(hist), block):
+            cells = bins[start:start + block]
+            cells += offsets[:len(cells)]
+            cells += 1
+            counts = np.bincount(cells.reshape(-1), minlength=len(cells) * width)
+            np.add(hist[start:start + block], counts.reshape(-1, width),
+                   out=hist[start:start + block], casting='unsafe')
+            del counts                                  # libéré avant le bloc suivant
     
-    def _simulate_therapeutic_efficacy(self, dates):
-        """Simule l'efficacité thérapeutique (0-100)"""
-        efficacy = []
-        for i, date in enumerate(dates):
-            base_efficacy = 75  # Efficacité de base
-            
-            year = date.year
-            if year >= 2010:
-                improvement = 1 + 0.012 * (year - 2010)  # Amélioration des connaissances
-            else:
-                improvement = 1
-            
-            noise = np.random.normal(1, 0.05)
-            efficacy.append(base_efficacy * improvement * noise)
-        
-        return efficacy
+    def mean(self):
+        return self.total / self.count
     
-    def _simulate_scientific_studies(self, dates):
-        """Simule le nombre d'études scientifiques publiées"""
-        studies = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year <= 2005:
-                count = 5 + i * 2
-            elif 2006 <= year <= 2015:
-                count = 15 + (i-5) * 5
-            else:
-                count = 65 + (i-15) * 8
-            
-            noise = np.random.normal(1, 0.20)
-            studies.append(count * noise)
-        
-        return studies
+    def percentiles(self, qs, block=256):
+        """Percentiles `qs` de z (len(qs) × forme de la cellule), interpolés dans la classe qui les contient.
+        
+        Les cellules sont parcourues par blocs de `block` pour ne jamais
+        matérialiser la fonction de répartition de tout l'histogramme.
+        """
+        hist = self.hist.reshape(-1, self.n_bins + 2)
+        low, high = self.low.reshape(-1), self.high.reshape(-1)
+        width = 2 * self.Z_RANGE / self.n_bins
+        result = np.empty((len(qs), len(hist)))
+        for start in range(0, len(hist), block):
+            counts = hist[start:start + block]
+            cdf = np.cumsum(counts, axis=-1, dtype=np.uint32)
+            for i, q in enumerate(qs):
+                target = q / 100 * self.count
+                k = np.minimum((cdf < target).sum(axis=-1), self.n_bins + 1)
+                inside = np.take_along_axis(counts, k[:, None], axis=-1)[:, 0].astype(np.int64)
+                below = np.take_along_axis(cdf, k[:, None], axis=-1)[:, 0].astype(np.int64) - inside
+                fraction = np.clip((target - below) / np.maximum(inside, 1), 0, 1)
+                
+                left = -self.Z_RANGE + (k - 1) * width
+                right = left + width
+                left = np.where(k == 0, np.minimum(low[start:start + block], -self.Z_RANGE), left)
+                right = np.where(k == self.n_bins + 1, np.maximum(high[start:start + block], self.Z_RANGE), right)
+                result[i, start:start + block] = left + fraction * (right - left)
+        return result.reshape((len(qs),) + self.total.shape)
+
+
+# Nombre de réplicats tirés d'un même flux aléatoire (huile, métrique, bloc)
+REPLICATE_BLOCK = 1024
+
+
+def _stream_key(name):
+    """Clé entière stable (indépendante du processus) d'un nom d'huile ou de métrique"""
+    return int.from_bytes(hashlib.sha256(name.encode('utf-8')).digest()[:8], 'little')
+
+
+def _stream(seed, oil, column, block=0):
+    """Générateur indépendant du triplet (huile, métrique, bloc de réplicats)"""
+    sequence = np.random.SeedSequence(seed, spawn_key=(_stream_key(oil), _stream_key(column), block))
+    return np.random.Generator(np.random.PCG64(sequence))
+
+
+def _noise(seed, oils, n_periods, first=0, count=1, sigmas=None, streams=None):
+    """Bruit multiplicatif N(1, sigma) des réplicats [first, first + count).
     
-    def _simulate_therapeutic_demand(self, dates):
-        """Simule la demande thérapeutique (0-100)"""
-        demand = []
-        for i, date in enumerate(dates):
-            base_demand = 60
-            
-            year = date.year
-            if year >= 2012:
-                growth = 1 + 0.018 * (year - 2012)  # Croissance forte
-            else:
-                growth = 1
-            
-            noise = np.random.normal(1, 0.07)
-            demand.append(base_demand * growth * noise)
-        
-        return demand
+    Retourne un tableau réplicats × huiles × métriques × périodes. Sans graine,
+    le bruit est tiré de l'état global `np.random`. Avec une graine, chaque
+    triplet (huile, métrique, bloc de REPLICATE_BLOCK réplicats) a son propre
+    flux, tiré réplicat par réplicat : toute tranche se régénère à l'identique,
+    quel que soit le processus ou le découpage en lots. `sigmas` (huiles ×
+    métriques, params['sigmas'] des huiles calibrées) remplace les bruits de METRIC_SPECS.
+    `streams` (dict) garde les flux ouverts d'un appel à l'autre : une tranche
+    qui suit la précédente les reprend au lieu de retirer le début du bloc.
+    """
+    if sigmas is None:
+        sigmas = METRIC_TABLE['sigmas'][None]
+    sigmas = np.broadcast_to(sigmas, (len(oils), len(METRIC_COLUMNS)))
+    if seed is None:
+        return np.random.normal(1, sigmas[:, :, None], size=(count, len(oils), len(METRIC_COLUMNS), n_periods))
     
-    def _simulate_aromatherapy_use(self, dates):
-        """Simule l'usage en aromathérapie (0-100)"""
-        usage = []
-        for i, date in enumerate(dates):
-            base_usage = 70
-            
-            year = date.year
-            if year >= 2008:
-                growth = 1 + 0.015 * (year - 2008)
-            else:
-                growth = 1
-            
-            noise = np.random.normal(1, 0.06)
-            usage.append(base_usage * growth * noise)
-        
-        return usage
+    noise = np.empty((count, len(oils), len(METRIC_COLUMNS), n_periods))
+    stop = first + count
+    for o, oil in enumerate(oils):
+        for m, column in enumerate(METRIC_COLUMNS):
+            replicate = first
+            while replicate < stop:
+                block, offset = divmod(replicate, REPLICATE_BLOCK)
+                block_stop = min(stop, (block + 1) * REPLICATE_BLOCK)
+                opened = streams.get((o, m)) if streams is not None else None
+                if opened is not None and opened[:2] == (block, replicate):
+                    generator = opened[2]
+                    draws = generator.normal(1, sigmas[o, m], size=(block_stop - replicate, n_periods))
+                else:
+                    generator = _stream(seed, oil, column, block)
+                    draws = generator.normal(
+                        1, sigmas[o, m], size=(block_stop - block * REPLICATE_BLOCK, n_periods))[offset:]
+                noise[replicate - first:block_stop - first, o, m] = draws
+                if streams is not None:
+                    streams[o, m] = (block, block_stop, generator)
+                replicate = block_stop
+    return noise
+
+
+def _resume_noise(seed, oil, n_periods, sigmas=None, states=None):
+    """Bruit du réplicat 0 d'une huile sur `n_periods` périodes, repris là où ses flux s'étaient arrêtés.
     
-    def _simulate_cosmetic_use(self, dates):
-        """Simule l'usage cosmétique (0-100)"""
-        usage = []
-        for i, date in enumerate(dates):
-            base_usage = 65
-            
-            year = date.year
-            if year >= 2010:
-                growth = 1 + 0.020 * (year - 2010)  # Forte croissance
-            else:
-                growth = 1
-            
-            noise = np.random.normal(1, 0.08)
-            usage.append(base_usage * growth * noise)
-        
-        return usage
+    `states` (métrique -> état PCG64, d'un point de reprise) reprend chaque
+    flux de _stream après les périodes déjà tirées, sinon au début : tirer
+    N puis M périodes donne le même bruit que N + M d'un coup (celui de
+    _noise). Retourne (métriques × périodes, états atteints).
+    """
+    sigmas = METRIC_TABLE['sigmas'] if sigmas is None else sigmas[0]
+    noise = np.empty((len(METRIC_COLUMNS), n_periods))
+    reached = {}
+    for m, column in enumerate(METRIC_COLUMNS):
+        generator = _stream(seed, oil, column)
+        if states is not None:
+            generator.bit_generator.state = states[column]
+        noise[m] = generator.normal(1, sigmas[m], size=n_periods)
+        reached[column] = generator.bit_generator.state
+    return noise, reached
+
+
+def _simulate_ensemble(oils, params, t, n_replicates, memory_budget_mb=64, n_bins=256, seed=None):
+    """Simule `n_replicates` réplicats par lots et les réduit en moyenne et percentiles.
     
-    def _simulate_pharmaceutical_use(self, dates):
-        """Simule l'usage pharmaceutique (0-100)"""
-        usage = []
-        for i, date in enumerate(dates):
-            base_usage = 40
-            
-            year = date.year
-            if year >= 2015:
-                growth = 1 + 0.025 * (year - 2015)  # Croissance rapide
-            else:
-                growth = 1
-            
-            noise = np.random.normal(1, 0.10)
-            usage.append(base_usage * growth * noise)
-        
-        return usage
+    `t` est le temps en années décimales de la grille ; retourne un dict
+    statistique -> tableau huiles × périodes × métriques. `memory_budget_mb`
+    borne l'état du réducteur et les lots ensemble : ValueError si l'état
+    seul ne tient pas dans le budget.
+    """
+    n_oils, n_metrics, n_years = len(oils), len(METRIC_COLUMNS), len(t)
+    cells = n_oils * n_years * n_metrics
     
-    def _simulate_food_use(self, dates):
-        """Simule l'usage alimentaire (0-100)"""
-        usage = []
-        for i, date in enumerate(dates):
-            base_usage = 30
-            
-            year = date.year
-            if year >= 2018:
-                growth = 1 + 0.030 * (year - 2018)  # Très forte croissance
-            else:
-                growth = 1
-            
-            noise = np.random.normal(1, 0.12)
-            usage.append(base_usage * growth * noise)
-        
-        return usage
+    # État permanent : réducteur, courbe attendue, statistiques produites et temporaires par cellule
+    budget = int(memory_budget_mb * 2**20)
+    state_bytes = _EnsembleReducer.state_bytes(cells, n_bins) + 10 * 8 * cells
+    # Par réplicat : bruit (réutilisé pour z), tirages d'un flux (puis comptages des
+    # classes d'un bloc de cellules, cf. _EnsembleReducer.update) et indices de classe
+    bytes_per_replicate = 3 * 8 * cells
+    if state_bytes + bytes_per_replicate > budget:
+        raise ValueError(f"ensemble de {cells} cellules : l'état ({state_bytes / 2**20:.0f} Mo) dépasse "
+                         f"memory_budget_mb={memory_budget_mb} ; augmenter le budget ou réduire n_bins")
+    chunk_size = (budget - state_bytes) // bytes_per_replicate
+    if chunk_size > REPLICATE_BLOCK:
+        # Lots alignés sur les blocs de flux pour ne jamais retirer un bloc
+        chunk_size -= chunk_size % REPLICATE_BLOCK
+    
+    # Courbe déterministe (croissance × saison × tendances) commune à tous les réplicats
+    expected = _deterministic_curves(params, t).transpose(0, 2, 1) * _trend_factors(t)
+    sigmas = params.get('sigmas', METRIC_TABLE['sigmas'][None])
+    sigmas = np.broadcast_to(sigmas, (n_oils, n_metrics))[:, None, :]
+    # Bruit nul (sigma = 0) : z reste nul
+    scale = np.where(sigmas > 0, sigmas, 1.0)
+    
+    reducer = _EnsembleReducer(expected.shape, n_bins)
+    streams = {}
+    done = 0
+    while done < n_replicates:
+        size = min(chunk_size, n_replicates - done)
+        z = _noise(seed, oils, n_years, first=done, count=size,
+                   sigmas=params.get('sigmas'), streams=streams).transpose(0, 1, 3, 2)
+        z -= 1
+        z /= scale
+        reducer.update(z)
+        del z
+        done += size
+    
+    # Valeur = attendu × (1 + sigma z) : monotone en z, décroissante si l'attendu est négatif
+    stats = {'mean': expected * (1 + sigmas * reducer.mean())}
+    qs = sorted(set(ENSEMBLE_PERCENTILES.values()) | {100 - q for q in ENSEMBLE_PERCENTILES.values()})
+    z_qs = reducer.percentiles(qs)
+    for name, q in ENSEMBLE_PERCENTILES.items():
+        z_q = np.where(expected < 0, z_qs[qs.index(100 - q)], z_qs[qs.index(q)])
+        stats[name] = expected * (1 + sigmas * z_q)
+    return stats
+
+
+# Version du simulateur, à incrémenter lorsque le code des générateurs change
+SIMULATOR_VERSION = "1"
+
+
+def _model_fingerprint():
+    """Empreinte des tables du modèle (régimes, bruits, bases, tendances)"""
+    model = []
+    for column, spec in METRIC_SPECS.items():
+        base = spec['base']
+        if callable(base):
+            base = [base.__code__.co_code.hex(), repr(base.__code__.co_consts), base.__code__.co_names]
+        model.append([column, base, spec['regimes'], spec['sigma']])
+    model.append(TREND_RULES)
+    model.append(sorted(SEASONALITY.items()))
+    return hashlib.sha256(repr(model).encode('utf-8')).hexdigest()
+
+
+class PharmacopoeiaCache:
+    """Cache disque adressé par contenu des données générées.
+    
+    Chaque entrée est un fichier .npy (Annee + métriques, puis la Date en jours
+    depuis 1970 sur une grille infra-annuelle) nommé par le hash de
+    la configuration de l'huile, de la période, de la fréquence, de la graine
+    et de la version du code. Les modèles de prévision ajustés y sont gardés
+    en .npz sous le hash de leurs séries. La taille totale est plafonnée à `max_bytes`,
+    les entrées les moins récemment utilisées étant évincées en premier.
+    """
+    
+    def __init__(self, directory='.pharmacopoeia_cache', max_bytes=512 * 2**20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        
+        self.fingerprint = _model_fingerprint()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+    
+    def key(self, oil, config, start_year, end_year, freq, seed):
+        """Clé de cache d'un jeu de données"""
+        payload = json.dumps({
+            'oil': oil, 'config': config,
+            'start_year': start_year, 'end_year': end_year, 'freq': freq,
+            'seed': seed, 'version': SIMULATOR_VERSION, 'model': self.fingerprint,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _path(self, key, ext='npy'):
+        return os.path.join(self.directory, f'{key}.{ext}')
+    
+    def get(self, key):
+        """Retourne le DataFrame en cache, ou None"""
+        path = self._path(key)
+        try:
+            values = np.load(path, allow_pickle=False)
+        except (FileNotFoundError, ValueError, OSError):
+            self.misses += 1
+            return None
+        
+        # Marquer l'entrée comme récemment utilisée (politique LRU)
+        os.utime(path)
+        self.hits += 1
+        
+        df = pd.DataFrame(values[:, 1:1 + len(METRIC_COLUMNS)], columns=METRIC_COLUMNS)
+        df.insert(0, 'Annee', values[:, 0].astype(np.int64))
+        if values.shape[1] > 1 + len(METRIC_COLUMNS):
+            df.insert(0, 'Date', pd.to_datetime(values[:, -1], unit='D'))
+        return df
+    
+    def put(self, key, df):
+        """Enregistre un DataFrame puis applique la politique d'éviction"""
+        values = df[['Annee'] + METRIC_COLUMNS].to_numpy(dtype=np.float64)
+        if 'Date' in df:
+            days = (df['Date'] - pd.Timestamp(0)) / pd.Timedelta(days=1)
+            values = np.column_stack([values, days.to_numpy(dtype=np.float64)])
+        tmp_path = f'{self._path(key)}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, values, allow_pickle=False)
+        os.replace(tmp_path, self._path(key))
+        self.stores += 1
+        self._evict()
+    
+    def model_key(self, method, series, options):
+        """Clé de cache des modèles de prévision ajustés sur des séries"""
+        digest = hashlib.sha256(np.ascontiguousarray(series).tobytes())
+        digest.update(json.dumps({'method': method, 'options': options, 'shape': series.shape,
+                                  'version': FORECAST_VERSION}, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def get_model(self, key):
+        """Retourne le modèle de prévision en cache (dict de tableaux), ou None"""
+        path = self._path(key, 'npz')
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                model = {name: archive[name] if archive[name].ndim else archive[name].item()
+                         for name in archive.files}
+        except (FileNotFoundError, ValueError, OSError):
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return model
+    
+    def put_model(self, key, model):
+        """Enregistre un modèle de prévision ajusté"""
+        tmp_path = f'{self._path(key)}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **model)
+        os.replace(tmp_path, self._path(key, 'npz'))
+        self.stores += 1
+        self._evict()
+    
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(('.npy', '.npz')):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+    
+    def _evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.evictions += 1
+    
+    def clear(self):
+        """Vide le cache"""
+        for _, _, name in self._entries():
+            os.remove(os.path.join(self.directory, name))
+    
+    def stats(self):
+        """Statistiques du cache"""
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+        }
+    
+    def report(self):
+        """Affiche les statistiques du cache"""
+        stats = self.stats()
+        print("🗄️ CACHE DES DONNÉES:")
+        print(f"Succès: {stats['hits']} / Échecs: {stats['misses']} ({stats['hit_rate']*100:.1f}%)")
+        print(f"Entrées: {stats['entries']} ({stats['bytes']/2**20:.1f} / {stats['max_bytes']/2**20:.0f} Mo)")
+        print(f"Écritures: {stats['stores']} / Évictions: {stats['evictions']}")
+
+
+class PharmacopoeiaProfiler:
+    """Spans de profilage (temps et, en option, allocations) des étapes du pipeline.
     
-    def _simulate_market_value(self, dates):
-        """Simule la valeur de marché (millions €)"""
-        base_value = self.config["production_base"] * self.config["price_base"] / 1000
+    Chaque span enregistre son nom, l'huile concernée, son début et sa durée
+    (µs, horloge murale commune à tous les processus), sa profondeur
+    d'imbrication et, avec memory=True, l'allocation nette et le pic
+    d'allocation mesurés par tracemalloc. Les spans s'exportent en JSON
+    (to_json) ou au format Chrome trace (to_chrome_trace, lisible dans
+    chrome://tracing ou Perfetto).
+    """
+    
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.events = []
+        self._local = threading.local()
+        # Ancrage de perf_counter sur l'horloge murale pour aligner les processus
+        self._wall_anchor = time.time_ns() // 1000
+        self._counter_anchor = time.perf_counter_ns() // 1000
+        # Le traçage déjà actif (pytest, profileur englobant) n'est pas arrêté par close()
+        self._owns_tracing = memory and not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+    
+    def _now(self):
+        return self._wall_anchor + time.perf_counter_ns() // 1000 - self._counter_anchor
+    
+    @contextlib.contextmanager
+    def span(self, name, oil=None, **args):
+        """Mesure le bloc englobé"""
+        stack = self._local.__dict__.setdefault('stack', [])
+        frame = {'peak': 0}
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame = {'start': current, 'peak': current}
+        stack.append(frame)
+        started = self._now()
+        try:
+            yield
+        finally:
+            event = {'name': name, 'oil': oil, 'start_us': started, 'duration_us': self._now() - started,
+                     'depth': len(stack) - 1, 'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args}
+            stack.pop()
+            if self.memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(frame['peak'], peak)
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+                event['alloc_net'] = current - frame['start']
+                event['alloc_peak'] = peak - frame['start']
+            self.events.append(event)
+    
+    def close(self):
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+    
+    def summary(self):
+        """Durée totale, nombre d'appels et pic d'allocation par étape"""
+        df = pd.DataFrame(self.events)
+        if df.empty:
+            return df
+        aggregations = {'appels': ('duration_us', 'size'), 'total_ms': ('duration_us', 'sum')}
+        if self.memory:
+            aggregations['pic_alloc_mo'] = ('alloc_peak', 'max')
+        summary = df.groupby('name').agg(**aggregations).sort_values('total_ms', ascending=False)
+        summary['total_ms'] /= 1000
+        if self.memory:
+            summary['pic_alloc_mo'] /= 2**20
+        return summary
+    
+    def report(self):
+        """Affiche le résumé des spans"""
+        print("\n⏱️  PROFIL DES ÉTAPES:")
+        print(self.summary().round(2).to_string())
+    
+    def to_json(self, path):
+        """Exporte les spans bruts en JSON (débuts relatifs au premier span)"""
+        origin = min((event['start_us'] for event in self.events), default=0)
+        events = [dict(event, start_us=event['start_us'] - origin) for event in self.events]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'origin_us': origin, 'memory': self.memory, 'spans': events}, f, ensure_ascii=False, indent=2)
+        return path
+    
+    def to_chrome_trace(self, path):
+        """Exporte les spans au format Chrome trace (événements complets 'X')"""
+        trace = []
+        for event in self.events:
+            args = dict(event['args'], oil=event['oil'])
+            if 'alloc_net' in event:
+                args.update(alloc_net=event['alloc_net'], alloc_peak=event['alloc_peak'])
+            trace.append({'name': event['name'], 'cat': event['oil'] or 'pharmacopee', 'ph': 'X',
+                          'ts': event['start_us'], 'dur': event['duration_us'],
+                          'pid': event['pid'], 'tid': event['tid'], 'args': args})
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        return path
+
+
+# Profileur actif du processus (None : profilage désactivé, spans sans coût)
+_PROFILER = None
+_NO_SPAN = contextlib.nullcontext()
+
+
+def start_profiling(memory=False):
+    """Active le profilage des étapes dans ce processus et retourne le profileur"""
+    global _PROFILER
+    _PROFILER = PharmacopoeiaProfiler(memory)
+    return _PROFILER
+
+
+def stop_profiling():
+    """Désactive le profilage et retourne le profileur qui était actif"""
+    global _PROFILER
+    profiler, _PROFILER = _PROFILER, None
+    if profiler is not None:
+        profiler.close()
+    return profiler
+
+
+def _span(name, oil=None, **args):
+    """Span du profileur actif, ou contexte vide réutilisé si le profilage est désactivé"""
+    if _PROFILER is None:
+        return _NO_SPAN
+    return _PROFILER.span(name, oil, **args)
+
+
+class EssentialOilPharmacopoeiaAnalyzer:
+    def __init__(self, oil_name, seed=None, cache=None, freq=ANNUAL_FREQ, registry=None, end_year=2025):
+        self.oil = oil_name
+        self.registry = registry or OIL_REGISTRY
+        self.colors = ['#8B4513', '#228B22', '#FFD700', '#8A2BE2', '#FF6B6B', 
+                      '#4ECDC4', '#45B7D1', '#F9A602', '#6A0572', '#2A9D8F']
         
-        values = []
-        for i, date in enumerate(dates):
-            growth = 1 + 0.11 * i
-            noise = np.random.normal(1, 0.13)
-            values.append(base_value * growth * noise)
+        self.start_year = 2000
+        self.end_year = end_year
         
-        return values
-    
-    def _simulate_market_growth(self, dates):
-        """Simule la croissance du marché (%)"""
-        growth_rates = []
-        for i, date in enumerate(dates):
-            year = date.year
-            
-            if year <= 2005:
-                rate = 8.0
-            elif 2006 <= year <= 2015:
-                rate = 12.0
-            elif 2016 <= year <= 2020:
-                rate = 15.0
-            else:
-                rate = 11.0
-            
-            noise = np.random.normal(1, 0.15)
-            growth_rates.append(rate * noise)
+        # Fréquence de la grille de dates (annuelle par défaut, 'M', 'W', 'D'...)
+        self.freq = freq
         
-        return growth_rates
-    
-    def _simulate_exports(self, dates):
-        """Simule les exportations (tonnes)"""
-        base_exports = self.config["production_base"] * 0.7
+        # Graine optionnelle : flux aléatoires reproductibles par (huile, métrique, réplicat)
+        self.seed = seed
         
-        exports = []
-        for i, date in enumerate(dates):
-            growth = 1 + 0.10 * i
-            noise = np.random.normal(1, 0.14)
-            exports.append(base_exports * growth * noise)
+        # Point de reprise de la dernière génération, pour la prolonger (mode ajout)
+        self.checkpoint = None
         
-        return exports
-    
-    def _simulate_environmental_impact(self, dates):
-        """Simule l'impact environnemental (0-100, plus bas = mieux)"""
-        impact = []
-        for i, date in enumerate(dates):
-            base_impact = 45
-            
-            year = date.year
-            if year >= 2010:
-                improvement = 1 - 0.010 * (year - 2010)  # Amélioration
-            else:
-                improvement = 1
-            
-            noise = np.random.normal(1, 0.08)
-            impact.append(base_impact * improvement * noise)
+        # Cache disque optionnel (PharmacopoeiaCache), utilisé seulement avec une graine
+        self.cache = cache
         
-        return impact
-    
-    def _simulate_production_sustainability(self, dates):
-        """Simule la durabilité de production (0-100)"""
-        sustainability = []
-        for i, date in enumerate(dates):
-            base_sustainability = 65
-            
-            year = date.year
-            if year >= 2012:
-                improvement = 1 + 0.015 * (year - 2012)
-            else:
-                improvement = 1
-            
-            noise = np.random.normal(1, 0.07)
-            sustainability.append(base_sustainability * improvement * noise)
+        # Configuration spécifique pour chaque huile essentielle
+        self.config = self._get_oil_config()
         
-        return sustainability
+        # Bandes d'incertitude (ensemble Monte-Carlo) et prévision à tracer, le cas échéant
+        self._bands = None
+        self._forecast = None
+        
+    def _get_oil_config(self):
+        """Retourne la configuration spécifique pour chaque huile essentielle"""
+        return self.registry.config(self.oil)
     
-    def _simulate_resource_scarcity(self, dates):
-        """Simule la rareté de la ressource (0-100, plus bas = mieux)"""
-        scarcity = []
-        for i, date in enumerate(dates):
-            base_scarcity = 30
+    def generate_pharmacopoeia_data(self, checkpoint=None):
+        """Génère des données pour l'huile essentielle.
+        
+        Chaque génération laisse son point de reprise dans self.checkpoint
+        (dict JSON : grille, période atteinte et état des flux de bruit). En
+        mode ajout, avec le `checkpoint` d'une génération précédente, seules
+        les périodes qui le suivent jusqu'à end_year sont générées et
+        retournées ; l'historique n'est pas recalculé. Avec une graine, les
+        lignes ajoutées sont identiques bit à bit à celles d'une génération
+        complète jusqu'à end_year.
+        """
+        with _span('generation', self.oil):
+            if checkpoint is not None:
+                return self._extend_pharmacopoeia_data(checkpoint)
             
-            year = date.year
-            if year >= 2015:
-                increase = 1 + 0.008 * (year - 2015)  # Légère augmentation
-            else:
-                increase = 1
+            # Sans graine les données sont aléatoires à chaque appel : rien à mettre en cache
+            cache_key = None
+            if self.cache is not None and self.seed is not None:
+                cache_key = self.cache.key(self.oil, self.config, self.start_year, self.end_year,
+                                           self.freq, self.seed)
+                with _span('cache_get', self.oil):
+                    df = self.cache.get(cache_key)
+                if df is not None:
+                    print(f"♻️ Données pharmacologiques de {self.oil} chargées depuis le cache")
+                    # États des flux au bout de l'historique, retirés pour le point de reprise
+                    dates = _date_grid(self.start_year, self.end_year, self.freq)
+                    sigmas = _config_params([self.config]).get('sigmas')
+                    states = _resume_noise(self.seed, self.oil, len(dates), sigmas)[1]
+                    self.checkpoint = self._checkpoint(dates, states)
+                    return df
             
-            noise = np.random.normal(1, 0.10)
-            scarcity.append(base_scarcity * increase * noise)
-        
-        return scarcity
-    
-    def _add_essential_oil_trends(self, df):
-        """Ajoute des tendances spécifiques aux huiles essentielles"""
-        for i, row in df.iterrows():
-            year = row['Annee']
+            print(f"🌿 Génération des données pharmacologiques pour {self.oil}...")
             
-            # Début de popularité (2000-2005)
-            if 2000 <= year <= 2005:
-                df.loc[i, 'Usage_Aromatherapie'] *= 1.2
-                df.loc[i, 'Etudes_Scientifiques'] *= 1.3
+            # Créer la grille de dates (annuelle par défaut)
+            dates = _date_grid(self.start_year, self.end_year, self.freq)
             
-            # Reconnaissance scientifique (2006-2010)
-            if 2006 <= year <= 2010:
-                df.loc[i, 'Etudes_Scientifiques'] *= 1.5
-                df.loc[i, 'Efficacite_Therapeutique'] *= 1.1
+            # Toutes les métriques (production, qualité, thérapeutique, usages,
+            # économie, environnement) sont simulées en une seule passe
+            with _span('simulation', self.oil, periods=len(dates)):
+                values, states = self._simulate_all(dates)
             
-            # Boom du naturel (2011-2015)
-            if 2011 <= year <= 2015:
-                df.loc[i, 'Qualite_Bio'] *= 1.4
-                df.loc[i, 'Demande_Mondiale'] *= 1.3
+            # Ajouter des tendances spécifiques
+            with _span('trends', self.oil):
+                df = _period_frame(dates, _apply_trends(values.T, _time_coordinate(dates)))
+            self.checkpoint = self._checkpoint(dates, states)
             
-            # Intégration pharmaceutique (2016-2020)
-            if 2016 <= year <= 2020:
-                df.loc[i, 'Usage_Pharmaceutique'] *= 1.6
-                df.loc[i, 'Prix_Moyen'] *= 1.2
+            if cache_key is not None:
+                with _span('cache_put', self.oil):
+                    self.cache.put(cache_key, df)
             
-            # Durabilité et éthique (2021-2025)
-            if year >= 2021:
-                df.loc[i, 'Durabilite_Production'] *= 1.2
-                df.loc[i, 'Impact_Environnemental'] *= 0.9
-                df.loc[i, 'Qualite_Bio'] *= 1.15
+            return df
+    
+    def _extend_pharmacopoeia_data(self, checkpoint):
+        """Génère les seules périodes qui suivent un point de reprise (mode ajout de generate_pharmacopoeia_data)"""
+        mismatch = [field for field in ('oil', 'seed', 'freq', 'start_year')
+                    if checkpoint[field] != getattr(self, field)]
+        if mismatch:
+            raise ValueError(f"point de reprise incompatible ({', '.join(mismatch)} différent)")
+        
+        # Les régimes de croissance et les tendances ne dépendent que de la date :
+        # la position atteinte sur la grille suffit à les reprendre
+        dates = _date_grid(self.start_year, self.end_year, self.freq)
+        periods = checkpoint['periods']
+        if periods > len(dates) or dates[periods - 1].strftime('%Y-%m-%d') != checkpoint['last']:
+            raise ValueError(f"point de reprise ({checkpoint['last']}) hors de la grille "
+                             f"{self.start_year}-{self.end_year} ({self.freq})")
+        if periods == len(dates):
+            # Rien à ajouter : cadre vide aux colonnes de l'historique, point de reprise inchangé
+            print(f"✔️ Données de {self.oil} déjà à jour jusqu'à {self.end_year}")
+            self.checkpoint = dict(checkpoint)
+            last = dates[-2:]
+            return _period_frame(last, np.zeros((len(last), len(METRIC_COLUMNS)))).iloc[:0]
+        dates = dates[periods:]
+        print(f"➕ Extension des données de {self.oil} jusqu'à {self.end_year}: {len(dates)} nouvelles périodes...")
+        
+        with _span('simulation', self.oil, periods=len(dates)):
+            values, states = self._simulate_all(dates, checkpoint['states'])
+        with _span('trends', self.oil):
+            df = _period_frame(dates, _apply_trends(values.T, _time_coordinate(dates)))
+        self.checkpoint = self._checkpoint(dates, states, periods)
+        return df
+    
+    def _checkpoint(self, dates, states, offset=0):
+        """Point de reprise après la grille `dates` (commençant à la période `offset`)"""
+        return {'oil': self.oil, 'seed': self.seed, 'freq': self.freq,
+                'start_year': self.start_year, 'end_year': self.end_year,
+                'periods': offset + len(dates),
+                'last': dates[-1].strftime('%Y-%m-%d'),
+                'states': states}
+    
+    def generate_ensemble(self, n_replicates=10000, memory_budget_mb=64, n_bins=256):
+        """Génère un ensemble Monte-Carlo de l'huile, réduit en moyenne et bandes P5/P50/P95.
+        
+        Les réplicats sont simulés par lots dont la taille respecte
+        `memory_budget_mb` ; retourne un dict statistique -> DataFrame au format
+        de generate_pharmacopoeia_data.
+        """
+        print(f"🎲 Ensemble Monte-Carlo de {n_replicates} réplicats pour {self.oil}...")
+        
+        dates = _date_grid(self.start_year, self.end_year, self.freq)
+        with _span('ensemble', self.oil, replicates=n_replicates):
+            stats = _simulate_ensemble([self.oil], _config_params([self.config]), _time_coordinate(dates),
+                                       n_replicates, memory_budget_mb, n_bins, self.seed)
+        return {name: _period_frame(dates, values[0]) for name, values in stats.items()}
     
-    def create_pharmacopoeia_analysis(self, df):
-        """Crée une analyse complète de la pharmacopée"""
-        plt.style.use('seaborn-v0_8')
-        fig = plt.figure(figsize=(20, 24))
+    def forecast(self, df, horizon=10, method='holt', level=0.95):
+        """Prévision de toutes les métriques sur `horizon` années après la dernière année de df.
+        
+        Retourne un DataFrame Annee + métriques (médiane) + <métrique>_bas et
+        <métrique>_haut (intervalle de confiance `level`) ; les grilles
+        infra-annuelles sont prévues en moyennes annuelles.
+        """
+        df = _annual_view(df)
+        with _span('forecast', self.oil, horizon=horizon, method=method):
+            model = fit_forecast_models(df[METRIC_COLUMNS].to_numpy(dtype=float).T, method, cache=self.cache)
+            mean, low, high = forecast_series(model, horizon, level)
+        forecast = pd.DataFrame(np.vstack([mean, low, high]).T, columns=_forecast_columns())
+        forecast.insert(0, 'Annee', np.arange(1, horizon + 1) + int(df['Annee'].iloc[-1]))
+        return forecast
+    
+    def _simulate_all(self, dates, states=None):
+        """Simule toutes les métriques en une passe vectorisée.
+        
+        Retourne (métriques × périodes, états des flux de bruit atteints) ;
+        avec une graine, les flux reprennent aux `states` d'un point de
+        reprise. Sans graine, le bruit vient de `np.random` (états None).
+        """
+        t = _time_coordinate(dates)
+        params = _config_params([self.config])
+        if self.seed is None:
+            noise = _noise(None, [self.oil], len(t), sigmas=params.get('sigmas'))[0, 0]
+        else:
+            noise, states = _resume_noise(self.seed, self.oil, len(t), params.get('sigmas'), states)
+        return _deterministic_curves(params, t)[0] * noise, states
+    
+    def create_pharmacopoeia_analysis(self, df, bands=None, output_file=None, show=True, renderer=None,
+                                      forecast=None, tiers=None):
+        """Crée une analyse complète de la pharmacopée.
+        
+        `bands` est un ensemble retourné par generate_ensemble : les courbes
+        sont alors accompagnées de leur bande P5-P95. `forecast` (retourné par
+        forecast) prolonge les courbes en pointillés avec leur intervalle de
+        confiance. Avec un `renderer`
+        (PharmacopoeiaFigureRenderer), la figure est rendue sans pyplot en
+        réutilisant la mise en page d'un appel à l'autre. `tiers` écrit la
+        figure à plusieurs paliers de sortie (voir save_figure_tiers).
+        Retourne le fichier écrit (le dict palier -> chemin avec `tiers`).
+        """
+        # Les grilles infra-annuelles sont tracées en moyennes annuelles
+        df = _annual_view(df)
+        if bands is not None:
+            bands = {name: _annual_view(band) for name, band in bands.items()}
+        
+        self._bands = bands
+        self._forecast = forecast
+        with _span('rendering', self.oil):
+            if renderer is not None:
+                output_file = renderer.render(self, df, output_file, bands, forecast, tiers)
+            else:
+                import matplotlib.pyplot as plt
+                
+                plt.style.use('seaborn-v0_8')
+                fig = plt.figure(figsize=(20, 24))
+                self._draw_panels(fig, df)
+                
+                plt.suptitle(f'Analyse Pharmacopée - Huile Essentielle de {self.oil} ({self.start_year}-{self.end_year})', 
+                            fontsize=16, fontweight='bold')
+                with _span('tight_layout', self.oil):
+                    plt.tight_layout()
+                output_file = output_file or f'{self.oil}_pharmacopoeia_analysis.png'
+                if tiers:
+                    output_file = save_figure_tiers(fig, os.path.splitext(output_file)[0], tiers, oil=self.oil)
+                else:
+                    with _span('savefig', self.oil, dpi=300):
+                        plt.savefig(output_file, dpi=300, bbox_inches='tight')
+                if show:
+                    plt.show()
+                plt.close(fig)
         
+        # Générer les insights
+        with _span('insights', self.oil):
+            self._generate_pharmacopoeia_insights(df)
+        return output_file
+    
+    def _draw_panels(self, fig, df):
+        """Trace les 8 panneaux de l'analyse sur une figure"""
         # 1. Production et marché
-        ax1 = plt.subplot(4, 2, 1)
-        self._plot_production_market(df, ax1)
+        with _span('_plot_production_market', self.oil):
+            self._plot_production_market(df, fig.add_subplot(4, 2, 1))
         
         # 2. Qualité et composition
-        ax2 = plt.subplot(4, 2, 2)
-        self._plot_quality_composition(df, ax2)
+        with _span('_plot_quality_composition', self.oil):
+            self._plot_quality_composition(df, fig.add_subplot(4, 2, 2))
         
         # 3. Applications thérapeutiques
-        ax3 = plt.subplot(4, 2, 3)
-        self._plot_therapeutic_applications(df, ax3)
+        with _span('_plot_therapeutic_applications', self.oil):
+            self._plot_therapeutic_applications(df, fig.add_subplot(4, 2, 3))
         
         # 4. Utilisations par secteur
-        ax4 = plt.subplot(4, 2, 4)
-        self._plot_usage_by_sector(df, ax4)
+        with _span('_plot_usage_by_sector', self.oil):
+            self._plot_usage_by_sector(df, fig.add_subplot(4, 2, 4))
         
         # 5. Économie du marché
-        ax5 = plt.subplot(4, 2, 5)
-        self._plot_market_economics(df, ax5)
+        with _span('_plot_market_economics', self.oil):
+            self._plot_market_economics(df, fig.add_subplot(4, 2, 5))
         
         # 6. Recherche scientifique
-        ax6 = plt.subplot(4, 2, 6)
-        self._plot_scientific_research(df, ax6)
+        with _span('_plot_scientific_research', self.oil):
+            self._plot_scientific_research(df, fig.add_subplot(4, 2, 6))
         
         # 7. Durabilité environnementale
-        ax7 = plt.subplot(4, 2, 7)
-        self._plot_environmental_sustainability(df, ax7)
+        with _span('_plot_environmental_sustainability', self.oil):
+            self._plot_environmental_sustainability(df, fig.add_subplot(4, 2, 7))
         
         # 8. Évolution globale
-        ax8 = plt.subplot(4, 2, 8)
-        self._plot_global_evolution(df, ax8)
-        
-        plt.suptitle(f'Analyse Pharmacopée - Huile Essentielle de {self.oil} ({self.start_year}-{self.end_year})', 
-                    fontsize=16, fontweight='bold')
-        plt.tight_layout()
-        plt.savefig(f'{self.oil}_pharmacopoeia_analysis.png', dpi=300, bbox_inches='tight')
-        plt.show()
-        
-        # Générer les insights
-        self._generate_pharmacopoeia_insights(df)
+        with _span('_plot_global_evolution', self.oil):
+            self._plot_global_evolution(df, fig.add_subplot(4, 2, 8))
+    
+    def _plot_band(self, ax, column, color):
+        """Trace la bande P5-P95 d'une métrique si un ensemble est disponible, puis sa prévision"""
+        if self._bands is not None:
+            low, high = self._bands['p5'], self._bands['p95']
+            ax.fill_between(low['Annee'], low[column], high[column], color=color, alpha=0.15, linewidth=0)
+        self._plot_forecast(ax, column, color)
+    
+    def _plot_forecast(self, ax, column, color):
+        """Prolonge une métrique par sa prévision (pointillés) et son intervalle de confiance"""
+        if self._forecast is None:
+            return
+        forecast = self._forecast
+        ax.plot(forecast['Annee'], forecast[column], color=color, linewidth=2, linestyle=':', gid='forecast')
+        ax.fill_between(forecast['Annee'], forecast[f'{column}_bas'], forecast[f'{column}_haut'],
+                        color=color, alpha=0.1, linewidth=0)
     
     def _plot_production_market(self, df, ax):
         """Plot de la production et du marché"""
         ax.plot(df['Annee'], df['Production_Mondiale'], label='Production (tonnes)', 
                linewidth=2, color='#8B4513', alpha=0.8)
+        self._plot_band(ax, 'Production_Mondiale', '#8B4513')
         ax.plot(df['Annee'], df['Demande_Mondiale'], label='Demande (tonnes)', 
                linewidth=2, color='#228B22', alpha=0.8)
+        self._plot_band(ax, 'Demande_Mondiale', '#228B22')
         
         ax.set_title('Production et Demande Mondiales', 
                     fontsize=12, fontweight='bold')
@@ -599,6 +1362,7 @@ class EssentialOilPharmacopoeiaAnalyzer:
         ax2 = ax.twinx()
         ax2.plot(df['Annee'], df['Prix_Moyen'], label='Prix (€/kg)', 
                 linewidth=2, color='#FFD700', linestyle='--')
+        self._plot_band(ax2, 'Prix_Moyen', '#FFD700')
         ax2.set_ylabel('Prix (€/kg)')
         ax2.legend(loc='upper right')
     
@@ -606,10 +1370,13 @@ class EssentialOilPharmacopoeiaAnalyzer:
         """Plot de la qualité et composition"""
         ax.plot(df['Annee'], df['Teneur_Principes_Actifs'], label='Principes Actifs (%)', 
                linewidth=2, color='#8B4513', alpha=0.8)
+        self._plot_band(ax, 'Teneur_Principes_Actifs', '#8B4513')
         ax.plot(df['Annee'], df['Pureté_Chimique'], label='Pureté Chimique (%)', 
                linewidth=2, color='#228B22', alpha=0.8)
+        self._plot_band(ax, 'Pureté_Chimique', '#228B22')
         ax.plot(df['Annee'], df['Qualite_Bio'], label='Qualité Bio (%)', 
                linewidth=2, color='#FFD700', alpha=0.8)
+        self._plot_band(ax, 'Qualite_Bio', '#FFD700')
         
         ax.set_title('Qualité et Composition Chimique', 
                     fontsize=12, fontweight='bold')
@@ -621,8 +1388,10 @@ class EssentialOilPharmacopoeiaAnalyzer:
         """Plot des applications thérapeutiques"""
         ax.plot(df['Annee'], df['Efficacite_Therapeutique'], label='Efficacité Thérapeutique', 
                linewidth=2, color='#8B4513', alpha=0.8)
+        self._plot_band(ax, 'Efficacite_Therapeutique', '#8B4513')
         ax.plot(df['Annee'], df['Demande_Therapeutique'], label='Demande Thérapeutique', 
                linewidth=2, color='#228B22', alpha=0.8)
+        self._plot_band(ax, 'Demande_Therapeutique', '#228B22')
         
         ax.set_title('Applications Thérapeutiques', 
                     fontsize=12, fontweight='bold')
@@ -660,6 +1429,7 @@ class EssentialOilPharmacopoeiaAnalyzer:
         """Plot de l'économie du marché"""
         ax.plot(df['Annee'], df['Valeur_Marche'], label='Valeur de Marché (M€)', 
                linewidth=2, color='#8B4513', alpha=0.8)
+        self._plot_band(ax, 'Valeur_Marche', '#8B4513')
         
         ax.set_title('Économie du Marché', fontsize=12, fontweight='bold')
         ax.set_ylabel('Valeur (M€)', color='#8B4513')
@@ -670,6 +1440,7 @@ class EssentialOilPharmacopoeiaAnalyzer:
         ax2 = ax.twinx()
         ax2.plot(df['Annee'], df['Croissance_Marche'], label='Croissance du Marché (%)', 
                 linewidth=2, color='#228B22', linestyle='--')
+        self._plot_band(ax2, 'Croissance_Marche', '#228B22')
         ax2.set_ylabel('Croissance (%)', color='#228B22')
         ax2.tick_params(axis='y', labelcolor='#228B22')
         
@@ -690,6 +1461,7 @@ class EssentialOilPharmacopoeiaAnalyzer:
         ax2 = ax.twinx()
         ax2.plot(df['Annee'], df['Efficacite_Therapeutique'], label='Efficacité Thérapeutique', 
                 linewidth=2, color='#FF6B6B')
+        self._plot_band(ax2, 'Efficacite_Therapeutique', '#FF6B6B')
         ax2.set_ylabel('Efficacité (0-100)')
         
         lines1, labels1 = ax.get_legend_handles_labels()
@@ -700,8 +1472,10 @@ class EssentialOilPharmacopoeiaAnalyzer:
         """Plot de la durabilité environnementale"""
         ax.plot(df['Annee'], df['Durabilite_Production'], label='Durabilité Production', 
                linewidth=2, color='#228B22', alpha=0.8)
+        self._plot_band(ax, 'Durabilite_Production', '#228B22')
         ax.plot(df['Annee'], df['Impact_Environnemental'], label='Impact Environnemental', 
                linewidth=2, color='#FF6B6B', alpha=0.8)
+        self._plot_band(ax, 'Impact_Environnemental', '#FF6B6B')
         
         ax.set_title('Durabilité Environnementale', 
                     fontsize=12, fontweight='bold')
@@ -730,95 +1504,2301 @@ class EssentialOilPharmacopoeiaAnalyzer:
         ax.legend()
         ax.grid(True, alpha=0.3)
     
-    def _generate_pharmacopoeia_insights(self, df):
-        """Génère des insights analytiques"""
-        print(f"🌿 INSIGHTS PHARMACOPÉE - Huile Essentielle de {self.oil}")
-        print("=" * 60)
+    def insights(self, df):
+        """Statistiques de synthèse de toutes les métriques (voir compute_insights)"""
+        return compute_insights(df)
+    
+    def format_insights(self, insights):
+        """Met en forme les statistiques de compute_insights en rapport texte"""
+        at = insights.at
+        lines = [f"🌿 INSIGHTS PHARMACOPÉE - Huile Essentielle de {self.oil}", "=" * 60]
         
         # 1. Statistiques de base
-        print("\n1. 📊 STATISTIQUES GÉNÉRALES:")
-        avg_production = df['Production_Mondiale'].mean()
-        avg_price = df['Prix_Moyen'].mean()
-        avg_market_value = df['Valeur_Marche'].mean()
-        avg_studies = df['Etudes_Scientifiques'].mean()
-        
-        print(f"Production moyenne annuelle: {avg_production:.0f} tonnes")
-        print(f"Prix moyen: {avg_price:.1f} €/kg")
-        print(f"Valeur moyenne du marché: {avg_market_value:.1f} M€")
-        print(f"Études scientifiques moyennes: {avg_studies:.0f}")
+        lines.append("\n1. 📊 STATISTIQUES GÉNÉRALES:")
+        lines.append(f"Production moyenne annuelle: {at['Production_Mondiale', 'moyenne']:.0f} tonnes")
+        lines.append(f"Prix moyen: {at['Prix_Moyen', 'moyenne']:.1f} €/kg")
+        lines.append(f"Valeur moyenne du marché: {at['Valeur_Marche', 'moyenne']:.1f} M€")
+        lines.append(f"Études scientifiques moyennes: {at['Etudes_Scientifiques', 'moyenne']:.0f}")
         
         # 2. Croissance
-        print("\n2. 📈 TAUX DE CROISSANCE:")
-        production_growth = ((df['Production_Mondiale'].iloc[-1] / 
-                            df['Production_Mondiale'].iloc[0]) - 1) * 100
-        market_growth = ((df['Valeur_Marche'].iloc[-1] / 
-                         df['Valeur_Marche'].iloc[0]) - 1) * 100
-        
-        print(f"Croissance de la production ({self.start_year}-{self.end_year}): {production_growth:.1f}%")
-        print(f"Croissance de la valeur du marché: {market_growth:.1f}%")
+        lines.append("\n2. 📈 TAUX DE CROISSANCE:")
+        lines.append(f"Croissance de la production ({self.start_year}-{self.end_year}): "
+                     f"{at['Production_Mondiale', 'croissance']:.1f}%")
+        lines.append(f"Croissance de la valeur du marché: {at['Valeur_Marche', 'croissance']:.1f}%")
         
         # 3. Qualité et composition
-        print("\n3. 🔬 QUALITÉ ET COMPOSITION:")
-        avg_compounds = df['Teneur_Principes_Actifs'].mean()
-        avg_purity = df['Pureté_Chimique'].mean()
-        avg_bio = df['Qualite_Bio'].mean()
-        
-        print(f"Teneur moyenne en principes actifs: {avg_compounds:.1f}%")
-        print(f"Pureté chimique moyenne: {avg_purity:.1f}%")
-        print(f"Part moyenne de qualité bio: {avg_bio:.1f}%")
+        lines.append("\n3. 🔬 QUALITÉ ET COMPOSITION:")
+        lines.append(f"Teneur moyenne en principes actifs: {at['Teneur_Principes_Actifs', 'moyenne']:.1f}%")
+        lines.append(f"Pureté chimique moyenne: {at['Pureté_Chimique', 'moyenne']:.1f}%")
+        lines.append(f"Part moyenne de qualité bio: {at['Qualite_Bio', 'moyenne']:.1f}%")
         
         # 4. Applications thérapeutiques
-        print("\n4. 💊 APPLICATIONS THÉRAPEUTIQUES:")
-        avg_efficacy = df['Efficacite_Therapeutique'].mean()
-        total_studies = df['Etudes_Scientifiques'].sum()
-        last_efficacy = df['Efficacite_Therapeutique'].iloc[-1]
-        
-        print(f"Efficacité thérapeutique moyenne: {avg_efficacy:.1f}/100")
-        print(f"Total d'études scientifiques: {total_studies:.0f}")
-        print(f"Dernière efficacité mesurée: {last_efficacy:.1f}/100")
+        lines.append("\n4. 💊 APPLICATIONS THÉRAPEUTIQUES:")
+        lines.append(f"Efficacité thérapeutique moyenne: {at['Efficacite_Therapeutique', 'moyenne']:.1f}/100")
+        lines.append(f"Total d'études scientifiques: {at['Etudes_Scientifiques', 'total']:.0f}")
+        lines.append(f"Dernière efficacité mesurée: {at['Efficacite_Therapeutique', 'dernier']:.1f}/100")
         
         # 5. Spécificités de l'huile
-        print(f"\n5. 🌟 SPÉCIFICITÉS DE L'HUILE DE {self.oil.upper()}:")
-        print(f"Type: {self.config['type']}")
-        print(f"Propriétés: {', '.join(self.config['proprietes'])}")
-        print(f"Régions de production: {', '.join(self.config['regions'])}")
-        print(f"Rendement: {self.config['rendement']*100:.1f}%")
+        lines.append(f"\n5. 🌟 SPÉCIFICITÉS DE L'HUILE DE {self.oil.upper()}:")
+        lines.append(f"Type: {self.config['type']}")
+        lines.append(f"Propriétés: {', '.join(self.config['proprietes'])}")
+        lines.append(f"Régions de production: {', '.join(self.config['regions'])}")
+        lines.append(f"Rendement: {self.config['rendement']*100:.1f}%")
         
         # 6. Évolutions marquantes
-        print("\n6. 📅 ÉVOLUTIONS MARQUANTES:")
-        print("• 2000-2005: Début de popularité et reconnaissance")
-        print("• 2006-2010: Reconnaissance scientifique croissante")
-        print("• 2011-2015: Boom des produits naturels et bio")
-        print("• 2016-2020: Intégration dans l'industrie pharmaceutique")
-        print("• 2021-2025: Focus sur la durabilité et l'éthique")
+        lines.append("\n6. 📅 ÉVOLUTIONS MARQUANTES:")
+        lines.append("• 2000-2005: Début de popularité et reconnaissance")
+        lines.append("• 2006-2010: Reconnaissance scientifique croissante")
+        lines.append("• 2011-2015: Boom des produits naturels et bio")
+        lines.append("• 2016-2020: Intégration dans l'industrie pharmaceutique")
+        lines.append("• 2021-2025: Focus sur la durabilité et l'éthique")
         
         # 7. Recommandations stratégiques
-        print("\n7. 💡 RECOMMANDATIONS STRATÉGIQUES:")
+        lines.append("\n7. 💡 RECOMMANDATIONS STRATÉGIQUES:")
         if "relaxante" in self.config["proprietes"]:
-            print("• Développer les applications bien-être et relaxation")
-            print("• Collaborer avec les centres de spa et thalassothérapie")
+            lines.append("• Développer les applications bien-être et relaxation")
+            lines.append("• Collaborer avec les centres de spa et thalassothérapie")
         if "antiseptique" in self.config["proprietes"]:
-            print("• Promouvoir les usages en désinfection naturelle")
-            print("• Développer les formulations pour soins cutanés")
+            lines.append("• Promouvoir les usages en désinfection naturelle")
+            lines.append("• Développer les formulations pour soins cutanés")
         if "digestive" in self.config["proprietes"]:
-            print("• Explorer les applications en gastro-entérologie")
-            print("• Développer les compléments alimentaires naturels")
+            lines.append("• Explorer les applications en gastro-entérologie")
+            lines.append("• Développer les compléments alimentaires naturels")
+        
+        lines.append("• Investir dans la recherche clinique et scientifique")
+        lines.append("• Développer l'agriculture biologique et durable")
+        lines.append("• Renforcer la traçabilité et la qualité des produits")
+        lines.append("• Explorer les synergies avec d'autres huiles essentielles")
+        lines.append("• Développer les applications en médecine intégrative")
+        return "\n".join(lines)
+    
+    def _generate_pharmacopoeia_insights(self, df):
+        """Génère des insights analytiques"""
+        print(self.format_insights(self.insights(df)))
+
+
+# Statistiques de synthèse calculées pour chaque métrique
+INSIGHT_STATISTICS = ['moyenne', 'total', 'premier', 'dernier', 'croissance', 'tcac']
+
+
+def _annual_means(cube, years):
+    """Moyennes annuelles d'un cube (... × périodes × métriques) dont les périodes sont triées"""
+    years = np.asarray(years)
+    starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+    if len(starts) == len(years):
+        return cube
+    counts = np.diff(np.r_[starts, len(years)])
+    return np.add.reduceat(cube, starts, axis=-2) / counts[:, None]
+
+
+def _summary_statistics(cube):
+    """Réduit un cube (... × années × métriques) en (... × métriques × statistiques).
+    
+    Une seule somme par cellule donne moyenne et total ; premier et dernier
+    sont des lectures directes d'où se déduisent croissance et TCAC (%).
+    """
+    n_years = cube.shape[-2]
+    total = cube.sum(axis=-2)
+    first, last = cube[..., 0, :], cube[..., -1, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = last / first
+        cagr = (ratio ** (1 / (n_years - 1)) - 1) * 100 if n_years > 1 else np.full_like(ratio, np.nan)
+    return np.stack([total / n_years, total, first, last, (ratio - 1) * 100, cagr], axis=-1)
+
+
+def compute_insights(data, oils=None, years=None):
+    """Statistiques de synthèse de toutes les métriques, en une réduction vectorisée.
+    
+    `data` peut être :
+    - le DataFrame d'une huile (generate_pharmacopoeia_data) -> DataFrame
+      métriques × statistiques ;
+    - le DataFrame du catalogue indexé par (Huile, Annee|Date), ou un cube
+      huiles × périodes × métriques accompagné de `oils` et `years` (année de
+      chaque période) -> DataFrame indexé par (Huile, Metrique) ;
+    - un ensemble (dict statistique -> l'un des formats précédents) -> dict
+      des résultats.
+    
+    Les grilles infra-annuelles sont d'abord ramenées en moyennes annuelles.
+    """
+    if isinstance(data, dict):
+        return {name: compute_insights(values, oils, years) for name, values in data.items()}
+    
+    if isinstance(data, pd.DataFrame) and 'Huile' not in data.index.names:
+        cube = data[METRIC_COLUMNS].to_numpy(dtype=float)[None]
+        stats = _summary_statistics(_annual_means(cube, data['Annee'].to_numpy()))[0]
+        return pd.DataFrame(stats, index=pd.Index(METRIC_COLUMNS, name='Metrique'), columns=INSIGHT_STATISTICS)
+    
+    if isinstance(data, pd.DataFrame):
+        oils = list(data.index.unique(level='Huile'))
+        periods = data.index.unique(level=1)
+        years = periods.year if isinstance(periods, pd.DatetimeIndex) else periods
+        data = data[METRIC_COLUMNS].to_numpy(dtype=float).reshape(len(oils), len(periods), -1)
+    
+    stats = _summary_statistics(_annual_means(data, years))
+    index = pd.MultiIndex.from_product([oils, METRIC_COLUMNS], names=['Huile', 'Metrique'])
+    return pd.DataFrame(stats.reshape(-1, len(INSIGHT_STATISTICS)), index=index, columns=INSIGHT_STATISTICS)
+
+
+# Trajectoires comparées pour la similarité entre huiles (production, prix, usages)
+SIMILARITY_METRICS = ['Production_Mondiale', 'Prix_Moyen', 'Usage_Aromatherapie', 'Usage_Cosmetique',
+                      'Usage_Pharmaceutique', 'Usage_Alimentaire']
+
+
+def _standardize(values, axis):
+    """Centre values le long de `axis` et le ramène à une norme unité (0 si constant)"""
+    values = values - values.mean(axis=axis, keepdims=True)
+    norm = np.sqrt((values * values).sum(axis=axis, keepdims=True))
+    return np.divide(values, norm, out=np.zeros_like(values), where=norm > 0)
+
+
+def metric_correlations(cube, oils, block=1024):
+    """Corrélations entre métriques au sein de chaque huile.
+    
+    Retourne un DataFrame indexé par (Huile, Metrique) × métriques : une
+    matrice de corrélation 20 × 20 par huile, calculée par lots d'huiles
+    (produit einsum sur les trajectoires centrées-réduites).
+    """
+    correlations = np.empty((len(oils), cube.shape[2], cube.shape[2]))
+    for start in range(0, len(oils), block):
+        z = _standardize(cube[start:start + block].astype(float), axis=1)
+        correlations[start:start + block] = np.einsum('opm,opn->omn', z, z)
+    index = pd.MultiIndex.from_product([oils, METRIC_COLUMNS], names=['Huile', 'Metrique'])
+    return pd.DataFrame(correlations.reshape(-1, cube.shape[2]), index=index, columns=METRIC_COLUMNS)
+
+
+def oil_correlations(cube, oils, metric=None, block=1024):
+    """Corrélations entre huiles (huiles × huiles).
+    
+    Pour une `metric` donnée, corrélation de ses trajectoires d'une huile à
+    l'autre ; sans métrique, moyenne des corrélations sur les 20 métriques.
+    La matrice est remplie par blocs de lignes (produits matriciels).
+    """
+    columns = [METRIC_COLUMNS.index(metric)] if metric else slice(None)
+    z = _standardize(cube[:, :, columns].astype(float), axis=1)
+    z = z.reshape(len(oils), -1) / np.sqrt(z.shape[2])
+    correlations = np.empty((len(oils), len(oils)))
+    for start in range(0, len(oils), block):
+        correlations[start:start + block] = z[start:start + block] @ z.T
+    return pd.DataFrame(correlations, index=pd.Index(oils, name='Huile'), columns=oils)
+
+
+def _trajectory_features(cube, metrics):
+    """Trajectoires rapportées à leur moyenne (forme sans échelle), concaténées par huile"""
+    trajectories = cube[:, :, [METRIC_COLUMNS.index(metric) for metric in metrics]].astype(float)
+    means = trajectories.mean(axis=1, keepdims=True)
+    shapes = np.divide(trajectories, means, out=np.zeros_like(trajectories), where=means != 0) - 1
+    return shapes.reshape(len(cube), -1)
+
+
+def _distance_blocks(features, block):
+    """Distances quadratiques moyennes entre trajectoires, par blocs de lignes : (début, bloc)"""
+    squares = (features * features).sum(axis=1)
+    for start in range(0, len(features), block):
+        d2 = squares[start:start + block, None] + squares[None, :] - 2 * features[start:start + block] @ features.T
+        yield start, np.sqrt(np.maximum(d2, 0) / features.shape[1])
+
+
+def oil_distances(cube, oils, metrics=SIMILARITY_METRICS, block=1024):
+    """Distance entre les courbes des huiles (huiles × huiles, 0 = dynamiques identiques).
+    
+    Chaque trajectoire (production, prix, usages par défaut) est rapportée à
+    sa moyenne ; la distance est l'écart quadratique moyen entre ces formes.
+    """
+    distances = np.empty((len(oils), len(oils)))
+    for start, values in _distance_blocks(_trajectory_features(cube, metrics), block):
+        distances[start:start + len(values)] = values
+    np.fill_diagonal(distances, 0)
+    return pd.DataFrame(distances, index=pd.Index(oils, name='Huile'), columns=oils)
+
+
+def nearest_oils(cube, oils, k=5, metrics=SIMILARITY_METRICS, block=1024):
+    """Les k huiles aux dynamiques les plus proches de chacune, sans matrice complète.
+    
+    Seul un bloc de lignes de la matrice des distances existe à la fois :
+    la mémoire reste en O(block × huiles) pour des milliers d'huiles.
+    """
+    k = min(k, len(oils) - 1)
+    neighbours = np.empty((len(oils), k), dtype=np.intp)
+    distances = np.empty((len(oils), k))
+    for start, values in _distance_blocks(_trajectory_features(cube, metrics), block):
+        rows = np.arange(len(values))
+        values[rows, start + rows] = np.inf
+        nearest = np.argpartition(values, k - 1, axis=1)[:, :k]
+        order = np.argsort(values[rows[:, None], nearest], axis=1)
+        nearest = np.take_along_axis(nearest, order, axis=1)
+        neighbours[start:start + len(values)] = nearest
+        distances[start:start + len(values)] = values[rows[:, None], nearest]
+    
+    index = pd.MultiIndex.from_product([oils, range(1, k + 1)], names=['Huile', 'Rang'])
+    return pd.DataFrame({'Voisin': np.asarray(oils, dtype=object)[neighbours.ravel()],
+                         'Distance': distances.ravel()}, index=index)
+
+
+def render_heatmap(matrix, output_file, title, cmap='viridis', label='', dpi=150):
+    """Carte de chaleur d'une matrice (DataFrame carré), rendue sans pyplot"""
+    from matplotlib.figure import Figure
+    
+    size = min(4 + 0.25 * len(matrix), 30)
+    fig = Figure(figsize=(size + 2, size))
+    ax = fig.add_subplot(1, 1, 1)
+    image = ax.imshow(matrix.to_numpy(), cmap=cmap, aspect='auto', interpolation='nearest')
+    fig.colorbar(image, ax=ax, label=label)
+    
+    # Étiquettes lisibles jusqu'à une soixantaine de lignes
+    if len(matrix) <= 60:
+        ax.set_xticks(range(len(matrix.columns)))
+        ax.set_xticklabels(matrix.columns, rotation=90, fontsize=8)
+        ax.set_yticks(range(len(matrix.index)))
+        ax.set_yticklabels(matrix.index, fontsize=8)
+    ax.set_title(title, fontweight='bold')
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=dpi, bbox_inches='tight')
+    return output_file
+
+
+def render_catalogue_dashboard(cube, oils, periods, metric='Production_Mondiale', output_file=None, columns=None,
+                               sharey=False, dpi=100):
+    """Petits multiples d'une métrique pour toutes les huiles, dans une seule figure.
+    
+    Les cellules de la grille partagent un unique Axes : courbes, aires et
+    cadres de toutes les huiles sont trois collections (LineCollection,
+    PolyCollection), si bien que des centaines d'huiles se rendent en une
+    seconde environ. Les grilles infra-annuelles sont tracées en moyennes
+    annuelles ; chaque cellule va de 0 au maximum de son huile, ou au
+    maximum du catalogue avec `sharey`. Les courbes en hausse sur la période
+    sont vertes, celles en baisse brunes.
+    """
+    from matplotlib.collections import LineCollection, PolyCollection
+    from matplotlib.figure import Figure
+    
+    years = np.asarray(periods.year if isinstance(periods, pd.DatetimeIndex) else periods)
+    m = METRIC_COLUMNS.index(metric)
+    values = _annual_means(cube[:, :, m:m + 1].astype(float), years)[:, :, 0]        # huiles × années
+    annual = np.unique(years)
+    n_oils = len(oils)
+    columns = columns or max(1, int(np.ceil(np.sqrt(1.5 * n_oils))))
+    rows = -(-n_oils // columns)
+    
+    # Coordonnées dans la grille : l'huile i occupe la cellule [colonne, colonne + 1] × [ligne, ligne + 1]
+    col = np.arange(n_oils) % columns
+    row = rows - 1 - np.arange(n_oils) // columns
+    top = np.full(n_oils, np.nanmax(values)) if sharey else np.nanmax(values, axis=1)
+    scale = np.where(top > 0, top, 1.0)
+    x = col[:, None] + 0.06 + 0.88 * (annual - annual[0]) / max(annual[-1] - annual[0], 1)
+    floor = row[:, None] + 0.08 + np.zeros_like(x)
+    y = floor + 0.64 * np.clip(values / scale[:, None], 0, None)
+    curves = np.stack([x, y], axis=-1)
+    areas = np.concatenate([curves, np.stack([x, floor], axis=-1)[:, ::-1]], axis=1)
+    frames = np.stack([np.stack([col + dx, row + dy], axis=-1)
+                       for dx, dy in ((0.02, 0.02), (0.98, 0.02), (0.98, 0.98), (0.02, 0.98))], axis=1)
+    rising = values[:, -1] >= values[:, 0]
+    colors = np.where(rising, '#228B22', '#8B4513')
+    
+    fig = Figure(figsize=(1.6 * columns, 1.0 * rows + 0.6))
+    ax = fig.add_axes([0, 0, 1, rows / (rows + 0.6)])
+    ax.set_xlim(0, columns)
+    ax.set_ylim(0, rows)
+    ax.set_axis_off()
+    ax.add_collection(PolyCollection(frames, facecolors='none', edgecolors='#CCCCCC', linewidths=0.5))
+    ax.add_collection(PolyCollection(areas, facecolors=colors, edgecolors='none', alpha=0.2))
+    ax.add_collection(LineCollection(curves, colors=colors, linewidths=1.0))
+    for oil, c, r, last in zip(oils, col.tolist(), row.tolist(), values[:, -1].tolist()):
+        ax.text(c + 0.06, r + 0.9, oil, fontsize=7, va='top', clip_on=True)
+        ax.text(c + 0.94, r + 0.9, f'{last:.3g}', fontsize=7, va='top', ha='right', color='#555555')
+    scale_label = "échelle commune" if sharey else "échelle propre à chaque huile (0 - max)"
+    fig.suptitle(f"{metric} - {n_oils} huiles, {annual[0]}-{annual[-1]} ({scale_label}, valeur finale)",
+                 fontweight='bold', y=1 - 0.2 / (rows + 0.6))
+    if output_file is not None:
+        fig.savefig(output_file, dpi=dpi)
+    return fig
+
+
+# Méthodes de prévision : lissage exponentiel amorti (ETS A,Ad,N) ou tendance quadratique régularisée
+FORECAST_METHODS = ('holt', 'ridge')
+FORECAST_VERSION = "1"
+
+# Grille de recherche du lissage de Holt : alpha, part de alpha pour beta, amortissement phi
+HOLT_GRID = np.array([(alpha, alpha * share, phi)
+                      for alpha in np.linspace(0.1, 1.0, 10)
+                      for share in (0.0, 0.05, 0.1, 0.2, 0.4)
+                      for phi in (0.8, 0.9, 0.98)])
+
+
+def _fit_holt(y, block=256):
+    """Lissage de Holt amorti de toutes les séries (séries × années).
+    
+    La récurrence est déroulée une fois pour un bloc de séries et toutes les
+    combinaisons de HOLT_GRID (en place, blocs tenant en cache) ; chaque
+    série garde celle de plus faible erreur.
+    """
+    alpha, beta, phi = (HOLT_GRID[:, i] for i in range(3))
+    fit = {name: np.empty(len(y)) for name in ('level', 'trend', 'alpha', 'beta', 'phi', 'sigma')}
+    for start in range(0, len(y), block):
+        values = y[start:start + block]
+        level = np.repeat(values[:, :1], len(HOLT_GRID), axis=1)
+        trend = np.repeat(values[:, 1:2] - values[:, :1], len(HOLT_GRID), axis=1)
+        sse, error, step = np.zeros_like(level), np.empty_like(level), np.empty_like(level)
+        for t in range(1, values.shape[1]):
+            # Prévision à un pas l + φb, puis correction du niveau et de la tendance par l'erreur
+            np.multiply(trend, phi, out=trend)
+            level += trend
+            np.subtract(values[:, t:t + 1], level, out=error)
+            np.multiply(error, error, out=step)
+            sse += step
+            np.multiply(error, alpha, out=step)
+            level += step
+            np.multiply(error, beta, out=step)
+            trend += step
+        
+        best = sse.argmin(axis=1)
+        rows = np.arange(len(values))
+        chunk = slice(start, start + len(values))
+        fit['level'][chunk], fit['trend'][chunk] = level[rows, best], trend[rows, best]
+        fit['alpha'][chunk], fit['beta'][chunk], fit['phi'][chunk] = alpha[best], beta[best], phi[best]
+        fit['sigma'][chunk] = np.sqrt(sse[rows, best] / max(values.shape[1] - 4, 1))
+    return fit
+
+
+def _ridge_design(n, penalty):
+    """Base (1, τ, τ²) avec τ = 0 à la dernière année, et inverse de la matrice régularisée"""
+    tau = (np.arange(n) - (n - 1)) / max(n - 1, 1)
+    design = np.column_stack([np.ones(n), tau, tau * tau])
+    inverse = np.linalg.inv(design.T @ design + np.diag([0.0, 0.0, penalty]))
+    return design, inverse
+
+
+def _fit_ridge(y, penalty=10.0):
+    """Tendance quadratique à courbure pénalisée, ajustée à toutes les séries par un seul produit"""
+    design, inverse = _ridge_design(y.shape[1], penalty)
+    coef = y @ design @ inverse
+    residuals = y - coef @ design.T
+    dof = y.shape[1] - np.trace(design @ inverse @ design.T)
+    return {'coef': coef, 'sigma': np.sqrt((residuals * residuals).sum(axis=1) / max(dof, 1)),
+            'penalty': penalty}
+
+
+_FORECAST_FITTERS = {'holt': _fit_holt, 'ridge': _fit_ridge}
+
+
+def _fit_forecast_chunk(values, method, options):
+    """Ajuste un lot de séries (processus de travail) ; les séries positives sont modélisées en log"""
+    log = (values > 0).all(axis=1)
+    y = np.where(log[:, None], np.log(np.where(values > 0, values, 1)), values)
+    model = _FORECAST_FITTERS[method](y, **options)
+    model.update(method=method, n=values.shape[1], log=log)
+    return model
+
+
+def fit_forecast_models(series, method='holt', workers=1, chunk_series=4096, cache=None, **options):
+    """Ajuste un modèle de prévision par série (séries × années annuelles).
+    
+    Les séries sont réparties par lots sur un pool de `workers` processus ;
+    avec un `cache` (PharmacopoeiaCache), les modèles ajustés sont conservés
+    sous le hash des séries et des options et ne sont pas réajustés.
+    Retourne un dict de tableaux (une ligne par série).
+    """
+    if method not in FORECAST_METHODS:
+        raise ValueError(f"méthode de prévision inconnue: {method}")
+    series = np.asarray(series, dtype=np.float64)
+    
+    key = cache.model_key(method, series, options) if cache is not None else None
+    if key is not None:
+        model = cache.get_model(key)
+        if model is not None:
+            return model
+    
+    chunks = [series[start:start + chunk_series] for start in range(0, len(series), chunk_series)]
+    with _span('forecast_fit', method=method, series=len(series)):
+        if workers > 1 and len(chunks) > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                models = list(executor.map(_fit_forecast_chunk, chunks,
+                                           [method] * len(chunks), [options] * len(chunks)))
+        else:
+            models = [_fit_forecast_chunk(chunk, method, options) for chunk in chunks]
+    
+    # Tableaux par série concaténés, paramètres communs repris du premier lot
+    model = {name: np.concatenate([chunk[name] for chunk in models]) if isinstance(value, np.ndarray)
+             else value for name, value in models[0].items()}
+    if key is not None:
+        cache.put_model(key, model)
+    return model
+
+
+def forecast_series(model, horizon, level=0.95):
+    """Prévisions (médiane, borne basse, borne haute) de chaque série sur `horizon` années"""
+    h = np.arange(1, horizon + 1)
+    if model['method'] == 'holt':
+        phi = model['phi'][:, None]
+        damped = np.cumsum(phi ** h, axis=1)
+        mean = model['level'][:, None] + damped * model['trend'][:, None]
+        # Variance de l'ETS(A,Ad,N) : σ²(1 + Σ_{j<h} (α + β φ_j)²)
+        weights = (model['alpha'][:, None] + model['beta'][:, None] * damped[:, :-1]) ** 2
+        variance = 1 + np.column_stack([np.zeros(len(phi)), np.cumsum(weights, axis=1)])
+    else:
+        n = model['n']
+        design, inverse = _ridge_design(n, model['penalty'])
+        tau = h / max(n - 1, 1)
+        future = np.column_stack([np.ones(horizon), tau, tau * tau])
+        mean = model['coef'] @ future.T
+        covariance = inverse @ design.T @ design @ inverse
+        variance = np.broadcast_to(1 + np.einsum('hi,ij,hj->h', future, covariance, future), mean.shape)
+    
+    spread = statistics.NormalDist().inv_cdf((1 + level) / 2) * model['sigma'][:, None] * np.sqrt(variance)
+    low, high = mean - spread, mean + spread
+    log = model['log'][:, None]
+    return tuple(np.where(log, np.exp(values), values) for values in (mean, low, high))
+
+
+def _forecast_columns():
+    return METRIC_COLUMNS + [f'{m}_bas' for m in METRIC_COLUMNS] + [f'{m}_haut' for m in METRIC_COLUMNS]
+
+
+# Paliers de sortie des graphiques : résolutions raster (dpi) et formats vectoriels
+OUTPUT_TIERS = {'thumbnail': 40, 'screen': 100, 'print': 300}
+VECTOR_FORMATS = ('svg', 'pdf')
+
+# Encodeurs PNG des paliers (threads : PIL libère le GIL pendant la réduction et la compression)
+_ENCODER_POOL = None
+
+
+def _encoder_pool():
+    global _ENCODER_POOL
+    if _ENCODER_POOL is None:
+        _ENCODER_POOL = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(len(OUTPUT_TIERS), os.cpu_count() or 1), thread_name_prefix='png')
+    return _ENCODER_POOL
+
+
+def _rasterize(fig, dpi, tight=True, pad_inches=0.1):
+    """Rend la figure une seule fois (Agg) à `dpi` : tableau RGBA, recadré comme bbox_inches='tight'"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    
+    canvas, original_dpi = fig.canvas, fig.dpi
+    try:
+        agg = FigureCanvasAgg(fig)
+        fig.dpi = dpi
+        agg.draw()
+        image = np.asarray(agg.buffer_rgba())
+        if not tight:
+            return image.copy()
+        # Boîte englobante en pouces (origine en bas à gauche), bornée à la toile
+        bbox = fig.get_tightbbox(agg.get_renderer()).padded(pad_inches)
+        height, width = image.shape[:2]
+        x0, x1 = max(int(np.floor(bbox.x0 * dpi)), 0), min(int(np.ceil(bbox.x1 * dpi)), width)
+        y0, y1 = max(int(np.floor(bbox.y0 * dpi)), 0), min(int(np.ceil(bbox.y1 * dpi)), height)
+        return image[height - y1:height - y0, x0:x1].copy()
+    finally:
+        fig.dpi = original_dpi
+        fig.set_canvas(canvas)
+
+
+def _encode_tier(picture, size, dpi, path):
+    """Réduit l'image à `size` et l'écrit en PNG (thread d'encodage).
+    
+    La réduction se fait d'abord par facteur entier (moyenne de blocs, le
+    suréchantillonnage classique), puis par filtre de Lanczos pour le reste.
+    """
+    from PIL import Image
+    
+    factor = min(picture.width // size[0], picture.height // size[1])
+    if factor > 1:
+        picture = picture.reduce(factor)
+    if picture.size != size:
+        picture = picture.resize(size, Image.Resampling.LANCZOS)
+    picture.save(path, format='png', dpi=(dpi, dpi))
+    return path
+
+
+def save_figure_tiers(fig, output_stem, tiers, tight=True, oil=None):
+    """Écrit une figure à plusieurs paliers de sortie ; retourne le dict palier -> chemin.
+    
+    Les paliers raster (OUTPUT_TIERS : <output_stem>_<palier>.png) sont
+    tirés d'un seul rendu Agg à la plus haute résolution demandée, réduit
+    pour les autres, et encodés en parallèle hors du thread principal
+    pendant que celui-ci écrit les formats vectoriels (VECTOR_FORMATS :
+    <output_stem>.svg, .pdf).
+    """
+    unknown = [tier for tier in tiers if tier not in OUTPUT_TIERS and tier not in VECTOR_FORMATS]
+    if unknown:
+        raise ValueError(f"palier inconnu: {', '.join(unknown)} "
+                         f"(paliers: {', '.join(list(OUTPUT_TIERS) + list(VECTOR_FORMATS))})")
+    raster = sorted({tier for tier in tiers if tier in OUTPUT_TIERS}, key=OUTPUT_TIERS.get, reverse=True)
+    outputs, futures = {}, []
+    if raster:
+        top = OUTPUT_TIERS[raster[0]]
+        from PIL import Image
+        
+        with _span('rasterize', oil, dpi=top):
+            image = _rasterize(fig, top, tight)
+            # Fond opaque (cas courant) : le canal alpha est abandonné, réductions et encodages plus rapides
+            picture = Image.fromarray(image, 'RGBA')
+            if image[..., 3].min() == 255:
+                picture = picture.convert('RGB')
+        for tier in raster:
+            scale = OUTPUT_TIERS[tier] / top
+            size = (max(round(picture.width * scale), 1), max(round(picture.height * scale), 1))
+            outputs[tier] = f'{output_stem}_{tier}.png'
+            futures.append(_encoder_pool().submit(_encode_tier, picture, size, OUTPUT_TIERS[tier], outputs[tier]))
+    
+    for fmt in VECTOR_FORMATS:
+        if fmt in tiers:
+            outputs[fmt] = f'{output_stem}.{fmt}'
+            with _span('savefig', oil, format=fmt):
+                fig.savefig(outputs[fmt], format=fmt, bbox_inches='tight' if tight else None)
+    with _span('encode', oil, tiers=len(futures)):
+        for future in futures:
+            future.result()
+    return outputs
+
+
+class PharmacopoeiaFigureRenderer:
+    """Rendu headless (Agg) réutilisant une seule figure 8 panneaux pour toutes les huiles.
+    
+    La mise en page, les axes jumeaux et les légendes sont construits au
+    premier rendu ; les rendus suivants ne mettent à jour que les données des
+    courbes et des barres. La mémoire reste constante quel que soit le nombre
+    d'huiles rendues.
+    """
+    
+    # Séries de chaque axe, dans l'ordre de création des axes (jumeaux compris)
+    # et des artistes par les méthodes _plot_*
+    AXES_SERIES = [
+        ('lines', ['Production_Mondiale', 'Demande_Mondiale']),               # 1. Production et marché
+        ('lines', ['Prix_Moyen']),
+        ('lines', ['Teneur_Principes_Actifs', 'Pureté_Chimique', 'Qualite_Bio']),  # 2. Qualité
+        ('lines', ['Efficacite_Therapeutique', 'Demande_Therapeutique']),     # 3. Thérapeutique
+        ('bars', ['Etudes_Scientifiques']),
+        ('stacked', ['Usage_Aromatherapie', 'Usage_Cosmetique',              # 4. Secteurs
+                     'Usage_Pharmaceutique', 'Usage_Alimentaire']),
+        ('lines', ['Valeur_Marche']),                                         # 5. Économie
+        ('lines', ['Croissance_Marche']),
+        ('bars', ['Etudes_Scientifiques']),                                   # 6. Recherche
+        ('lines', ['Efficacite_Therapeutique']),
+        ('lines', ['Durabilite_Production', 'Impact_Environnemental']),       # 7. Durabilité
+        ('normalized', [('Production_Mondiale', None), ('Prix_Moyen', None),  # 8. Évolution globale
+                        ('Efficacite_Therapeutique', 100), ('Etudes_Scientifiques', None)]),
+    ]
+    
+    def __init__(self, dpi=300, style='seaborn-v0_8'):
+        self.dpi = dpi
+        self.style = style
+        self.figure = None
+        self._years = None
+        self.renders = 0
+    
+    def render(self, analyzer, df, output_file=None, bands=None, forecast=None, tiers=None, dpi=None):
+        """Rend l'analyse d'une huile et retourne le chemin du fichier produit.
+        
+        Avec `tiers` (paliers de OUTPUT_TIERS / VECTOR_FORMATS), la figure est
+        écrite à chaque palier par save_figure_tiers et le dict palier -> chemin
+        est retourné à la place. `dpi` remplace la résolution du rendu pour cet
+        enregistrement seulement : la même figure sert toutes les résolutions.
+        """
+        output_file = output_file or f'{analyzer.oil}_pharmacopoeia_analysis.png'
+        years = df['Annee'].to_numpy()
+        analyzer._bands = bands
+        analyzer._forecast = forecast
+        
+        title = (f'Analyse Pharmacopée - Huile Essentielle de {analyzer.oil} '
+                 f'({analyzer.start_year}-{analyzer.end_year})')
+        
+        import matplotlib.style
+        
+        with matplotlib.style.context(self.style):
+            if self.figure is None or not np.array_equal(years, self._years):
+                self._build(analyzer, df, title)
+            else:
+                with _span('figure_update', analyzer.oil):
+                    self._update(analyzer, df)
+                    self._title.set_text(title)
+            if tiers:
+                output_file = save_figure_tiers(self.figure, os.path.splitext(output_file)[0], tiers,
+                                                oil=analyzer.oil)
+            else:
+                dpi = dpi or self.dpi
+                with _span('savefig', analyzer.oil, dpi=dpi):
+                    self.figure.savefig(output_file, dpi=dpi, bbox_inches='tight')
+        
+        self.renders += 1
+        return output_file
+    
+    def _build(self, analyzer, df, title):
+        """Construit la figure et ses 8 panneaux à partir des méthodes _plot_*"""
+        from matplotlib.figure import Figure
+        
+        self.close()
+        self.figure = Figure(figsize=(20, 24))
+        analyzer._draw_panels(self.figure, df)
+        self._title = self.figure.suptitle(title, fontsize=16, fontweight='bold')
+        with _span('tight_layout', analyzer.oil):
+            self.figure.tight_layout()
+        self._years = df['Annee'].to_numpy()
+    
+    def _update(self, analyzer, df):
+        """Remplace les données des artistes existants par celles de la nouvelle huile"""
+        for ax, (kind, series) in zip(self.figure.axes, self.AXES_SERIES):
+            # Les bandes d'incertitude et les prévisions sont retracées à chaque rendu
+            for collection in list(ax.collections):
+                collection.remove()
+            for line in [line for line in ax.lines if line.get_gid() == 'forecast']:
+                line.remove()
+            
+            if kind == 'lines':
+                for line, column in zip(ax.lines, series):
+                    line.set_ydata(df[column].to_numpy())
+            elif kind == 'normalized':
+                for line, (column, scale) in zip(ax.lines, series):
+                    values = df[column].to_numpy()
+                    line.set_ydata(values / (values.max() if scale is None else scale))
+            elif kind == 'bars':
+                for container, column in zip(ax.containers, series):
+                    for rect, height in zip(container, df[column].to_numpy()):
+                        rect.set_height(height)
+            elif kind == 'stacked':
+                bottom = np.zeros(len(df))
+                for container, column in zip(ax.containers, series):
+                    values = df[column].to_numpy()
+                    for rect, y, height in zip(container, bottom, values):
+                        rect.set_y(y)
+                        rect.set_height(height)
+                    bottom += values
+            
+            ax.relim()
+            if kind == 'lines':
+                for line, column in zip(ax.lines, series):
+                    analyzer._plot_band(ax, column, line.get_color())
+            ax.autoscale_view()
+    
+    def close(self):
+        """Libère la figure courante"""
+        if self.figure is not None:
+            self.figure.clear()
+        self.figure = None
+        self._years = None
+
+
+class EssentialOilCatalogueAnalyzer:
+    """Simule l'ensemble du catalogue d'huiles essentielles en une passe vectorisée"""
+    
+    def __init__(self, oils=None, seed=None, freq=ANNUAL_FREQ, registry=None, end_year=2025):
+        # Par défaut : le catalogue du menu, ou toutes les huiles d'un registre fourni
+        self.registry = registry or OIL_REGISTRY
+        if oils is None:
+            oils = HUILES_ESSENTIELLES if registry is None else registry.names
+        self.oils = list(oils)
+        
+        self.start_year = 2000
+        self.end_year = end_year
+        
+        # Fréquence de la grille de dates (annuelle par défaut, 'M', 'W', 'D'...)
+        self.freq = freq
+        self.dates = _date_grid(self.start_year, self.end_year, freq)
+        
+        # Graine optionnelle : flux aléatoires reproductibles par (huile, métrique, réplicat)
+        self.seed = seed
+        
+        # Paramètres de toutes les huiles lus dans le registre compilé, sans dict par huile
+        self.params = self.registry.params(self.oils)
+    
+    def generate_catalogue_data(self, dtype=np.float64, chunk_oils=4):
+        """Génère les données de toutes les huiles.
+        
+        Retourne le cube dense (huiles × périodes × métriques) et sa vue
+        DataFrame indexée par (Huile, Annee), ou (Huile, Date) sur une grille
+        infra-annuelle. Les huiles sont simulées par lots de chunk_oils pour
+        borner la mémoire intermédiaire sur les grilles fines ; dtype=np.float32
+        divise par deux la taille du cube.
+        """
+        print(f"🌿 Génération des données pharmacologiques pour {len(self.oils)} huiles...")
+        
+        t = _time_coordinate(self.dates)
+        trends = _trend_factors(t)
+        
+        # Cube huiles × périodes × métriques, rempli lot par lot
+        cube = np.empty((len(self.oils), len(t), len(METRIC_COLUMNS)), dtype=dtype)
+        for start in range(0, len(self.oils), chunk_oils):
+            stop = start + chunk_oils
+            params = {key: values[start:stop] for key, values in self.params.items()}
+            with _span('noise', oils=len(self.oils[start:stop])):
+                noise = _noise(self.seed, self.oils[start:stop], len(t), sigmas=params.get('sigmas'))[0]
+            with _span('simulation', oils=len(self.oils[start:stop])):
+                values = _deterministic_curves(params, t) * noise
+                values = values.transpose(0, 2, 1)
+                values *= trends
+                cube[start:stop] = values
+        
+        # Vue au format long : une ligne par (huile, période)
+        if _is_subannual(t):
+            index = pd.MultiIndex.from_product([self.oils, self.dates], names=['Huile', 'Date'])
+        else:
+            index = pd.MultiIndex.from_product([self.oils, np.asarray(self.dates.year, dtype=np.int64)],
+                                               names=['Huile', 'Annee'])
+        df = pd.DataFrame(cube.reshape(-1, len(METRIC_COLUMNS)), index=index, columns=METRIC_COLUMNS)
+        return cube, df
+    
+    def generate_catalogue_ensemble(self, n_replicates=10000, memory_budget_mb=256, n_bins=256):
+        """Ensemble Monte-Carlo de tout le catalogue : dict statistique -> cube huiles × années × métriques"""
+        print(f"🎲 Ensemble Monte-Carlo de {n_replicates} réplicats pour {len(self.oils)} huiles...")
+        
+        with _span('ensemble', oils=len(self.oils), replicates=n_replicates):
+            return _simulate_ensemble(self.oils, self.params, _time_coordinate(self.dates),
+                                      n_replicates, memory_budget_mb, n_bins, self.seed)
+    
+    def simulate_replicates(self, first, count):
+        """Régénère isolément les réplicats [first, first + count) : réplicats × huiles × périodes × métriques.
+        
+        Avec une graine, chaque réplicat est identique bit à bit quel que soit
+        le découpage ou le processus qui le calcule ; le réplicat 0 est celui
+        de generate_catalogue_data.
+        """
+        t = _time_coordinate(self.dates)
+        noise = _noise(self.seed, self.oils, len(t), first=first, count=count, sigmas=self.params.get('sigmas'))
+        values = _deterministic_curves(self.params, t)[None] * noise
+        return _apply_trends(np.ascontiguousarray(values.transpose(0, 1, 3, 2)), t)
+    
+    def oil_frame(self, cube, oil):
+        """Extrait du cube le DataFrame d'une huile, au format de generate_pharmacopoeia_data"""
+        return _period_frame(self.dates, cube[self.oils.index(oil)])
+    
+    def insights(self, cube):
+        """Statistiques de synthèse de chaque huile du cube (ou d'un ensemble de cubes)"""
+        return compute_insights(cube, self.oils, self.dates.year)
+    
+    def forecast(self, cube, horizon=10, method='holt', level=0.95, workers=1, cache=None):
+        """Prévision de chaque (huile, métrique) sur `horizon` années, en lots sur `workers` processus.
+        
+        Retourne un DataFrame indexé par (Huile, Annee) au format de
+        EssentialOilPharmacopoeiaAnalyzer.forecast.
+        """
+        years = np.unique(self.dates.year)
+        annual = _annual_means(cube, self.dates.year)
+        series = np.moveaxis(annual, 2, 1).reshape(-1, len(years))
+        with _span('forecast', oils=len(self.oils), horizon=horizon, method=method):
+            model = fit_forecast_models(series, method, workers, cache=cache)
+            paths = [values.reshape(len(self.oils), len(METRIC_COLUMNS), horizon)
+                     for values in forecast_series(model, horizon, level)]
+        values = np.concatenate(paths, axis=1).transpose(0, 2, 1).reshape(-1, 3 * len(METRIC_COLUMNS))
+        index = pd.MultiIndex.from_product([self.oils, years[-1] + np.arange(1, horizon + 1)],
+                                           names=['Huile', 'Annee'])
+        return pd.DataFrame(values, index=index, columns=_forecast_columns())
+    
+    def metric_correlations(self, cube):
+        """Matrices de corrélation entre métriques de chaque huile (voir metric_correlations)"""
+        return metric_correlations(cube, self.oils)
+    
+    def oil_correlations(self, cube, metric=None):
+        """Corrélations entre huiles, pour une métrique ou en moyenne (voir oil_correlations)"""
+        return oil_correlations(cube, self.oils, metric)
+    
+    def oil_distances(self, cube, metrics=SIMILARITY_METRICS):
+        """Distances entre les dynamiques des huiles (voir oil_distances)"""
+        return oil_distances(cube, self.oils, metrics)
+    
+    def nearest_oils(self, cube, k=5, metrics=SIMILARITY_METRICS):
+        """Les k huiles les plus proches de chacune (voir nearest_oils)"""
+        return nearest_oils(cube, self.oils, k, metrics)
+    
+    def dashboard(self, cube, metric='Production_Mondiale', output_file=None, **options):
+        """Petits multiples d'une métrique pour toutes les huiles (voir render_catalogue_dashboard)"""
+        return render_catalogue_dashboard(cube, self.oils, self.dates, metric, output_file, **options)
+
+
+# Paramètres d'un scénario : facteurs sur la configuration de l'huile (1.3 = +30 %)
+# et report en années des ruptures entre régimes de croissance ('ruptures' pour
+# toutes les métriques, 'ruptures:<Metrique>' pour une seule, 'ruptures:<Metrique>:<annee>'
+# pour la rupture qui clôt le régime finissant cette année-là)
+SCENARIO_FACTORS = ('production_base', 'price_base', 'rendement')
+SCENARIO_SHIFT = 'ruptures'
+
+
+def _breakpoints(params, metric):
+    """Années de rupture (fins de régime) d'une métrique pour la première huile de `params`"""
+    ends = params['ends'][0] if 'ends' in params else METRIC_TABLE['ends']
+    ends = ends[METRIC_COLUMNS.index(metric)]
+    return [int(end) for end in ends[np.isfinite(ends)]]
+
+
+def _expand_breakpoint_moves(row, registry):
+    """Développe 'ruptures:<Metrique>' donné en {ancienne année: nouvelle} ou en liste
+    des nouvelles années (une par rupture) en reports 'ruptures:<Metrique>:<annee>'"""
+    for name, value in list(row.items()):
+        if not name.startswith(f'{SCENARIO_SHIFT}:') or not isinstance(value, (dict, list, tuple)):
+            continue
+        _check_scenario_parameter(name)
+        metric = name.split(':', 1)[1]
+        if isinstance(value, dict):
+            moves = {int(old): new for old, new in value.items()}
+        else:
+            breakpoints = _breakpoints(registry.params([row['Huile']]), metric)
+            if len(value) != len(breakpoints):
+                raise ValueError(f"{name}: {len(value)} années pour {len(breakpoints)} ruptures "
+                                 f"({', '.join(map(str, breakpoints))})")
+            moves = dict(zip(breakpoints, value))
+        del row[name]
+        for old, new in moves.items():
+            key = f'{name}:{old}'
+            row[key] = row.get(key, 0.0) + float(new) - old
+
+
+def _scenario_delays(scenarios, ends):
+    """Reports de chaque rupture (scénarios × métriques × régimes) ; `ends` : fins de régime des scénarios"""
+    finite = np.isfinite(ends)
+    delays = np.zeros(ends.shape)
+    for name in scenarios.columns:
+        if name != SCENARIO_SHIFT and not name.startswith(f'{SCENARIO_SHIFT}:'):
+            continue
+        values = scenarios[name].to_numpy(dtype=float)
+        parts = name.split(':')
+        if len(parts) == 1:
+            delays += values[:, None, None] * finite
+            continue
+        m = METRIC_COLUMNS.index(parts[1])
+        if len(parts) == 2:
+            delays[:, m] += values[:, None] * finite[:, m]
+            continue
+        matches = ends[:, m] == float(parts[2])
+        missing = (values != 0) & ~matches.any(axis=1)
+        if missing.any():
+            row = np.flatnonzero(missing)[0]
+            raise ValueError(f"{name}: pas de rupture en {parts[2]} pour {scenarios['Huile'].iloc[row]} "
+                             f"(ruptures: {', '.join(str(int(end)) for end in ends[row, m] if np.isfinite(end))})")
+        delays[:, m] += values[:, None] * matches
+    return delays
+
+
+def _move_breakpoints(table, delays):
+    """Tables de régimes aux ruptures reportées (scénarios × métriques × régimes).
+    
+    La fin de chaque régime recule de son report et l'origine du régime
+    suivant avec elle ; le premier régime garde son niveau et sa pente, de
+    sorte que la croissance est inchangée avant la première rupture.
+    """
+    moved = {field: np.broadcast_to(table[field], delays.shape).copy() for field in REGIME_FIELDS}
+    moved['ends'] += delays
+    moved['anchors'][..., 1:] += delays[..., :-1]
+    finite = np.isfinite(moved['ends'])
+    crossed = finite[..., 1:] & (moved['ends'][..., 1:] <= moved['ends'][..., :-1])
+    if crossed.any():
+        row, m, _ = np.argwhere(crossed)[0]
+        raise ValueError(f"ruptures de {METRIC_COLUMNS[m]} non croissantes après report: "
+                         f"{', '.join(f'{end:g}' for end in moved['ends'][row, m] if np.isfinite(end))}")
+    return moved
+
+
+def _check_scenario_parameter(name):
+    if name in SCENARIO_FACTORS or name == SCENARIO_SHIFT:
+        return
+    parts = name.split(':')
+    if parts[0] == SCENARIO_SHIFT and len(parts) in (2, 3) and parts[1] in METRIC_COLUMNS \
+            and (len(parts) == 2 or parts[2].isdigit()):
+        return
+    raise ValueError(f"paramètre de scénario inconnu: {name} (paramètres: {', '.join(SCENARIO_FACTORS)}, "
+                     f"{SCENARIO_SHIFT}, {SCENARIO_SHIFT}:<Metrique>, {SCENARIO_SHIFT}:<Metrique>:<annee>)")
+
+
+class ScenarioSweep:
+    """Balayage de scénarios « et si » sur les configurations des huiles.
+    
+    `grid` (paramètre -> liste de valeurs) est développé en produit
+    cartésien, croisé avec la liste explicite `scenarios` (dicts de
+    paramètres, éventuellement avec 'Huile') et avec chaque huile de `oils`.
+    Les paramètres absents valent 1 (facteurs) ou 0 (reports). Un report
+    'ruptures:<Metrique>' peut aussi désigner les ruptures elles-mêmes :
+    {2010: 2012} ou la liste des nouvelles années, une par rupture.
+    """
+    
+    def __init__(self, oils=None, grid=None, scenarios=None, seed=None, freq=ANNUAL_FREQ, registry=None,
+                 end_year=2025):
+        self.registry = registry or OIL_REGISTRY
+        if oils is None:
+            oils = HUILES_ESSENTIELLES if registry is None else registry.names
+        self.start_year = 2000
+        self.end_year = end_year
+        self.freq = freq
+        self.dates = _date_grid(self.start_year, self.end_year, freq)
+        
+        # Graine optionnelle ; tous les scénarios d'une huile partagent son bruit
+        self.seed = seed
+        
+        grid = grid or {}
+        combinations = [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+        rows = []
+        for scenario in scenarios or [{}]:
+            for oil in ([scenario['Huile']] if 'Huile' in scenario else oils):
+                for combination in combinations:
+                    rows.append(dict(scenario, Huile=oil, **combination))
+        for row in rows:
+            _expand_breakpoint_moves(row, self.registry)
+        
+        parameters = sorted({name for row in rows for name in row if name != 'Huile'})
+        for name in parameters:
+            _check_scenario_parameter(name)
+        columns = ['Huile'] + list(SCENARIO_FACTORS) + [name for name in parameters if name not in SCENARIO_FACTORS]
+        table = pd.DataFrame(rows, columns=columns)
+        for name in columns[1:]:
+            table[name] = table[name].fillna(1.0 if name in SCENARIO_FACTORS else 0.0).astype(float)
+        table.index.name = 'Scenario'
+        self.scenarios = table
+    
+    def run(self, noise=True, dtype=np.float64, chunk_scenarios=256):
+        """Simule tous les scénarios par lots ; retourne un ScenarioResults.
+        
+        Avec `noise=False`, seule la partie déterministe est simulée ; sinon
+        chaque scénario reçoit le bruit de son huile (nombres aléatoires
+        communs), de sorte que les écarts entre scénarios ne tiennent qu'aux
+        paramètres.
+        """
+        print(f"🧪 Simulation de {len(self.scenarios)} scénarios...")
+        
+        t = _time_coordinate(self.dates)
+        trends = _trend_factors(t)
+        codes, oils = pd.factorize(self.scenarios['Huile'])
+        base = self.registry.params(list(oils))
+        params = {key: values[codes] for key, values in base.items()}
+        for name in SCENARIO_FACTORS:
+            params[name] = params[name] * self.scenarios[name].to_numpy()
+        table = {field: params[field] for field in REGIME_FIELDS} if 'slopes' in params else METRIC_TABLE
+        delays = _scenario_delays(self.scenarios, np.broadcast_to(
+            table['ends'], (len(self.scenarios),) + table['ends'].shape[-2:]))
+        if delays.any():
+            params.update(_move_breakpoints(table, delays))
+        
+        oil_noise = None
+        if noise:
+            with _span('noise', oils=len(oils)):
+                oil_noise = _noise(self.seed, list(oils), len(t), sigmas=base.get('sigmas'))[0]
+        
+        cube = np.empty((len(self.scenarios), len(t), len(METRIC_COLUMNS)), dtype=dtype)
+        with _span('scenarios', scenarios=len(self.scenarios)):
+            for start in range(0, len(self.scenarios), chunk_scenarios):
+                rows = slice(start, start + chunk_scenarios)
+                values = _deterministic_curves({key: value[rows] for key, value in params.items()}, t)
+                if oil_noise is not None:
+                    values *= oil_noise[codes[rows]]
+                values = values.transpose(0, 2, 1)
+                values *= trends
+                cube[rows] = values
+        return ScenarioResults(self.scenarios, cube, self.dates)
+
+
+class ScenarioResults:
+    """Résultats d'un balayage : cube scénarios × périodes × métriques et table des scénarios.
+    
+    La table (indexée par Scenario) porte l'huile et les paramètres de chaque
+    scénario ; `query`, `select` et `insights` filtrent sur ces paramètres.
+    """
+    
+    def __init__(self, scenarios, cube, dates):
+        self.scenarios = scenarios
+        self.cube = cube
+        self.dates = dates
+    
+    def query(self, criteria=None, **kwargs):
+        """Identifiants des scénarios dont les paramètres valent (ou sont dans) les valeurs demandées.
+        
+        Les noms contenant ':' (ruptures:<Metrique>[:<annee>]) se passent dans `criteria`.
+        """
+        mask = np.ones(len(self.scenarios), dtype=bool)
+        for name, wanted in dict(criteria or {}, **kwargs).items():
+            column = self.scenarios[name].to_numpy()
+            wanted = np.atleast_1d(wanted)
+            if name == 'Huile':
+                mask &= np.isin(column, wanted)
+            else:
+                mask &= np.isclose(column[:, None], wanted.astype(float)[None, :]).any(axis=1)
+        return self.scenarios.index[mask].to_numpy()
+    
+    def select(self, criteria=None, metrics=None, **kwargs):
+        """Séries des scénarios retenus, indexées par (Scenario, Annee|Date) avec leurs paramètres"""
+        ids = self.query(criteria, **kwargs)
+        metrics = list(metrics or METRIC_COLUMNS)
+        columns = [METRIC_COLUMNS.index(metric) for metric in metrics]
+        t = _time_coordinate(self.dates)
+        if _is_subannual(t):
+            periods, period_name = self.dates, 'Date'
+        else:
+            periods, period_name = np.asarray(self.dates.year, dtype=np.int64), 'Annee'
+        index = pd.MultiIndex.from_product([ids, periods], names=['Scenario', period_name])
+        df = pd.DataFrame(self.cube[ids][:, :, columns].reshape(-1, len(columns)), index=index, columns=metrics)
+        return self.scenarios.loc[ids].join(df, how='inner')
+    
+    def insights(self, criteria=None, **kwargs):
+        """Statistiques de synthèse des scénarios retenus, indexées par (Scenario, Metrique)"""
+        ids = self.query(criteria, **kwargs)
+        stats = _summary_statistics(_annual_means(self.cube[ids], self.dates.year))
+        index = pd.MultiIndex.from_product([ids, METRIC_COLUMNS], names=['Scenario', 'Metrique'])
+        return pd.DataFrame(stats.reshape(-1, len(INSIGHT_STATISTICS)), index=index, columns=INSIGHT_STATISTICS)
+    
+    def save(self, path):
+        """Enregistre les résultats dans un répertoire (values.npy, scenarios.csv, metadata.json)"""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'values.npy'), self.cube, allow_pickle=False)
+        self.scenarios.to_csv(os.path.join(path, 'scenarios.csv'))
+        metadata = {
+            'layout': ['scenario', 'period', 'metric'],
+            'dtype': self.cube.dtype.name,
+            'periods': [d.isoformat() for d in self.dates],
+            'freq': self.dates.freqstr,
+            'metrics': METRIC_COLUMNS,
+        }
+        with open(os.path.join(path, 'metadata.json'), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        return path
+    
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Relit des résultats enregistrés ; le cube est projeté en mémoire par défaut"""
+        with open(os.path.join(path, 'metadata.json'), encoding='utf-8') as f:
+            metadata = json.load(f)
+        scenarios = pd.read_csv(os.path.join(path, 'scenarios.csv'), index_col='Scenario')
+        cube = np.load(os.path.join(path, 'values.npy'), mmap_mode='r' if mmap else None)
+        return cls(scenarios, cube, pd.DatetimeIndex(metadata['periods'], freq=metadata['freq']))
+
+
+# Sorties étudiées par défaut par l'analyse de sensibilité
+SENSITIVITY_OUTPUTS = ['Valeur_Marche', 'Surface_Cultivee', 'Exportations']
+SENSITIVITY_STATISTICS = ('moyenne', 'total', 'dernier')
+
+
+def sensitivity_parameters(outputs=SENSITIVITY_OUTPUTS, spread=0.5):
+    """Entrées de l'analyse de sensibilité : liste de (nom, borne basse, borne haute).
+    
+    - production_base, price_base, rendement : facteurs de la configuration
+      de l'huile dans [1 - spread, 1 + spread] ;
+    - sigma:<Metrique> : facteur du bruit de chaque sortie dans [0, 2] ;
+    - tendance:<Metrique>:<époque> : multiplicateur de chaque règle de
+      TREND_RULES, de 1 (sans tendance) au double de son effet.
+    """
+    parameters = [(name, 1 - spread, 1 + spread) for name in SCENARIO_FACTORS]
+    parameters += [(f'sigma:{column}', 0.0, 2.0) for column in outputs]
+    for start, end, column, factor in TREND_RULES:
+        low, high = sorted((1.0, 2 * factor - 1))
+        parameters.append((f"tendance:{column}:{start}-{end or ''}", low, high))
+    return parameters
+
+
+def _sensitivity_model(params, outputs, parameters, samples, t, z, statistic):
+    """Évalue le modèle d'une huile pour des échantillons (échantillons × entrées, en unités réelles).
+    
+    `z` (sorties × périodes) fixe les tirages normaux du bruit (nombres
+    aléatoires communs) ; retourne la statistique de chaque sortie
+    (échantillons × sorties).
+    """
+    names = [name for name, _, _ in parameters]
+    columns = [METRIC_COLUMNS.index(column) for column in outputs]
+    values = {name: samples[:, i] for i, name in enumerate(names)}
+    
+    scaled = {key: np.full(len(samples), params[key][0])
+              for key in ('production_base', 'price_base', 'rendement', 'mois_recolte')}
+    for name in SCENARIO_FACTORS:
+        scaled[name] = scaled[name] * values[name]
+    curves = _catalogue_bases(scaled)[:, columns, None] * _oil_growth(params, t)[0][columns][None]
+    
+    years = np.floor(t)
+    for (start, end, column, _), (name, _, _) in zip(TREND_RULES, parameters[len(SCENARIO_FACTORS) + len(outputs):]):
+        if column in outputs:
+            in_era = (years >= start) & (years <= (np.inf if end is None else end))
+            curves[:, outputs.index(column), in_era] *= values[name][:, None]
+    
+    sigmas = params.get('sigmas', METRIC_TABLE['sigmas'][None])[0][columns][None, :] * np.column_stack(
+        [values[f'sigma:{column}'] for column in outputs])
+    curves *= 1 + sigmas[:, :, None] * z[None]
+    if statistic == 'dernier':
+        return curves[:, :, -1]
+    return curves.sum(axis=2) if statistic == 'total' else curves.mean(axis=2)
+
+
+class SensitivityAnalysis:
+    """Analyse de sensibilité globale (Sobol, Morris) des sorties du simulateur, huile par huile.
+    
+    Les entrées (sensitivity_parameters) sont échantillonnées par une suite
+    quasi-aléatoire de Sobol brouillée et le modèle est évalué en lots
+    vectorisés : des centaines de milliers d'évaluations par huile en
+    quelques dixièmes de seconde. La sortie étudiée est la statistique
+    `statistic` (moyenne, total ou dernier) de chaque métrique de `outputs`
+    sur la grille annuelle.
+    """
+    
+    def __init__(self, oils=None, outputs=SENSITIVITY_OUTPUTS, seed=None, registry=None, spread=0.5,
+                 statistic='moyenne', chunk_samples=16384, end_year=2025):
+        if statistic not in SENSITIVITY_STATISTICS:
+            raise ValueError(f"statistique inconnue: {statistic} (statistiques: {', '.join(SENSITIVITY_STATISTICS)})")
+        self.registry = registry or OIL_REGISTRY
+        if oils is None:
+            oils = HUILES_ESSENTIELLES if registry is None else registry.names
+        self.oils = list(oils)
+        self.outputs = list(outputs)
+        self.seed = seed
+        self.statistic = statistic
+        self.chunk_samples = chunk_samples
+        self.parameters = sensitivity_parameters(self.outputs, spread)
+        self.start_year = 2000
+        self.end_year = end_year
+        self.t = _time_coordinate(_date_grid(self.start_year, self.end_year))
+        self.evaluations = 0
+    
+    def _unit_samples(self, n, dimensions):
+        """n points (arrondi à la puissance de 2 supérieure) d'une suite de Sobol brouillée"""
+        from scipy.stats import qmc
         
-        print("• Investir dans la recherche clinique et scientifique")
-        print("• Développer l'agriculture biologique et durable")
-        print("• Renforcer la traçabilité et la qualité des produits")
-        print("• Explorer les synergies avec d'autres huiles essentielles")
-        print("• Développer les applications en médecine intégrative")
+        return qmc.Sobol(dimensions, scramble=True, seed=self.seed).random_base2(max(int(np.ceil(np.log2(n))), 1))
+    
+    def _evaluate(self, oil, unit):
+        """Sorties de l'huile pour des points du cube unité, par lots (points × sorties)"""
+        low = np.array([low for _, low, _ in self.parameters])
+        high = np.array([high for _, _, high in self.parameters])
+        if self.seed is None:
+            z = np.random.standard_normal((len(self.outputs), len(self.t)))
+        else:
+            z = np.stack([_stream(self.seed, oil, column).standard_normal(len(self.t)) for column in self.outputs])
+        params = self.registry.params([oil])
+        
+        result = np.empty((len(unit), len(self.outputs)))
+        for start in range(0, len(unit), self.chunk_samples):
+            samples = low + unit[start:start + self.chunk_samples] * (high - low)
+            result[start:start + len(samples)] = _sensitivity_model(params, self.outputs, self.parameters,
+                                                                    samples, self.t, z, self.statistic)
+        self.evaluations += len(unit)
+        return result
+    
+    def _frame(self, values, columns, rank_by):
+        """DataFrame indexé par (Huile, Sortie, Parametre), classé par `rank_by` décroissant"""
+        names = [name for name, _, _ in self.parameters]
+        index = pd.MultiIndex.from_product([self.oils, self.outputs, names], names=['Huile', 'Sortie', 'Parametre'])
+        df = pd.DataFrame(values.reshape(-1, len(columns)), index=index, columns=columns)
+        df['rang'] = df.groupby(level=['Huile', 'Sortie'])[rank_by].rank(ascending=False, method='min').astype(int)
+        # Huiles et sorties dans l'ordre demandé, entrées par rang
+        return df.iloc[np.lexsort((df['rang'].to_numpy(), index.codes[1], index.codes[0]))]
+    
+    def sobol(self, n=8192, bootstrap=100):
+        """Indices de Sobol du premier ordre (S1) et totaux (ST) par huile et par sortie.
+        
+        Plan de Saltelli sur n points (N(d + 2) évaluations pour d entrées),
+        estimateurs de Saltelli (S1) et de Jansen (ST) ; les demi-largeurs
+        d'intervalle à 95 % (_conf) sont estimées par bootstrap.
+        """
+        d = len(self.parameters)
+        print(f"🎯 Indices de Sobol: {len(self.oils)} huiles × {d} entrées...")
+        unit = self._unit_samples(n, 2 * d)
+        a, b = unit[:, :d], unit[:, d:]
+        n = len(unit)
+        mixed = np.repeat(a[None], d, axis=0)
+        mixed[np.arange(d), :, np.arange(d)] = b.T
+        
+        # Rééchantillonnages bootstrap sous forme de poids : une moyenne rééchantillonnée est un produit matriciel
+        weights = None
+        if bootstrap:
+            weights = np.random.default_rng(self.seed).multinomial(n, np.full(n, 1 / n), size=bootstrap) / n
+        
+        results = np.full((len(self.oils), len(self.outputs), d, 4), np.nan)
+        with _span('sensitivity', method='sobol', oils=len(self.oils), evaluations=n * (d + 2) * len(self.oils)):
+            for o, oil in enumerate(self.oils):
+                f = self._evaluate(oil, np.concatenate([a, b, mixed.reshape(-1, d)]))
+                f_a, f_b, f_ab = f[:n], f[n:2 * n], f[2 * n:].reshape(d, n, -1)
+                variance = np.concatenate([f_a, f_b]).var(axis=0)
+                first = f_b[None] * (f_ab - f_a[None])                        # entrées × points × sorties
+                total = 0.5 * (f_a[None] - f_ab) ** 2
+                for k, terms in ((0, first), (2, total)):
+                    results[o, :, :, k] = _safe_ratio(terms.mean(axis=1), variance).T
+                    if weights is not None:
+                        resampled = (weights @ terms.transpose(1, 0, 2).reshape(n, -1)).reshape(bootstrap, d, -1)
+                        results[o, :, :, k + 1] = 1.96 * _safe_ratio(resampled, variance).std(axis=0).T
+        return self._frame(results, ['S1', 'S1_conf', 'ST', 'ST_conf'], 'ST')
+    
+    def morris(self, n=1024):
+        """Effets élémentaires de Morris (plan radial quasi-aléatoire) par huile et par sortie.
+        
+        Chaque point de base est déplacé entrée par entrée vers un point
+        auxiliaire (N(d + 1) évaluations) ; mu_star (moyenne des effets absolus)
+        classe les entrées, sigma signale non-linéarités et interactions. Les
+        effets sont exprimés pour une variation de toute la plage de l'entrée.
+        """
+        d = len(self.parameters)
+        print(f"🎯 Effets de Morris: {len(self.oils)} huiles × {d} entrées...")
+        unit = self._unit_samples(n, 2 * d)
+        base, auxiliary = unit[:, :d], unit[:, d:]
+        n = len(unit)
+        moved = np.repeat(base[None], d, axis=0)
+        moved[np.arange(d), :, np.arange(d)] = auxiliary.T
+        steps = (auxiliary - base).T                                      # entrées × points
+        
+        results = np.empty((len(self.oils), len(self.outputs), d, 3))
+        with _span('sensitivity', method='morris', oils=len(self.oils), evaluations=n * (d + 1) * len(self.oils)):
+            for o, oil in enumerate(self.oils):
+                f = self._evaluate(oil, np.concatenate([base, moved.reshape(-1, d)]))
+                effects = (f[n:].reshape(d, n, -1) - f[None, :n]) / steps[:, :, None]
+                results[o, :, :, 0] = np.abs(effects).mean(axis=1).T
+                results[o, :, :, 1] = effects.mean(axis=1).T
+                results[o, :, :, 2] = effects.std(axis=1).T
+        return self._frame(results, ['mu_star', 'mu', 'sigma'], 'mu_star')
+
+
+def _safe_ratio(numerator, denominator):
+    """numerator / denominator, 0 là où le dénominateur est nul (sortie constante)"""
+    return np.divide(numerator, denominator, out=np.zeros(np.broadcast(numerator, denominator).shape),
+                     where=np.broadcast_to(denominator, np.broadcast(numerator, denominator).shape) > 0)
+
+
+# Métriques dont le niveau de base calibré met à jour un paramètre de configuration
+# de l'huile (les autres bases en dépendent) ; les autres niveaux sont portés par
+# les ordonnées des régimes.
+CALIBRATION_BASES = {'Production_Mondiale': 'production_base', 'Prix_Moyen': 'price_base'}
+
+# Années minimales d'un régime calibré
+CALIBRATION_MIN_YEARS = 3
 
-def main():
+# Pénalité supplémentaire de chaque rupture calibrée, en unités de log(observations) du BIC
+CALIBRATION_PENALTY = 1.0
+
+
+def load_observations(paths, oil=None):
+    """Charge des séries observées (CSV ou Excel) au format de generate_catalogue_data.
+    
+    Chaque fichier (ou feuille Excel) donne une ligne par période avec une
+    colonne Annee ou Date et une colonne par métrique (noms de METRIC_COLUMNS,
+    les autres colonnes sont ignorées), ou le format long Metrique / Valeur.
+    Sans colonne Huile, l'huile est `oil`, sinon le nom de la feuille ou du
+    fichier (préfixe avant « _pharmacopoeia »). Les feuilles sans période
+    (synthèse) sont ignorées. Retourne un DataFrame indexé par (Huile, Annee)
+    ou (Huile, Date), NaN pour les valeurs manquantes.
+    """
+    frames = []
+    for path in [paths] if isinstance(paths, str) else paths:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if path.lower().endswith(('.xlsx', '.xlsm', '.xls')):
+            sheets = pd.read_excel(path, sheet_name=None)
+        else:
+            sheets = {stem: pd.read_csv(path)}
+        for name, frame in sheets.items():
+            if 'Annee' not in frame and 'Date' not in frame:
+                continue
+            if 'Metrique' in frame and 'Valeur' in frame:
+                keys = [column for column in ('Huile', 'Date', 'Annee') if column in frame]
+                frame = frame.pivot_table(index=keys, columns='Metrique', values='Valeur').reset_index()
+            if 'Huile' not in frame:
+                frame.insert(0, 'Huile', oil or name.split('_pharmacopoeia')[0])
+            period = 'Date' if 'Date' in frame else 'Annee'
+            if period == 'Date':
+                frame['Date'] = pd.to_datetime(frame['Date'])
+            metrics = [column for column in METRIC_COLUMNS if column in frame]
+            frames.append(frame.set_index(['Huile', period])[metrics])
+    
+    if not frames:
+        raise ValueError("aucune série observée (colonne Annee ou Date) dans les fichiers fournis")
+    if len({frame.index.names[1] for frame in frames}) > 1:
+        raise ValueError("fichiers annuels (Annee) et infra-annuels (Date) mélangés")
+    observations = pd.concat(frames).astype(float)
+    return observations.groupby(level=[0, 1], sort=False).mean()
+
+
+def _observation_times(periods):
+    """Temps en années décimales de périodes observées (années entières, ou dates au format de _time_coordinate)"""
+    if not isinstance(periods, pd.DatetimeIndex):
+        return np.asarray(periods, dtype=float)
+    freq = pd.infer_freq(periods) if len(periods) >= 3 else None
+    if freq is not None:
+        try:
+            return _time_coordinate(pd.DatetimeIndex(periods, freq=freq))
+        except (ValueError, TypeError):
+            pass
+    # Grille irrégulière : fraction d'année de la date elle-même
+    return np.asarray(periods.year) + (np.asarray(periods.dayofyear) - 1) / (365 + np.asarray(periods.is_leap_year))
+
+
+def _fit_regimes(t, y, n_regimes, min_years=CALIBRATION_MIN_YEARS, penalty=CALIBRATION_PENALTY):
+    """Régimes linéaires par morceaux de séries (séries × périodes, NaN = manquant).
+    
+    Les ruptures tombent en fin d'année civile, chaque régime couvrant au
+    moins `min_years` années. Les sommes pondérées (1, t, t², y, ty, y²)
+    cumulées par année donnent en O(1) l'erreur des moindres carrés relatifs
+    de tout segment d'années, la droite restant positive ou nulle sur le
+    segment ; une programmation dynamique vectorisée sur toutes les séries
+    trouve alors la segmentation optimale en 1 à `n_regimes` régimes, et
+    chaque série garde le nombre de régimes de plus faible BIC (pénalisé de
+    `penalty` × log(n) par rupture).
+    """
+    n_series = len(y)
+    observed = np.isfinite(y)
+    values = np.where(observed, y, 0.0)
+    # Poids relatifs 1/y² (bruit multiplicatif du modèle) : les petites valeurs comptent autant que les grandes
+    magnitude = np.abs(values)
+    smallest = 1e-3 * magnitude.max(axis=1, keepdims=True)
+    smallest = np.where(smallest > 0, smallest, 1.0)
+    weights = np.where(observed, 1 / np.maximum(magnitude, smallest) ** 2, 0.0)
+    years, block = np.unique(np.floor(t), return_inverse=True)
+    n_years = len(years)
+    x = t - t.mean()
+    
+    # Sommes pondérées cumulées par année civile (séries × années + 1), puis nombres d'observations
+    starts = np.flatnonzero(np.r_[True, np.diff(block) > 0])
+    
+    def cumulate(*terms):
+        return [np.concatenate([np.zeros((n_series, 1)), np.cumsum(np.add.reduceat(term, starts, axis=1), axis=1)],
+                               axis=1) for term in terms]
+    
+    prefix = cumulate(weights, weights * x, weights * x * x, weights * values, weights * values * x,
+                      weights * values * values)
+    observations, = cumulate(observed.astype(float))
+    
+    def segment(first, last, pairwise=False):
+        """Sommes des années [first, last) : tableau séries × débuts × fins (pairwise) ou séries × régimes"""
+        if pairwise:
+            return [p[:, None, :] - p[:, :, None] for p in prefix]
+        return [np.take_along_axis(p, last, axis=1) - np.take_along_axis(p, first, axis=1) for p in prefix]
+    
+    def least_squares(n, sx, sxx, sy, sxy, syy, low, high):
+        """Droite des moindres carrés positive ou nulle aux deux bouts [low, high] du segment.
+        
+        Si la droite libre passe sous zéro, l'optimum (problème convexe) est
+        la meilleure des droites nulles en `low` ou en `high`, de pente bornée.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vxx = sxx - sx * sx / n
+            vxy = sxy - sx * sy / n
+            slope = vxy / vxx
+            level = sy / n - slope * sx / n
+            sse = syy - sy * sy / n - slope * vxy
+            low, high = np.broadcast_to(low, slope.shape), np.broadcast_to(high, slope.shape)
+            negative = np.nonzero((level + slope * low < 0) | (level + slope * high < 0))
+            if len(negative[0]):
+                # Droites b (x - x0) : b = Σ(x - x0)y / Σ(x - x0)², croissante depuis low, décroissante jusqu'à high
+                n, sx, sxx, sy, sxy, syy = (np.broadcast_to(term, slope.shape)[negative]
+                                            for term in (n, sx, sxx, sy, sxy, syy))
+                candidates = []
+                for x0, clip in ((low[negative], np.maximum), (high[negative], np.minimum)):
+                    num, den = sxy - x0 * sy, sxx - 2 * x0 * sx + x0 * x0 * n
+                    b = clip(num / den, 0.0)
+                    candidates.append((b, -b * x0, syy - 2 * b * num + b * b * den))
+                (b1, a1, e1), (b2, a2, e2) = candidates
+                second = e2 < e1
+                slope[negative] = np.where(second, b2, b1)
+                level[negative] = np.where(second, a2, a1)
+                sse[negative] = np.where(second, e2, e1)
+            return slope, level, sse, vxx
+    
+    # Premier et dernier instant observables de chaque année (bornes des segments)
+    lows = np.r_[np.minimum.reduceat(x, starts), 0.0]
+    highs = np.r_[0.0, np.maximum.reduceat(x, starts)]
+    
+    # Erreur de chaque segment d'années [i, j) (séries × i × j)
+    n, *sums = segment(None, None, pairwise=True)
+    _, _, sse, vxx = least_squares(n, *sums, lows[None, :, None], highs[None, None, :])
+    span = np.arange(n_years + 1)[None, :] - np.arange(n_years + 1)[:, None]
+    valid = (span >= min_years)[None] & (observations[:, None, :] - observations[:, :, None] >= 3) & (vxx > 1e-12 * n)
+    cost = np.where(valid, np.maximum(sse, 0.0), np.inf)
+    
+    # Programmation dynamique : meilleure erreur avec r régimes sur les années [0, j)
+    best = cost[:, 0, :]
+    errors, choices = [best[:, -1]], []
+    for _ in range(1, n_regimes):
+        total = best[:, :, None] + cost
+        choice = total.argmin(axis=1)
+        best = np.take_along_axis(total, choice[:, None, :], axis=1)[:, 0]
+        errors.append(best[:, -1])
+        choices.append(choice)
+    
+    # Nombre de régimes par BIC (2 paramètres par régime et une année par rupture),
+    # plus `penalty` × log(n) par rupture contre les découpages en dents de scie
+    counts = observations[:, -1]
+    floor = 1e-12 * np.maximum(prefix[5][:, -1], 1e-300)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bic = np.stack([np.where(np.isfinite(error),
+                                 counts * np.log(np.maximum(error, floor) / counts)
+                                 + ((3 + penalty) * r + 2) * np.log(counts),
+                                 np.inf)
+                        for r, error in enumerate(errors)], axis=1)
+    regimes = bic.argmin(axis=1) + 1
+    fitted = np.isfinite(bic).any(axis=1)
+    
+    # Bornes des régimes retenus (séries × n_regimes + 1), le dernier régime répété au-delà
+    bounds = np.full((n_series, n_regimes + 1), n_years)
+    bounds[:, 0] = 0
+    rows = np.arange(n_series)
+    for r in range(2, n_regimes + 1):
+        chosen = np.full((n_series, r + 1), n_years)
+        chosen[:, 0] = 0
+        for k in range(r - 1, 0, -1):
+            chosen[:, k] = choices[k - 1][rows, chosen[:, k + 1]]
+        selected = regimes == r
+        bounds[selected, :r + 1] = chosen[selected]
+    last = np.minimum(np.arange(n_regimes)[None, :], regimes[:, None] - 1)
+    first, stop = np.take_along_axis(bounds, last, axis=1), np.take_along_axis(bounds, last + 1, axis=1)
+    
+    slope, level, _, _ = least_squares(*segment(first, stop), lows[first], highs[stop])
+    
+    # Second passage pondéré par la courbe ajustée (1/f²) plutôt que par les observations bruitées
+    # (sans quoi les valeurs tirées vers le bas pèsent plus et biaisent les niveaux)
+    regime = (block[None, None, :] >= stop[:, :, None]).sum(axis=1)
+    fitted_curve = np.take_along_axis(level, regime, axis=1) + np.take_along_axis(slope, regime, axis=1) * x
+    weights = np.where(observed, 1 / np.maximum(np.abs(fitted_curve), smallest) ** 2, 0.0)
+    prefix = cumulate(weights, weights * x, weights * x * x, weights * values, weights * values * x,
+                      weights * values * values)
+    slope, level, _, _ = least_squares(*segment(first, stop), lows[first], highs[stop])
+    # Convention de METRIC_SPECS : origine au début des données puis à la fin du régime précédent
+    anchors = np.where(first == 0, years[0], years[np.maximum(first - 1, 0)])
+    intercepts = level + slope * (anchors - t.mean())
+    ends = np.where(last == regimes[:, None] - 1, np.inf, years[stop - 1])
+    
+    # Bruit multiplicatif : E[(y - f)²] = σ² f², estimé par Σ (y - f)² / Σ f² (stable là où f est petit)
+    regime = (np.floor(t)[None, None, :] > ends[:, :, None]).sum(axis=1)
+    curve = (np.take_along_axis(intercepts, regime, axis=1)
+             + np.take_along_axis(slope, regime, axis=1) * (t[None, :] - np.take_along_axis(anchors, regime, axis=1)))
+    curve = np.where(observed, curve, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        residuals = (values - curve) ** 2
+        dof = counts / np.maximum(counts - 2 * regimes, 1)
+        sigma = np.sqrt(residuals.sum(axis=1) / (curve * curve).sum(axis=1) * dof)
+        total = prefix[5][:, -1] - prefix[3][:, -1] ** 2 / prefix[0][:, -1]
+        r2 = 1 - np.take_along_axis(np.stack(errors, axis=1), regimes[:, None] - 1, axis=1)[:, 0] / total
+    return {'regimes': regimes, 'fitted': fitted, 'ends': ends, 'intercepts': intercepts, 'slopes': slope,
+            'anchors': anchors.astype(float), 'sigma': sigma, 'r2': r2, 'n': counts}
+
+
+def calibrate_registry(observations, registry=None, workers=1, chunk_series=1024,
+                       min_years=CALIBRATION_MIN_YEARS, max_regimes=None, penalty=CALIBRATION_PENALTY):
+    """Calibre régimes de croissance, ruptures, niveaux de base et bruits sur des séries observées.
+    
+    `observations` est un DataFrame indexé par (Huile, Annee|Date), comme
+    celui de load_observations ou de generate_catalogue_data. Les tendances
+    d'époque (TREND_RULES) et la saisonnalité sont retirées des observations,
+    puis chaque couple (huile, métrique) est ajusté par _fit_regimes avec au
+    plus autant de régimes que METRIC_SPECS (ou `max_regimes`), chaque
+    rupture coûtant `penalty` × log(n) de plus au BIC ; les lots de séries
+    sont répartis sur `workers` processus.
+    
+    Retourne (registre, rapport) : un OilRegistry dont les huiles observées
+    portent leur bloc "calibration" (et production_base / price_base
+    ajustés, cf. CALIBRATION_BASES ; les huiles inconnues y sont ajoutées
+    avec la configuration par défaut), et un DataFrame indexé par (Huile,
+    Metrique) des régimes, ruptures, bases, bruits et R² ajustés.
+    """
+    registry = registry or OIL_REGISTRY
+    oils = list(observations.index.get_level_values(0).unique())
+    metrics = [column for column in METRIC_COLUMNS if column in observations]
+    periods = observations.index.get_level_values(1).unique().sort_values()
+    t = _observation_times(periods)
+    
+    # Cube observé huiles × périodes × métriques, puis corrigé des tendances et saisons
+    values = np.full((len(oils), len(periods), len(metrics)), np.nan)
+    values[pd.Index(oils).get_indexer(observations.index.get_level_values(0)),
+           periods.get_indexer(observations.index.get_level_values(1))] = observations[metrics].to_numpy(float)
+    columns = [METRIC_COLUMNS.index(column) for column in metrics]
+    configs = {oil: registry.config(oil) for oil in oils}
+    params = _config_params(list(configs.values()))
+    values /= _trend_factors(t)[:, columns]
+    seasonal = _seasonal_factors(t, params['mois_recolte'])
+    if seasonal is not None:
+        values /= seasonal[:, columns].transpose(0, 2, 1)
+    
+    # Séries métrique par métrique, en lots de même nombre maximal de régimes
+    series = values.transpose(2, 0, 1).reshape(-1, len(periods))
+    n_regimes = np.repeat([max_regimes or len(METRIC_SPECS[column]['regimes']) for column in metrics], len(oils))
+    chunks = [(rows[start:start + chunk_series], int(r))
+              for r in np.unique(n_regimes) for rows in [np.flatnonzero(n_regimes == r)]
+              for start in range(0, len(rows), chunk_series)]
+    print(f"📐 Calibration de {len(series)} séries ({len(oils)} huiles × {len(metrics)} métriques)...")
+    with _span('calibration', series=len(series)):
+        arguments = ([t] * len(chunks), [series[rows] for rows, _ in chunks], [r for _, r in chunks],
+                     [min_years] * len(chunks), [penalty] * len(chunks))
+        if workers > 1 and len(chunks) > 1:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+                fits = list(executor.map(_fit_regimes, *arguments))
+        else:
+            fits = [_fit_regimes(*chunk) for chunk in zip(*arguments)]
+    
+    width = max(fit['ends'].shape[1] for fit in fits)
+    fit = {name: np.empty((len(series), width) if array.ndim == 2 else len(series), dtype=array.dtype)
+           for name, array in fits[0].items()}
+    for (rows, _), chunk in zip(chunks, fits):
+        for name, array in chunk.items():
+            if array.ndim == 2:
+                # Dernier régime répété jusqu'à la largeur commune
+                array = array[:, np.minimum(np.arange(width), array.shape[1] - 1)]
+            fit[name][rows] = array
+    fit = {name: array.reshape((len(metrics), len(oils)) + array.shape[1:]) for name, array in fit.items()}
+    
+    # Niveaux de base : paramètres de configuration, puis ordonnées et pentes relatives aux bases
+    for column, field in CALIBRATION_BASES.items():
+        if column in metrics:
+            m = metrics.index(column)
+            level = fit['intercepts'][m, :, 0]
+            update = fit['fitted'][m] & (level > 0)
+            params[field] = np.where(update, level, params[field])
+    bases = _catalogue_bases(params)[:, columns].T[:, :, None]                 # métriques × huiles × 1
+    intercepts, slopes = fit['intercepts'] / bases, fit['slopes'] / bases
+    
+    records, report = {}, []
+    for o, oil in enumerate(oils):
+        config = dict(configs[oil])
+        for column, field in CALIBRATION_BASES.items():
+            config[field] = round(float(params[field][o]), 6)
+        calibration = dict(config.get('calibration') or {})
+        for m, column in enumerate(metrics):
+            if not fit['fitted'][m, o]:
+                continue
+            r = int(fit['regimes'][m, o])
+            calibration[column] = {
+                'regimes': [[None if np.isinf(end) else int(end), round(float(intercept), 6),
+                             round(float(slope), 6), int(anchor)]
+                            for end, intercept, slope, anchor in zip(fit['ends'][m, o, :r], intercepts[m, o, :r],
+                                                                      slopes[m, o, :r], fit['anchors'][m, o, :r])],
+                'sigma': round(float(fit['sigma'][m, o]), 6),
+            }
+            report.append((oil, column, r, ' '.join(str(int(end)) for end in fit['ends'][m, o, :r - 1]),
+                           float(bases[m, o, 0]), float(fit['sigma'][m, o]), float(fit['r2'][m, o]),
+                           int(fit['n'][m, o])))
+        config['calibration'] = calibration
+        records[registry.aliases.get(oil, oil)] = config
+    
+    current = registry.to_dict()
+    current['huiles'].update(records)
+    calibrated = OilRegistry(current['huiles'], current['default'])
+    report = pd.DataFrame(report, columns=['Huile', 'Metrique', 'Regimes', 'Ruptures', 'Base', 'Sigma', 'R2',
+                                           'Observations']).set_index(['Huile', 'Metrique'])
+    return calibrated, report
+
+
+# Formats d'export du catalogue
+EXPORT_FORMATS = ('csv', 'parquet', 'feather', 'npy', 'xlsx')
+
+# Colonnes de la feuille de synthèse du classeur : (intitulé, métrique, statistique),
+# reprises du rapport de _generate_pharmacopoeia_insights
+WORKBOOK_SUMMARY = [
+    ('Production moyenne (t)', 'Production_Mondiale', 'moyenne'),
+    ('Prix moyen (€/kg)', 'Prix_Moyen', 'moyenne'),
+    ('Valeur moyenne du marché (M€)', 'Valeur_Marche', 'moyenne'),
+    ('Études scientifiques moyennes', 'Etudes_Scientifiques', 'moyenne'),
+    ('Croissance de la production (%)', 'Production_Mondiale', 'croissance'),
+    ('Croissance de la valeur du marché (%)', 'Valeur_Marche', 'croissance'),
+    ('Principes actifs moyens (%)', 'Teneur_Principes_Actifs', 'moyenne'),
+    ('Pureté chimique moyenne (%)', 'Pureté_Chimique', 'moyenne'),
+    ('Qualité bio moyenne (%)', 'Qualite_Bio', 'moyenne'),
+    ('Efficacité thérapeutique moyenne', 'Efficacite_Therapeutique', 'moyenne'),
+    ("Total d'études scientifiques", 'Etudes_Scientifiques', 'total'),
+    ('Dernière efficacité mesurée', 'Efficacite_Therapeutique', 'dernier'),
+]
+
+
+def _sheet_names(oils, reserved=('Synthese',)):
+    """Noms de feuilles Excel uniques (31 caractères, sans []:*?/\\) pour chaque huile"""
+    used = {name.lower() for name in reserved}
+    names = []
+    for oil in oils:
+        name = ''.join('_' if char in '[]:*?/\\' else char for char in oil)[:31] or 'Huile'
+        candidate, n = name, 1
+        while candidate.lower() in used:
+            n += 1
+            candidate = f'{name[:31 - len(str(n)) - 1]}~{n}'
+        used.add(candidate.lower())
+        names.append(candidate)
+    return names
+
+
+def _cell_values(values, float32=False):
+    """Valeurs écrites dans les cellules d'un classeur (listes Python).
+    
+    En simple précision, chaque valeur est la plus courte écriture décimale
+    de son float32 (0.1 et non 0.10000000149011612, que donnerait tolist()).
+    """
+    if not float32:
+        return np.asarray(values, dtype=np.float64).tolist()
+    return np.asarray(values, dtype=np.float32).astype(str).astype(np.float64).tolist()
+
+
+def export_catalogue_workbook(cube, oils, periods, path, registry=None, float32=False):
+    """Écrit le catalogue en un classeur Excel : une feuille de synthèse puis une feuille par huile.
+    
+    Le classeur est écrit en mode streaming (write-only d'openpyxl) : les
+    lignes sont produites directement depuis le cube, huile par huile, sans
+    DataFrame intermédiaire, et la mémoire reste constante quelle que soit
+    la taille du classeur. Retourne la liste des noms de feuilles des huiles.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    
+    registry = registry or OIL_REGISTRY
+    subannual = isinstance(periods, pd.DatetimeIndex)
+    period_name = 'Date' if subannual else 'Annee'
+    period_values = [d.date() for d in periods] if subannual else np.asarray(periods).tolist()
+    years = periods.year if subannual else np.asarray(periods)
+    sheet_names = _sheet_names(oils)
+    
+    workbook = Workbook(write_only=True)
+    bold = Font(bold=True)
+    
+    def header(sheet, labels):
+        cells = []
+        for label in labels:
+            cell = WriteOnlyCell(sheet, value=label)
+            cell.font = bold
+            cells.append(cell)
+        sheet.append(cells)
+    
+    # Synthèse : statistiques vectorisées de toutes les huiles, puis configuration
+    summary = workbook.create_sheet('Synthese')
+    summary.freeze_panes = 'B2'
+    header(summary, ['Huile', 'Feuille', 'Type', 'Propriétés', 'Régions', 'Rendement (%)']
+           + [label for label, _, _ in WORKBOOK_SUMMARY])
+    stats = _summary_statistics(_annual_means(cube, years))                     # huiles × métriques × stats
+    columns = stats[:, [METRIC_COLUMNS.index(metric) for _, metric, _ in WORKBOOK_SUMMARY],
+                    [INSIGHT_STATISTICS.index(statistic) for _, _, statistic in WORKBOOK_SUMMARY]]
+    for oil, sheet_name, values in zip(oils, sheet_names, _cell_values(columns, float32)):
+        config = registry.config(oil)
+        summary.append([oil, sheet_name, config['type'], ', '.join(config['proprietes']),
+                        ', '.join(config['regions']), config['rendement'] * 100] + values)
+    
+    # Une feuille par huile, écrite ligne à ligne depuis le cube
+    for o, sheet_name in enumerate(sheet_names):
+        sheet = workbook.create_sheet(sheet_name)
+        sheet.freeze_panes = 'B2'
+        header(sheet, [period_name] + METRIC_COLUMNS)
+        rows = _cell_values(cube[o], float32)
+        for period, row in zip(period_values, rows):
+            row.insert(0, period)
+            sheet.append(row)
+    
+    workbook.save(path)
+    return sheet_names
+
+
+def export_catalogue_dataset(cube, oils, periods, path, fmt='npy', float32=False):
+    """Exporte le cube huiles × périodes × métriques en un seul jeu de données.
+    
+    `periods` est la liste des années, ou un DatetimeIndex sur une grille
+    infra-annuelle (colonne Date au lieu de Annee).
+    
+    - csv : un fichier catalogue.csv au format long (Huile, Annee|Date, métriques)
+    - parquet : jeu partitionné par huile (Huile=<nom>/), colonnes lisibles isolément
+    - feather : un fichier catalogue.feather colonnaire
+    - npy : tableau métriques × huiles × périodes projetable en mémoire (mmap),
+      une métrique de toutes les huiles étant un bloc contigu
+    - xlsx : un classeur catalogue.xlsx (synthèse + une feuille par huile),
+      écrit en streaming par export_catalogue_workbook
+    
+    Un fichier metadata.json décrit le contenu. Retourne le répertoire créé.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format inconnu: {fmt} (formats: {', '.join(EXPORT_FORMATS)})")
+    dtype = np.float32 if float32 else np.float64
+    period_name = 'Date' if isinstance(periods, pd.DatetimeIndex) else 'Annee'
+    periods = periods if period_name == 'Date' else np.asarray(periods)
+    os.makedirs(path, exist_ok=True)
+    
+    if fmt == 'npy':
+        values = np.lib.format.open_memmap(os.path.join(path, 'values.npy'), mode='w+', dtype=dtype,
+                                           shape=(cube.shape[2], cube.shape[0], cube.shape[1]))
+        for m in range(cube.shape[2]):
+            values[m] = cube[:, :, m]
+        values.flush()
+        del values
+    elif fmt == 'xlsx':
+        sheets = export_catalogue_workbook(cube, oils, periods, os.path.join(path, 'catalogue.xlsx'),
+                                           float32=float32)
+    else:
+        df = pd.DataFrame(cube.reshape(-1, cube.shape[2]).astype(dtype, copy=False), columns=METRIC_COLUMNS)
+        df.insert(0, period_name, np.tile(periods, len(oils)))
+        df.insert(0, 'Huile', np.repeat(oils, len(periods)))
+        if fmt == 'parquet':
+            # Les partitions d'un export précédent (fichiers aux noms aléatoires) seraient relues avec les nouvelles
+            shutil.rmtree(os.path.join(path, 'data'), ignore_errors=True)
+            df.to_parquet(os.path.join(path, 'data'), partition_cols=['Huile'], index=False)
+        elif fmt == 'feather':
+            df.to_feather(os.path.join(path, 'catalogue.feather'))
+        else:
+            df.to_csv(os.path.join(path, 'catalogue.csv'), index=False)
+    
+    metadata = {
+        'format': fmt,
+        'dtype': np.dtype(dtype).name,
+        'layout': ['metric', 'oil', 'period'] if fmt == 'npy' else ['row', 'column'],
+        'oils': list(oils),
+        'period_name': period_name,
+        'periods': ([d.isoformat() for d in periods] if period_name == 'Date'
+                    else periods.tolist()),
+        'metrics': METRIC_COLUMNS,
+    }
+    if fmt == 'xlsx':
+        metadata['sheets'] = sheets
+    with open(os.path.join(path, 'metadata.json'), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def read_catalogue_dataset(path, metrics=None, oils=None):
+    """Lit une tranche (métriques × huiles) d'un jeu exporté, sans tout charger.
+    
+    Retourne un DataFrame indexé par (Huile, Annee), ou (Huile, Date), limité
+    aux métriques et huiles demandées (toutes par défaut).
+    """
+    with open(os.path.join(path, 'metadata.json'), encoding='utf-8') as f:
+        metadata = json.load(f)
+    metrics = list(metadata['metrics'] if metrics is None else metrics)
+    oils = list(metadata['oils'] if oils is None else oils)
+    period_name = metadata['period_name']
+    periods = metadata['periods']
+    if period_name == 'Date':
+        periods = pd.DatetimeIndex(periods)
+    fmt = metadata['format']
+    
+    if fmt == 'npy':
+        values = np.load(os.path.join(path, 'values.npy'), mmap_mode='r')
+        m_idx = [metadata['metrics'].index(metric) for metric in metrics]
+        o_idx = [metadata['oils'].index(oil) for oil in oils]
+        block = np.stack([values[m][o_idx] for m in m_idx], axis=-1)   # huiles × périodes × métriques
+        index = pd.MultiIndex.from_product([oils, periods], names=['Huile', period_name])
+        return pd.DataFrame(block.reshape(-1, len(metrics)), index=index, columns=metrics)
+    
+    if fmt == 'xlsx':
+        sheets = dict(zip(metadata['oils'], metadata['sheets']))
+        frames = pd.read_excel(os.path.join(path, 'catalogue.xlsx'), sheet_name=[sheets[oil] for oil in oils],
+                               usecols=[period_name] + metrics, engine='openpyxl')
+        index = pd.MultiIndex.from_product([oils, periods], names=['Huile', period_name])
+        return pd.DataFrame(np.concatenate([frames[sheets[oil]][metrics].to_numpy() for oil in oils]),
+                            index=index, columns=metrics)
+    
+    columns = ['Huile', period_name] + metrics
+    if fmt == 'parquet':
+        df = pd.read_parquet(os.path.join(path, 'data'), columns=columns,
+                             filters=[('Huile', 'in', oils)])
+        df['Huile'] = df['Huile'].astype(str)
+    elif fmt == 'feather':
+        df = pd.read_feather(os.path.join(path, 'catalogue.feather'), columns=columns)
+    else:
+        df = pd.read_csv(os.path.join(path, 'catalogue.csv'), usecols=columns,
+                         parse_dates=[period_name] if period_name == 'Date' else False)
+    
+    df = df[df['Huile'].isin(oils)].set_index(['Huile', period_name])
+    return df.reindex(pd.MultiIndex.from_product([oils, periods], names=['Huile', period_name]))[metrics]
+
+
+def analyze_catalogue(oils, fmt='csv', float32=False, output_dir='.', seed=None, freq=ANNUAL_FREQ,
+                      registry=None, end_year=2025):
+    """Génère et sauvegarde les données de tout le catalogue en une passe"""
+    catalogue = EssentialOilCatalogueAnalyzer(oils, seed=seed, freq=freq, registry=registry, end_year=end_year)
+    cube, catalogue_data = catalogue.generate_catalogue_data(dtype=np.float32 if float32 else np.float64)
+    
+    output_path = os.path.join(
+        output_dir, f'catalogue_pharmacopoeia_data_{catalogue.start_year}_{catalogue.end_year}')
+    with _span('export', oils=len(catalogue.oils), format=fmt):
+        export_catalogue_dataset(cube, catalogue.oils, catalogue_data.index.levels[1], output_path, fmt, float32)
+    print(f"💾 Données sauvegardées: {output_path} ({fmt}{', float32' if float32 else ''})")
+    print(f"📦 Cube: {cube.shape[0]} huiles × {cube.shape[1]} périodes × {cube.shape[2]} métriques")
+    
+    print("\n👀 Production moyenne par huile (tonnes):")
+    with _span('insights', oils=len(catalogue.oils)):
+        insights = catalogue.insights(cube)
+    print(insights.xs('Production_Mondiale', level='Metrique')['moyenne'].round(0))
+
+
+def analyze_catalogue_similarity(oils=None, output_dir='.', seed=None, freq=ANNUAL_FREQ, registry=None, k=5):
+    """Corrélations et similarités entre huiles du catalogue : CSV et cartes de chaleur"""
+    catalogue = EssentialOilCatalogueAnalyzer(oils, seed=seed, freq=freq, registry=registry)
+    cube, _ = catalogue.generate_catalogue_data()
+    os.makedirs(output_dir, exist_ok=True)
+    
+    with _span('similarity', oils=len(catalogue.oils)):
+        correlations = catalogue.metric_correlations(cube)
+        pooled = correlations.groupby(level='Metrique', sort=False).mean()
+        distances = catalogue.oil_distances(cube)
+        nearest = catalogue.nearest_oils(cube, k)
+    
+    outputs = {
+        'metric_correlations': os.path.join(output_dir, 'catalogue_metric_correlations.csv'),
+        'oil_distances': os.path.join(output_dir, 'catalogue_oil_distances.csv'),
+        'nearest_oils': os.path.join(output_dir, 'catalogue_nearest_oils.csv'),
+    }
+    correlations.to_csv(outputs['metric_correlations'])
+    distances.to_csv(outputs['oil_distances'])
+    nearest.to_csv(outputs['nearest_oils'])
+    
+    with _span('heatmaps', oils=len(catalogue.oils)):
+        outputs['correlation_heatmap'] = render_heatmap(
+            pooled, os.path.join(output_dir, 'catalogue_metric_correlations.png'),
+            'Corrélations moyennes entre métriques (toutes huiles)', cmap='RdBu_r', label='corrélation')
+        outputs['distance_heatmap'] = render_heatmap(
+            distances, os.path.join(output_dir, 'catalogue_oil_distances.png'),
+            'Distance entre les dynamiques des huiles (production, prix, usages)',
+            cmap='viridis_r', label='écart quadratique moyen relatif')
+    
+    for name, path in outputs.items():
+        print(f"💾 {name}: {path}")
+    print("\n🔗 Huile la plus proche de chacune:")
+    print(nearest.xs(1, level='Rang').round(3).to_string())
+    return outputs
+
+
+def render_dashboards(oils=None, metrics=('Production_Mondiale', 'Prix_Moyen'), output_dir='.', seed=None,
+                      freq=ANNUAL_FREQ, registry=None, sharey=False, dpi=100, tiers=None):
+    """Tableaux de bord du catalogue : un PNG de petits multiples par métrique (un fichier par palier avec `tiers`)"""
+    catalogue = EssentialOilCatalogueAnalyzer(oils, seed=seed, freq=freq, registry=registry)
+    cube, _ = catalogue.generate_catalogue_data()
+    os.makedirs(output_dir, exist_ok=True)
+    
+    outputs = {}
+    for metric in metrics:
+        if metric not in METRIC_COLUMNS:
+            raise ValueError(f"métrique inconnue: {metric}")
+        output_file = os.path.join(output_dir, f'catalogue_dashboard_{metric}.png')
+        with _span('dashboard', metric=metric, oils=len(catalogue.oils)):
+            if tiers:
+                figure = catalogue.dashboard(cube, metric, sharey=sharey, dpi=dpi)
+                output_file = save_figure_tiers(figure, os.path.splitext(output_file)[0], tiers, tight=False)
+            else:
+                catalogue.dashboard(cube, metric, output_file, sharey=sharey, dpi=dpi)
+        outputs[metric] = output_file
+        print(f"💾 Tableau de bord {metric}: "
+              f"{', '.join(output_file.values()) if tiers else output_file}")
+    return outputs
+
+
+# Rendu headless propre à chaque processus de travail, réutilisé d'une huile à l'autre
+_WORKER_RENDERER = None
+
+
+def _worker_renderer():
+    global _WORKER_RENDERER
+    if _WORKER_RENDERER is None:
+        _WORKER_RENDERER = PharmacopoeiaFigureRenderer()
+    return _WORKER_RENDERER
+
+
+def _analyze_oil_task(oil, seed, output_dir, cache_dir, render, freq=ANNUAL_FREQ, registry_file=None,
+                      profile=False, profile_memory=False, forecast_horizon=0, forecast_method='holt', tiers=None):
+    """Analyse complète d'une huile dans un processus de travail (génération, export, rendu, insights)"""
+    timings = {}
+    outputs = {}
+    if profile:
+        start_profiling(profile_memory)
+    started = time.perf_counter()
+    try:
+        cache = PharmacopoeiaCache(cache_dir) if cache_dir else None
+        registry = load_oil_registry(registry_file) if registry_file else None
+        analyzer = EssentialOilPharmacopoeiaAnalyzer(oil, seed=seed, cache=cache, freq=freq, registry=registry)
+        report_file = os.path.join(output_dir, f'{oil}_pharmacopoeia_report.txt')
+        
+        # Les messages et insights de l'huile vont dans son rapport, pas sur la console partagée
+        with open(report_file, 'w', encoding='utf-8') as report, contextlib.redirect_stdout(report):
+            t = time.perf_counter()
+            df = analyzer.generate_pharmacopoeia_data()
+            timings['generation'] = time.perf_counter() - t
+            
+            t = time.perf_counter()
+            outputs['data'] = os.path.join(
+                output_dir, f'{oil}_pharmacopoeia_data_{analyzer.start_year}_{analyzer.end_year}.csv')
+            with _span('export', oil):
+                df.to_csv(outputs['data'], index=False)
+            timings['export'] = time.perf_counter() - t
+            
+            forecast = None
+            if forecast_horizon:
+                t = time.perf_counter()
+                forecast = analyzer.forecast(df, forecast_horizon, forecast_method)
+                outputs['forecast'] = os.path.join(output_dir, f'{oil}_pharmacopoeia_forecast.csv')
+                forecast.to_csv(outputs['forecast'], index=False)
+                timings['forecast'] = time.perf_counter() - t
+            
+            t = time.perf_counter()
+            if render:
+                figure = analyzer.create_pharmacopoeia_analysis(
+                    df, output_file=os.path.join(output_dir, f'{oil}_pharmacopoeia_analysis.png'), show=False,
+                    renderer=_worker_renderer(), forecast=forecast, tiers=tiers)
+                if tiers:
+                    outputs.update((f'figure_{tier}', path) for tier, path in figure.items())
+                else:
+                    outputs['figure'] = figure
+            else:
+                with _span('insights', oil):
+                    analyzer._generate_pharmacopoeia_insights(_annual_view(df))
+            timings['rendering'] = time.perf_counter() - t
+        outputs['report'] = report_file
+        status, error = 'ok', None
+    except Exception:
+        status, error = 'error', traceback.format_exc()
+    
+    timings['total'] = time.perf_counter() - started
+    record = {'oil': oil, 'status': status, 'error': error,
+              'outputs': outputs, 'timings': timings, 'pid': os.getpid()}
+    if profile:
+        record['spans'] = stop_profiling().events
+    return record
+
+
+def run_catalogue_batch(oils=None, workers=None, seed=None, output_dir='.', cache_dir=None, render=True,
+                        freq=ANNUAL_FREQ, registry_file=None, profiler=None, forecast_horizon=0,
+                        forecast_method='holt', tiers=None):
+    """Analyse tout le catalogue en parallèle sur un pool de processus.
+    
+    Chaque huile est générée, exportée, rendue et résumée dans un processus
+    de travail ; la progression est affichée au fil de l'eau et un manifeste
+    JSON des sorties, durées et échecs est écrit dans `output_dir`.
+    `registry_file` remplace le registre d'huiles livré (chargé une fois par
+    processus) ; ses huiles forment alors le catalogue par défaut. Avec un
+    `profiler`, chaque processus profile ses huiles et les spans y sont
+    rassemblés (une piste par processus dans la trace Chrome). Avec
+    `forecast_horizon`, chaque huile est aussi prévue sur autant d'années
+    (CSV et graphiques). Avec `tiers`, chaque graphique est écrit à ces
+    paliers de sortie (voir save_figure_tiers).
+    """
+    if oils is None:
+        oils = load_oil_registry(registry_file).names if registry_file else HUILES_ESSENTIELLES
+    oils = list(oils)
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+    
+    print(f"🚀 Analyse du catalogue: {len(oils)} huiles sur {workers} processus...")
+    started = time.perf_counter()
+    records = []
+    
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_analyze_oil_task, oil, seed, output_dir, cache_dir, render, freq,
+                                   registry_file, profiler is not None,
+                                   profiler is not None and profiler.memory,
+                                   forecast_horizon, forecast_method, tiers): oil
+                   for oil in oils}
+        for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            oil = futures[future]
+            try:
+                record = future.result()
+            except Exception:
+                # Le processus de travail lui-même a échoué (pool cassé, mémoire...)
+                record = {'oil': oil, 'status': 'error', 'error': traceback.format_exc(),
+                          'outputs': {}, 'timings': {}, 'pid': None}
+            if profiler is not None:
+                profiler.events.extend(record.pop('spans', []))
+            records.append(record)
+            
+            if record['status'] == 'ok':
+                print(f"[{done}/{len(oils)}] ✅ {oil} ({record['timings']['total']:.1f} s)")
+            else:
+                print(f"[{done}/{len(oils)}] ❌ {oil}: {record['error'].strip().splitlines()[-1]}")
+    
+    # Manifeste dans l'ordre du catalogue
+    records.sort(key=lambda record: oils.index(record['oil']))
+    manifest = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'workers': workers,
+        'seed': seed,
+        'freq': freq,
+        'oils': len(oils),
+        'succeeded': sum(record['status'] == 'ok' for record in records),
+        'failed': [record['oil'] for record in records if record['status'] != 'ok'],
+        'wall_time': time.perf_counter() - started,
+        'results': records,
+    }
+    manifest_file = os.path.join(output_dir, 'batch_manifest.json')
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    
+    print(f"\n📋 Manifeste: {manifest_file}")
+    print(f"✅ {manifest['succeeded']}/{len(oils)} huiles analysées en {manifest['wall_time']:.1f} s")
+    if manifest['failed']:
+        print(f"❌ Échecs: {', '.join(manifest['failed'])}")
+    return manifest
+
+
+def _read_oil_data(path):
+    """Relit le CSV d'une huile écrit par to_csv, valeurs identiques bit à bit"""
+    df = pd.read_csv(path, float_precision='round_trip')
+    if 'Date' in df:
+        df['Date'] = pd.to_datetime(df['Date'])
+    return df
+
+
+def run_data_only(oils=None, seed=None, output_dir='.', cache_dir=None, freq=ANNUAL_FREQ, registry=None,
+                  forecast_horizon=0, forecast_method='holt', end_year=2025, append=False):
+    """Génère les données et les insights de chaque huile sans importer matplotlib.
+    
+    Point d'entrée des tâches planifiées : seules pandas et numpy sont
+    chargées. Avec `forecast_horizon`, la prévision de chaque huile est
+    écrite à côté de ses données. Chaque huile laisse son point de reprise
+    dans <huile>_pharmacopoeia_checkpoint.json ; avec `append`, une huile
+    qui en a un n'est générée que de ce point jusqu'à `end_year`, et les
+    nouvelles lignes sont ajoutées à la fin de son CSV (renommé selon la
+    nouvelle période) sans réécrire l'historique. Retourne la liste des
+    fichiers CSV écrits.
+    """
+    if oils is None:
+        oils = HUILES_ESSENTIELLES if registry is None else registry.names
+    oils = list(oils)
+    os.makedirs(output_dir, exist_ok=True)
+    cache = PharmacopoeiaCache(cache_dir) if cache_dir else None
+    
+    outputs = []
+    for oil in oils:
+        analyzer = EssentialOilPharmacopoeiaAnalyzer(oil, seed=seed, cache=cache, freq=freq, registry=registry,
+                                                     end_year=end_year)
+        output_file = os.path.join(
+            output_dir, f'{oil}_pharmacopoeia_data_{analyzer.start_year}_{analyzer.end_year}.csv')
+        checkpoint_file = os.path.join(output_dir, f'{oil}_pharmacopoeia_checkpoint.json')
+        
+        if append and os.path.exists(checkpoint_file):
+            with open(checkpoint_file, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            previous_file = os.path.join(output_dir, checkpoint.pop('data'))
+            new_rows = analyzer.generate_pharmacopoeia_data(checkpoint)
+            with _span('export', oil, periods=len(new_rows)):
+                if previous_file != output_file:
+                    os.replace(previous_file, output_file)
+                new_rows.to_csv(output_file, mode='a', header=False, index=False)
+            print(f"💾 {len(new_rows)} périodes ajoutées: {output_file}")
+            df = pd.concat([_read_oil_data(output_file).iloc[:checkpoint['periods']], new_rows],
+                           ignore_index=True)
+        else:
+            df = analyzer.generate_pharmacopoeia_data()
+            df.to_csv(output_file, index=False)
+            print(f"💾 Données sauvegardées: {output_file}")
+        
+        tmp_file = f'{checkpoint_file}.{os.getpid()}.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(dict(analyzer.checkpoint, data=os.path.basename(output_file)), f, ensure_ascii=False)
+        os.replace(tmp_file, checkpoint_file)
+        
+        analyzer._generate_pharmacopoeia_insights(_annual_view(df))
+        outputs.append(output_file)
+        
+        if forecast_horizon:
+            forecast_file = os.path.join(output_dir, f'{oil}_pharmacopoeia_forecast.csv')
+            analyzer.forecast(df, forecast_horizon, forecast_method).to_csv(forecast_file, index=False)
+            print(f"🔮 Prévisions sauvegardées: {forecast_file}")
+            outputs.append(forecast_file)
+    return outputs
+
+
+def forecast_catalogue(oils=None, horizon=10, method='holt', workers=None, output_dir='.', seed=None,
+                       freq=ANNUAL_FREQ, registry=None, cache_dir=None):
+    """Prévision de toutes les (huile, métrique) du catalogue, écrite dans un seul CSV"""
+    catalogue = EssentialOilCatalogueAnalyzer(oils, seed=seed, freq=freq, registry=registry)
+    cube, _ = catalogue.generate_catalogue_data()
+    cache = PharmacopoeiaCache(cache_dir) if cache_dir else None
+    
+    started = time.perf_counter()
+    forecast = catalogue.forecast(cube, horizon, method, workers=workers or os.cpu_count() or 1, cache=cache)
+    print(f"🔮 {len(catalogue.oils) * len(METRIC_COLUMNS)} séries prévues sur {horizon} ans ({method}) "
+          f"en {time.perf_counter() - started:.2f} s")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, 'catalogue_forecast.csv')
+    forecast.to_csv(output_file)
+    print(f"💾 Prévisions sauvegardées: {output_file}")
+    
+    last = forecast.xs(forecast.index.levels[1][-1], level='Annee')
+    print(f"\n📈 Production et prix prévus en {forecast.index.levels[1][-1]}:")
+    print(last[['Production_Mondiale', 'Production_Mondiale_bas', 'Production_Mondiale_haut',
+                'Prix_Moyen', 'Prix_Moyen_bas', 'Prix_Moyen_haut']].round(1).to_string())
+    return output_file
+
+
+def run_scenarios(spec_file, oils=None, output_dir='.', seed=None, freq=ANNUAL_FREQ, registry=None, end_year=2025):
+    """Balayage de scénarios décrit par un fichier JSON {"huiles": [...], "grille": {...}, "scenarios": [...]}.
+    
+    Enregistre les résultats (ScenarioResults.save) dans `output_dir`/scenarios
+    et leurs statistiques de synthèse dans scenario_insights.csv.
+    """
+    with open(spec_file, encoding='utf-8') as f:
+        spec = json.load(f)
+    sweep = ScenarioSweep(oils or spec.get('huiles'), spec.get('grille'), spec.get('scenarios'),
+                          seed=seed, freq=freq, registry=registry, end_year=end_year)
+    started = time.perf_counter()
+    results = sweep.run()
+    print(f"✅ {len(sweep.scenarios)} scénarios simulés en {time.perf_counter() - started:.2f} s")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    results_dir = results.save(os.path.join(output_dir, 'scenarios'))
+    insights = results.insights()
+    insights_file = os.path.join(output_dir, 'scenario_insights.csv')
+    sweep.scenarios.join(insights.reset_index('Metrique'), how='inner').to_csv(insights_file)
+    print(f"💾 Résultats: {results_dir} / statistiques: {insights_file}")
+    
+    final = insights['dernier'].unstack('Metrique')[['Production_Mondiale', 'Prix_Moyen', 'Valeur_Marche']]
+    print(f"\n📊 Valeurs {sweep.end_year} par scénario:")
+    print(sweep.scenarios.join(final).round(2).head(40).to_string())
+    return results
+
+
+def run_sensitivity(method='sobol', oils=None, samples=None, output_dir='.', seed=None, registry=None,
+                    outputs=SENSITIVITY_OUTPUTS, end_year=2025):
+    """Indices de sensibilité Sobol ou Morris de chaque huile, écrits dans sensitivity_<méthode>.csv"""
+    analysis = SensitivityAnalysis(oils, outputs, seed=seed, registry=registry, end_year=end_year)
+    started = time.perf_counter()
+    if method == 'sobol':
+        indices, key = analysis.sobol(samples or 8192), 'ST'
+    else:
+        indices, key = analysis.morris(samples or 1024), 'mu_star'
+    print(f"✅ {analysis.evaluations} évaluations du modèle en {time.perf_counter() - started:.2f} s")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    output_file = os.path.join(output_dir, f'sensitivity_{method}.csv')
+    indices.to_csv(output_file)
+    print(f"💾 Indices sauvegardés: {output_file}")
+    
+    # Classement moyen sur toutes les huiles
+    pooled = indices[key].groupby(level=['Sortie', 'Parametre'], sort=False).mean()
+    for output in analysis.outputs:
+        print(f"\n🎯 {output} - entrées les plus influentes ({key} moyen):")
+        print(pooled.loc[output].sort_values(ascending=False).head(5).round(3).to_string())
+    return indices
+
+
+def run_calibration(paths, oils=None, registry_file=None, output_file=None, output_dir='.', workers=None,
+                    max_regimes=None):
+    """Calibre le registre sur des fichiers observés et l'écrit (sur place par défaut).
+    
+    Le rapport d'ajustement (régimes, ruptures, bases, bruits, R²) est écrit
+    dans calibration_report.csv.
+    """
+    registry_file = registry_file or OIL_REGISTRY_FILE
+    observations = load_observations(paths)
+    if oils:
+        observations = observations.loc[observations.index.get_level_values(0).isin(oils)]
+    started = time.perf_counter()
+    calibrated, report = calibrate_registry(observations, load_oil_registry(registry_file),
+                                            workers or os.cpu_count() or 1, max_regimes=max_regimes)
+    print(f"✅ {len(report)} séries calibrées en {time.perf_counter() - started:.2f} s")
+    
+    output_file = output_file or registry_file
+    calibrated.save(output_file)
+    print(f"💾 Registre calibré: {output_file}")
+    os.makedirs(output_dir, exist_ok=True)
+    report_file = os.path.join(output_dir, 'calibration_report.csv')
+    report.to_csv(report_file)
+    print(f"💾 Rapport de calibration: {report_file}")
+    
+    print("\n📐 Ajustement moyen par métrique:")
+    print(report.groupby(level='Metrique', sort=False)[['Regimes', 'Sigma', 'R2']].mean().round(3).to_string())
+    return calibrated, report
+
+
+def _finish_profiling(prefix):
+    """Arrête le profilage éventuel, affiche son résumé et exporte les spans"""
+    profiler = stop_profiling()
+    if profiler is None:
+        return
+    profiler.report()
+    spans_file = profiler.to_json(f'{prefix}.json')
+    trace_file = profiler.to_chrome_trace(f'{prefix}.trace.json')
+    print(f"⏱️  Spans: {spans_file} / trace Chrome: {trace_file}")
+
+
+def main(argv=None):
     """Fonction principale pour la pharmacopée des huiles essentielles"""
-    # Liste des huiles essentielles
-    huiles_essentielles = [
-        "Lavande", "Menthe Poivrée", "Arbre à Thé", "Eucalyptus", "Ravintsara",
-        "Palmarosa", "Ylang-Ylang", "Girofle", "Citron", "Romarin",
-        "Tea Tree", "Géranium", "Camomille", "Sauge", "Niaouli",
-        "Basilic", "Cèdre", "Encens", "Myrrhe", "Vetiver"
-    ]
+    parser = argparse.ArgumentParser(description="Analyse pharmacopée des huiles essentielles")
+    parser.add_argument('--batch', action='store_true',
+                        help="analyse non interactive du catalogue sur un pool de processus")
+    parser.add_argument('--oils', nargs='+', help="huiles à analyser (défaut: tout le catalogue)")
+    parser.add_argument('--workers', type=int, help="nombre de processus (défaut: nombre de CPU)")
+    parser.add_argument('--seed', type=int, help="graine pour des données reproductibles")
+    parser.add_argument('--output-dir', default='.', help="répertoire des fichiers produits")
+    parser.add_argument('--cache-dir', help="répertoire du cache des données (avec --seed)")
+    parser.add_argument('--no-render', action='store_true', help="ne pas générer les graphiques")
+    parser.add_argument('--data-only', action='store_true',
+                        help="données et insights seulement, sans charger matplotlib (démarrage rapide)")
+    parser.add_argument('--export', choices=EXPORT_FORMATS,
+                        help="exporter tout le catalogue en un seul jeu de données dans ce format")
+    parser.add_argument('--float32', action='store_true', help="exporter en simple précision")
+    parser.add_argument('--end-year', type=int, default=2025, metavar='ANNEE',
+                        help="avec --data-only, --export, --scenarios ou --sensitivity, "
+                             "dernière année simulée (défaut: 2025)")
+    parser.add_argument('--append', action='store_true',
+                        help="avec --data-only, prolonger chaque huile depuis son point de reprise "
+                             "jusqu'à --end-year, sans régénérer l'historique")
+    parser.add_argument('--similarity', action='store_true',
+                        help="corrélations et similarités entre huiles (CSV et cartes de chaleur)")
+    parser.add_argument('--dashboard', nargs='*', metavar='METRIQUE',
+                        help="petits multiples de ces métriques pour toutes les huiles, un PNG par métrique "
+                             "(défaut: Production_Mondiale et Prix_Moyen)")
+    parser.add_argument('--shared-scale', action='store_true',
+                        help="avec --dashboard, même échelle pour toutes les huiles")
+    parser.add_argument('--tiers', nargs='+', choices=list(OUTPUT_TIERS) + list(VECTOR_FORMATS),
+                        metavar='PALIER',
+                        help="paliers de sortie des graphiques : thumbnail, screen, print (PNG, un seul rendu "
+                             "réduit et encodé en parallèle) et svg, pdf (défaut: un PNG à 300 dpi)")
+    parser.add_argument('--forecast', type=int, default=0, metavar='ANS',
+                        help="prévoir chaque métrique sur ANS années (seul : tout le catalogue ; "
+                             "avec --batch ou --data-only : par huile, CSV et graphiques)")
+    parser.add_argument('--forecast-method', choices=FORECAST_METHODS, default='holt',
+                        help="holt (lissage amorti, défaut) ou ridge (tendance régularisée)")
+    parser.add_argument('--scenarios', metavar='FICHIER',
+                        help="balayage de scénarios décrit en JSON (huiles, grille, scenarios)")
+    parser.add_argument('--sensitivity', choices=('sobol', 'morris'),
+                        help="analyse de sensibilité globale de Valeur_Marche, Surface_Cultivee et Exportations")
+    parser.add_argument('--samples', type=int,
+                        help="points de base de l'analyse de sensibilité (défaut: 8192 sobol, 1024 morris)")
+    parser.add_argument('--calibrate', nargs='+', metavar='FICHIER',
+                        help="calibrer régimes, ruptures, bases et bruits sur des séries observées (CSV/XLSX) "
+                             "et les écrire dans le registre")
+    parser.add_argument('--calibrated-registry', metavar='FICHIER',
+                        help="registre calibré à écrire (défaut: le registre d'entrée, mis à jour sur place)")
+    parser.add_argument('--max-regimes', type=int,
+                        help="nombre maximal de régimes calibrés par métrique (défaut: celui de METRIC_SPECS)")
+    parser.add_argument('--freq', default=ANNUAL_FREQ, choices=FREQUENCIES,
+                        help="fréquence de la grille de dates: Y (défaut), Q, M, W ou D")
+    parser.add_argument('--registry', help="registre JSON d'huiles (défaut: oil_registry.json)")
+    parser.add_argument('--profile', metavar='PREFIXE',
+                        help="profiler les étapes (--batch, --export, --data-only) : "
+                             "PREFIXE.json et PREFIXE.trace.json (Chrome trace)")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="avec --profile, mesurer aussi les allocations (tracemalloc)")
+    args = parser.parse_args(argv)
+    registry = load_oil_registry(args.registry) if args.registry else None
+    profiler = start_profiling(args.profile_memory) if args.profile else None
+    
+    if args.export:
+        analyze_catalogue(args.oils, args.export, args.float32,
+                          args.output_dir, args.seed, args.freq, registry, args.end_year)
+        _finish_profiling(args.profile)
+        return 0
+    
+    if args.similarity:
+        analyze_catalogue_similarity(args.oils, args.output_dir, args.seed, args.freq, registry)
+        _finish_profiling(args.profile)
+        return 0
+    
+    if args.dashboard is not None:
+        render_dashboards(args.oils, args.dashboard or ('Production_Mondiale', 'Prix_Moyen'), args.output_dir,
+                          args.seed, args.freq, registry, args.shared_scale, tiers=args.tiers)
+        _finish_profiling(args.profile)
+        return 0
+    
+    if args.sensitivity:
+        run_sensitivity(args.sensitivity, args.oils, args.samples, args.output_dir, args.seed, registry,
+                        end_year=args.end_year)
+        _finish_profiling(args.profile)
+        return 0
+    
+    if args.calibrate:
+        run_calibration(args.calibrate, args.oils, args.registry, args.calibrated_registry, args.output_dir,
+                        args.workers, args.max_regimes)
+        _finish_profiling(args.profile)
+        return 0
+    
+    if args.scenarios:
+        run_scenarios(args.scenarios, args.oils, args.output_dir, args.seed, args.freq, registry, args.end_year)
+        _finish_profiling(args.profile)
+        return 0
+    
+    if args.data_only:
+        run_data_only(args.oils, args.seed, args.output_dir, args.cache_dir, args.freq, registry,
+                      args.forecast, args.forecast_method, args.end_year, args.append)
+        _finish_profiling(args.profile)
+        return 0
+    
+    if args.batch:
+        manifest = run_catalogue_batch(args.oils, args.workers, args.seed, args.output_dir,
+                                       args.cache_dir, render=not args.no_render, freq=args.freq,
+                                       registry_file=args.registry, profiler=profiler,
+                                       forecast_horizon=args.forecast, forecast_method=args.forecast_method,
+                                       tiers=args.tiers)
+        _finish_profiling(args.profile)
+        return 1 if manifest['failed'] else 0
+    
+    if args.forecast:
+        forecast_catalogue(args.oils, args.forecast, args.forecast_method, args.workers, args.output_dir,
+                           args.seed, args.freq, registry, args.cache_dir)
+        _finish_profiling(args.profile)
+        return 0
+    
+    huiles_essentielles = HUILES_ESSENTIELLES
     
     print("🌿 ANALYSE PHARMACOPÉE DES HUILES ESSENTIELLES (2000-2025)")
     print("=" * 60)
@@ -832,8 +3812,13 @@ def main():
     for i, huile in enumerate(huiles_essentielles, 1):
         print(f"{i}. {huile}")
     
+    print("0. Toutes les huiles (catalogue complet)")
+    
     try:
         choix = int(input("\nChoisissez le numéro de l'huile essentielle à analyser: "))
+        if choix == 0:
+            analyze_catalogue(huiles_essentielles)
+            return
         if choix < 1 or choix > len(huiles_essentielles):
             raise ValueError
         huile_selectionnee = huiles_essentielles[choix-1]
@@ -858,11 +3843,11 @@ def main():
     
     # Créer l'analyse
     print("\n📈 Création de l'analyse pharmacopée...")
-    analyzer.create_pharmacopoeia_analysis(pharmacopoeia_data)
+    analyzer.create_pharmacopoeia_analysis(pharmacopoeia_data, tiers=args.tiers)
     
     print(f"\n✅ Analyse pharmacopée de l'huile de {huile_selectionnee} terminée!")
     print(f"📊 Période: {analyzer.start_year}-{analyzer.end_year}")
     print("📦 Données: Production, qualité, applications, recherche, durabilité")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
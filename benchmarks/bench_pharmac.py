@@ -0,0 +1,335 @@
+"""Benchmarks de performance de Pharmac.py (génération, tendances, ensembles,
+insights, rendu, export), hors ligne.
+
+Chaque cas mesure le temps mural (meilleur de plusieurs exécutions) et le pic
+mémoire (tracemalloc, exécution séparée), puis le compare à la référence
+enregistrée dans baseline.json. Les tailles vont d'une huile × 26 années à des
+milliers d'huiles, au pas journalier et avec des milliers de réplicats ; les
+cas d'une même étape forment une courbe de passage à l'échelle.
+
+    python3 benchmarks/bench_pharmac.py                      # échelle small
+    python3 benchmarks/bench_pharmac.py --scale large --only catalogue
+    python3 benchmarks/bench_pharmac.py --save-baseline      # nouvelle référence
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import Pharmac  # noqa: E402
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# Tailles par échelle ; chaque échelle inclut les cas des précédentes
+SCALES = {
+    'small': {'oils': [1, 20], 'freqs': ['Y'], 'replicates': [1000], 'render_dpi': 100},
+    'medium': {'oils': [1, 20, 200], 'freqs': ['Y', 'M'], 'replicates': [1000, 10000], 'render_dpi': 300},
+    'large': {'oils': [1, 20, 200, 2000], 'freqs': ['Y', 'M', 'D'], 'replicates': [1000, 10000],
+              'render_dpi': 300},
+}
+
+# Budget mémoire des ensembles Monte-Carlo (memory_budget_mb), rapporté à côté du pic mesuré
+ENSEMBLE_BUDGET_MB = 256
+
+# Durée minimale cumulée par cas pour le temps mural (les cas rapides sont répétés)
+MIN_MEASURE_TIME = 0.5
+MAX_REPEATS = 20
+
+
+def _registry(n_oils):
+    """Registre synthétique de n_oils huiles, reprenant en boucle les configurations livrées"""
+    names = Pharmac.HUILES_ESSENTIELLES
+    configs = {f'{names[i % len(names)]} #{i}': Pharmac.get_oil_config(names[i % len(names)])
+               for i in range(n_oils)}
+    return Pharmac.OilRegistry(configs, Pharmac.get_oil_config('default'))
+
+
+def _catalogue(n_oils, freq='Y'):
+    return Pharmac.EssentialOilCatalogueAnalyzer(registry=_registry(n_oils), freq=freq)
+
+
+def _cube_dtype(n_oils, freq):
+    # Le cube journalier de milliers d'huiles est produit en simple précision
+    return np.float32 if freq == 'D' and n_oils > 200 else np.float64
+
+
+def _cells(n_oils, freq, replicates=1):
+    return n_oils * len(Pharmac._date_grid(2000, 2025, freq)) * len(Pharmac.METRIC_COLUMNS) * replicates
+
+
+def benchmark_cases(scale, workdir):
+    """Cas de l'échelle demandée : (nom, étape, cellules, préparation -> fonction mesurée, budget en Mo ou None)"""
+    sizes = SCALES[scale]
+    cases = []
+
+    for freq in sizes['freqs']:
+        def setup(freq=freq):
+            analyzer = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande', freq=freq)
+            return analyzer.generate_pharmacopoeia_data
+        cases.append((f'generation[1x{freq}]', 'generation', _cells(1, freq), setup, None))
+
+    for freq in sizes['freqs']:
+        def setup(freq=freq):
+            analyzer = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande', seed=0, freq=freq)
+            analyzer.generate_pharmacopoeia_data()
+            checkpoint = analyzer.checkpoint
+            extension = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande', seed=0, freq=freq, end_year=2026)
+            return lambda: extension.generate_pharmacopoeia_data(checkpoint)
+        cases.append((f'generation[append-1x{freq}]', 'generation',
+                      len(Pharmac._date_grid(2026, 2026, freq)) * len(Pharmac.METRIC_COLUMNS), setup, None))
+
+    for n_oils in sizes['oils']:
+        def setup(n_oils=n_oils):
+            catalogue = _catalogue(n_oils)
+            cube = catalogue.generate_catalogue_data()[0]
+            t = Pharmac._time_coordinate(catalogue.dates)
+            return lambda: Pharmac._apply_trends(cube, t)
+        cases.append((f'trends[{n_oils}xY]', 'trends', _cells(n_oils, 'Y'), setup, None))
+
+    for freq in sizes['freqs']:
+        for n_oils in sizes['oils']:
+            def setup(n_oils=n_oils, freq=freq):
+                catalogue = _catalogue(n_oils, freq)
+                return lambda: catalogue.generate_catalogue_data(dtype=_cube_dtype(n_oils, freq))
+            cases.append((f'catalogue[{n_oils}x{freq}]', 'catalogue', _cells(n_oils, freq), setup, None))
+
+    # Ensembles : 1 et 20 huiles à l'année, une huile aux pas infra-annuels (le journalier
+    # avec le plus petit nombre de réplicats seulement, son état occupant déjà ~200 Mo)
+    ensembles = [(n_oils, 'Y', n_replicates) for n_replicates in sizes['replicates'] for n_oils in (1, 20)]
+    ensembles += [(1, freq, n_replicates) for freq in sizes['freqs'][1:]
+                  for n_replicates in (sizes['replicates'][:1] if freq == 'D' else sizes['replicates'])]
+    for n_oils, freq, n_replicates in ensembles:
+        def setup(n_oils=n_oils, freq=freq, n_replicates=n_replicates):
+            catalogue = _catalogue(n_oils, freq)
+            return lambda: catalogue.generate_catalogue_ensemble(n_replicates, memory_budget_mb=ENSEMBLE_BUDGET_MB)
+        cases.append((f'ensemble[{n_oils}x{freq}x{n_replicates}]', 'ensemble',
+                      _cells(n_oils, freq, n_replicates), setup, ENSEMBLE_BUDGET_MB))
+
+    for n_oils in sizes['oils']:
+        def setup(n_oils=n_oils):
+            catalogue = _catalogue(n_oils)
+            cube = catalogue.generate_catalogue_data()[0]
+            return lambda: catalogue.insights(cube)
+        cases.append((f'insights[{n_oils}xY]', 'insights', _cells(n_oils, 'Y'), setup, None))
+
+    for n_oils in sizes['oils'][1:]:
+        def setup(n_oils=n_oils):
+            catalogue = _catalogue(n_oils)
+            cube = catalogue.generate_catalogue_data()[0]
+            return lambda: (catalogue.metric_correlations(cube), catalogue.nearest_oils(cube))
+        cases.append((f'similarity[{n_oils}xY]', 'similarity', _cells(n_oils, 'Y'), setup, None))
+
+    for n_oils in sizes['oils']:
+        for method in Pharmac.FORECAST_METHODS:
+            def setup(n_oils=n_oils, method=method):
+                catalogue = _catalogue(n_oils)
+                cube = catalogue.generate_catalogue_data()[0]
+                return lambda: catalogue.forecast(cube, 10, method)
+            cases.append((f'forecast[{n_oils}xY-{method}]', 'forecast', _cells(n_oils, 'Y'), setup, None))
+
+    for n_scenarios in (100, 10000):
+        def setup(n_scenarios=n_scenarios):
+            sweep = Pharmac.ScenarioSweep(['Lavande'], {'price_base': np.linspace(0.5, 1.5, n_scenarios // 4),
+                                                        'ruptures': [-2, -1, 0, 1]})
+            return sweep.run
+        cases.append((f'scenarios[{n_scenarios}xY]', 'scenarios', _cells(n_scenarios, 'Y'), setup, None))
+
+    for n_samples in (1024, 8192):
+        def setup(n_samples=n_samples):
+            analysis = Pharmac.SensitivityAnalysis(['Lavande'], seed=0)
+            analysis._unit_samples(2, 2)    # import paresseux de scipy hors mesure
+            return lambda: analysis.sobol(n_samples)
+        cases.append((f'sensitivity[sobol-{n_samples}]', 'sensitivity',
+                      n_samples * (len(Pharmac.sensitivity_parameters()) + 2) * 3 * 26, setup, None))
+
+    for n_oils in sizes['oils'][1:]:
+        def setup(n_oils=n_oils):
+            catalogue = _catalogue(n_oils)
+            _, df = catalogue.generate_catalogue_data()
+            return lambda: Pharmac.calibrate_registry(df, catalogue.registry)
+        cases.append((f'calibration[{n_oils}xY]', 'calibration', _cells(n_oils, 'Y'), setup, None))
+
+    for n_oils in sizes['oils'][1:]:
+        def setup(n_oils=n_oils):
+            catalogue = _catalogue(n_oils)
+            cube, _ = catalogue.generate_catalogue_data()
+            output_file = os.path.join(workdir, 'dashboard.png')
+            return lambda: catalogue.dashboard(cube, 'Production_Mondiale', output_file)
+        cases.append((f'render[dashboard-{n_oils}xY]', 'rendering', _cells(n_oils, 'Y'), setup, None))
+
+    def setup_build():
+        analyzer = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande')
+        df = analyzer.generate_pharmacopoeia_data()
+        output_file = os.path.join(workdir, 'render.png')
+
+        def run():
+            renderer = Pharmac.PharmacopoeiaFigureRenderer(dpi=sizes['render_dpi'])
+            renderer.render(analyzer, df, output_file)
+            renderer.close()
+        return run
+    cases.append((f"render[build-{sizes['render_dpi']}dpi]", 'rendering', _cells(1, 'Y'), setup_build, None))
+
+    # Passage à l'échelle du rendu avec la résolution des données (moyennes annuelles tracées), à 100 dpi
+    for freq in sizes['freqs']:
+        def setup(freq=freq):
+            analyzer = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande', freq=freq)
+            df = analyzer.generate_pharmacopoeia_data()
+            output_file = os.path.join(workdir, 'render.png')
+            renderer = Pharmac.PharmacopoeiaFigureRenderer(dpi=100)
+            renderer.render(analyzer, df, output_file)
+            return lambda: renderer.render(analyzer, df, output_file)
+        cases.append((f'render[update-1x{freq}]', 'rendering', _cells(1, freq), setup, None))
+
+    def setup_update():
+        analyzer = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande')
+        df = analyzer.generate_pharmacopoeia_data()
+        output_file = os.path.join(workdir, 'render.png')
+        renderer = Pharmac.PharmacopoeiaFigureRenderer(dpi=sizes['render_dpi'])
+        renderer.render(analyzer, df, output_file)
+        return lambda: renderer.render(analyzer, df, output_file)
+    cases.append((f"render[update-{sizes['render_dpi']}dpi]", 'rendering', _cells(1, 'Y'), setup_update, None))
+
+    def setup_tiers():
+        analyzer = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande')
+        df = analyzer.generate_pharmacopoeia_data()
+        output_file = os.path.join(workdir, 'render.png')
+        renderer = Pharmac.PharmacopoeiaFigureRenderer()
+        renderer.render(analyzer, df, output_file)
+        return lambda: renderer.render(analyzer, df, output_file, tiers=('thumbnail', 'screen', 'print'))
+    cases.append(('render[update-tiers]', 'rendering', _cells(1, 'Y'), setup_tiers, None))
+
+    def setup_csv():
+        df = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande').generate_pharmacopoeia_data()
+        output_file = os.path.join(workdir, 'oil.csv')
+        return lambda: df.to_csv(output_file, index=False)
+    cases.append(('export[1xY-csv]', 'export', _cells(1, 'Y'), setup_csv, None))
+
+    for n_oils in sizes['oils'][1:]:
+        for fmt in ('csv', 'npy', 'xlsx'):
+            def setup(n_oils=n_oils, fmt=fmt):
+                catalogue = _catalogue(n_oils)
+                cube, df = catalogue.generate_catalogue_data()
+                path = os.path.join(workdir, f'export_{fmt}')
+                return lambda: Pharmac.export_catalogue_dataset(cube, catalogue.oils, df.index.levels[1],
+                                                                path, fmt)
+            cases.append((f'export[{n_oils}xY-{fmt}]', 'export', _cells(n_oils, 'Y'), setup, None))
+    return cases
+
+
+def measure(setup):
+    """Temps mural (meilleur de plusieurs exécutions) et pic mémoire d'un cas"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        np.random.seed(0)
+        run = setup()
+
+        timings = []
+        while len(timings) < MAX_REPEATS and sum(timings) < MIN_MEASURE_TIME:
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+
+        # Exécution séparée pour le pic mémoire, tracemalloc ralentissant les allocations
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {'wall_time': min(timings), 'repeats': len(timings), 'peak_mb': peak / 2**20}
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def run_benchmarks(scale='small', only=None, baseline_file=BASELINE_FILE, tolerance=1.3):
+    """Exécute les cas et les compare à la référence ; retourne (résultats, régressions)"""
+    baseline = load_baseline(baseline_file)
+    workdir = tempfile.mkdtemp(prefix='bench_pharmac_')
+    results, regressions = {}, []
+
+    print(f"⏱️  Benchmarks Pharmac.py (échelle {scale})")
+    print(f"{'cas':<28}{'temps':>12}{'ns/cellule':>12}{'pic Mo':>10}{'budget Mo':>11}{'référence':>12}{'ratio':>8}")
+    try:
+        for name, stage, cells, setup, budget in benchmark_cases(scale, workdir):
+            if only and only not in name:
+                continue
+            result = measure(setup)
+            result.update(stage=stage, cells=cells)
+            if budget is not None:
+                result['budget_mb'] = budget
+            results[name] = result
+
+            reference = baseline.get(name)
+            reference_text, ratio_text, flag = '-', '-', ''
+            if reference:
+                ratio = result['wall_time'] / reference['wall_time']
+                reference_text = f"{reference['wall_time'] * 1e3:.1f}ms"
+                ratio_text = f"{ratio:.2f}"
+                if ratio > tolerance:
+                    regressions.append(name)
+                    flag = ' ⚠️'
+            # Un pic au-delà du budget annoncé est une régression, quelle que soit la référence
+            if budget is not None and result['peak_mb'] > budget:
+                regressions.append(f'{name} (mémoire)')
+                flag = ' ⚠️'
+            budget_text = '-' if budget is None else f'{budget:.0f}'
+            print(f"{name:<28}{result['wall_time'] * 1e3:>10.1f}ms{result['wall_time'] / cells * 1e9:>12.1f}"
+                  f"{result['peak_mb']:>10.1f}{budget_text:>11}{reference_text:>12}{ratio_text:>8}{flag}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if regressions:
+        print(f"\n⚠️  Régressions (> {tolerance:.2f}× la référence): {', '.join(regressions)}")
+    return results, regressions
+
+
+def save_baseline(results, path):
+    """Fusionne les résultats dans le fichier de référence"""
+    baseline = load_baseline(path)
+    baseline.update({name: {key: result[key] for key in ('stage', 'cells', 'wall_time', 'peak_mb', 'budget_mb')
+                            if key in result}
+                     for name, result in results.items()})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'machine': platform.platform(), 'python': platform.python_version(),
+                   'numpy': np.__version__, 'results': dict(sorted(baseline.items()))},
+                  f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    print(f"💾 Référence enregistrée: {path} ({len(results)} cas)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de performance de Pharmac.py")
+    parser.add_argument('--scale', choices=SCALES, default='small', help="taille des cas (défaut: small)")
+    parser.add_argument('--only', help="ne lancer que les cas dont le nom contient ce texte")
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="fichier de référence JSON")
+    parser.add_argument('--save-baseline', action='store_true', help="enregistrer les résultats comme référence")
+    parser.add_argument('--tolerance', type=float, default=1.3,
+                        help="ratio temps / référence au-delà duquel un cas est une régression")
+    parser.add_argument('--output', help="écrire les résultats détaillés dans ce fichier JSON")
+    parser.add_argument('--fail-on-regression', action='store_true', help="code de sortie 1 en cas de régression")
+    args = parser.parse_args(argv)
+
+    results, regressions = run_benchmarks(args.scale, args.only, args.baseline, args.tolerance)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
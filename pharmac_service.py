@@ -0,0 +1,305 @@
+"""Service HTTP local (asyncio) des données, insights et graphiques de la pharmacopée.
+
+Les calculs (génération, insights, rendu PNG) sont déportés sur un pool de
+processus ; les requêtes identiques simultanées sont regroupées sur un seul
+calcul et les réponses sont gardées dans un cache mémoire borné (LRU), qui
+sert les requêtes répétées en quelques millisecondes.
+
+    python3 pharmac_service.py --port 8765 --workers 2
+
+Points d'accès (GET) :
+    /oils                                 huiles du registre (JSON)
+    /oils/<huile>/data?format=csv|json    données simulées
+    /oils/<huile>/insights                statistiques de synthèse (JSON)
+    /oils/<huile>/analysis.png?dpi=100    graphique d'analyse
+    /stats                                état du cache et des calculs
+
+Paramètres communs : seed (défaut : graine du service) et freq (Y, Q, M, W ou D).
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+import urllib.parse
+
+import Pharmac
+
+# Types de contenu des réponses
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json; charset=utf-8',
+    'png': 'image/png',
+}
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                500: 'Internal Server Error'}
+
+# Rendu headless de chaque processus de travail, partagé par toutes les résolutions
+_RENDERER = None
+
+
+def _analyzer(oil, seed, freq, registry_file):
+    registry = Pharmac.load_oil_registry(registry_file) if registry_file else None
+    return Pharmac.EssentialOilPharmacopoeiaAnalyzer(oil, seed=seed, freq=freq, registry=registry)
+
+
+def _data_task(oil, seed, freq, registry_file, fmt):
+    """Données d'une huile encodées en CSV ou JSON (processus de travail)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = _analyzer(oil, seed, freq, registry_file).generate_pharmacopoeia_data()
+    if fmt == 'json':
+        return df.to_json(orient='records', date_format='iso', force_ascii=False).encode('utf-8')
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def _insights_task(oil, seed, freq, registry_file):
+    """Statistiques de synthèse et configuration d'une huile en JSON (processus de travail)"""
+    analyzer = _analyzer(oil, seed, freq, registry_file)
+    with contextlib.redirect_stdout(io.StringIO()):
+        insights = analyzer.insights(analyzer.generate_pharmacopoeia_data())
+    payload = {'oil': oil, 'seed': seed, 'freq': freq, 'config': analyzer.config,
+               'statistics': insights.to_dict(orient='index')}
+    return json.dumps(payload, ensure_ascii=False).encode('utf-8')
+
+
+def _render_task(oil, seed, freq, registry_file, dpi):
+    """Graphique d'analyse en PNG, avec le rendu réutilisé du processus (processus de travail)"""
+    global _RENDERER
+    if _RENDERER is None:
+        _RENDERER = Pharmac.PharmacopoeiaFigureRenderer()
+    analyzer = _analyzer(oil, seed, freq, registry_file)
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = Pharmac._annual_view(analyzer.generate_pharmacopoeia_data())
+    buffer = io.BytesIO()
+    _RENDERER.render(analyzer, df, buffer, dpi=dpi)
+    return buffer.getvalue()
+
+
+class HTTPError(Exception):
+    """Erreur renvoyée au client avec son code HTTP"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ResponseCache:
+    """Cache mémoire LRU des réponses, borné en octets"""
+
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        if key in self.entries:
+            self.bytes -= len(self.entries.pop(key))
+        self.entries[key] = body
+        self.bytes += len(body)
+        while self.bytes > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'entries': len(self.entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+class PharmacopoeiaService:
+    """Service HTTP asyncio au-dessus de EssentialOilPharmacopoeiaAnalyzer"""
+
+    def __init__(self, workers=None, seed=0, cache_bytes=256 * 2**20, registry_file=None):
+        # Le registre est rechargé (une fois) par chaque processus de travail depuis son fichier
+        self.registry_file = registry_file
+        self.registry = Pharmac.load_oil_registry(registry_file) if registry_file else Pharmac.OIL_REGISTRY
+        self.seed = seed
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        self.cache = ResponseCache(cache_bytes)
+        self.inflight = {}
+        self.coalesced = 0
+        self.computed = 0
+
+    async def fetch(self, key, task, *args):
+        """Réponse en cache, calcul en cours partagé, ou nouveau calcul sur le pool.
+
+        Retourne (corps, origine) avec origine 'hit', 'coalesced' ou 'miss'.
+        """
+        body = self.cache.get(key)
+        if body is not None:
+            return body, 'hit'
+
+        future = self.inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future), 'coalesced'
+
+        # Le calcul se termine et remplit le cache même si le client qui l'a lancé se déconnecte
+        future = asyncio.get_running_loop().run_in_executor(self.pool, task, *args)
+        self.inflight[key] = future
+        future.add_done_callback(lambda done: self._completed(key, done))
+        return await asyncio.shield(future), 'miss'
+
+    def _completed(self, key, future):
+        del self.inflight[key]
+        if not future.cancelled() and future.exception() is None:
+            self.computed += 1
+            self.cache.put(key, future.result())
+
+    def _params(self, query):
+        try:
+            seed = int(query.get('seed', [self.seed])[0])
+        except ValueError:
+            raise HTTPError(400, "seed doit être un entier")
+        freq = query.get('freq', [Pharmac.ANNUAL_FREQ])[0]
+        if freq not in Pharmac.FREQUENCIES:
+            raise HTTPError(400, f"fréquence inconnue: {freq} (fréquences: {', '.join(Pharmac.FREQUENCIES)})")
+        return seed, freq
+
+    async def route(self, path, query):
+        """Aiguille une requête GET ; retourne (type de contenu, corps, origine)"""
+        parts = [urllib.parse.unquote(part) for part in path.strip('/').split('/')]
+        if parts == ['oils']:
+            return 'json', json.dumps(self.registry.names, ensure_ascii=False).encode('utf-8'), 'hit'
+        if parts == ['stats']:
+            stats = dict(self.cache.stats(), inflight=len(self.inflight),
+                         coalesced=self.coalesced, computed=self.computed)
+            return 'json', json.dumps(stats).encode('utf-8'), 'hit'
+        if len(parts) != 3 or parts[0] != 'oils':
+            raise HTTPError(404, f"chemin inconnu: {path}")
+
+        oil, resource = parts[1], parts[2]
+        if oil not in self.registry:
+            raise HTTPError(404, f"huile inconnue: {oil}")
+        seed, freq = self._params(query)
+
+        if resource == 'data':
+            fmt = query.get('format', ['csv'])[0]
+            if fmt not in ('csv', 'json'):
+                raise HTTPError(400, f"format inconnu: {fmt}")
+            body, origin = await self.fetch(('data', oil, seed, freq, fmt), _data_task,
+                                            oil, seed, freq, self.registry_file, fmt)
+            return fmt, body, origin
+        if resource == 'insights':
+            body, origin = await self.fetch(('insights', oil, seed, freq), _insights_task,
+                                            oil, seed, freq, self.registry_file)
+            return 'json', body, origin
+        if resource == 'analysis.png':
+            try:
+                dpi = int(query.get('dpi', ['100'])[0])
+            except ValueError:
+                raise HTTPError(400, "dpi doit être un entier")
+            if not 10 <= dpi <= 300:
+                raise HTTPError(400, "dpi doit être compris entre 10 et 300")
+            body, origin = await self.fetch(('png', oil, seed, freq, dpi), _render_task,
+                                            oil, seed, freq, self.registry_file, dpi)
+            return 'png', body, origin
+        raise HTTPError(404, f"ressource inconnue: {resource}")
+
+    async def handle(self, reader, writer):
+        """Traite les requêtes HTTP/1.1 d'une connexion (keep-alive)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                started = time.perf_counter()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+                url = urllib.parse.urlsplit(target)
+                try:
+                    if method != 'GET':
+                        raise HTTPError(405, f"méthode non supportée: {method}")
+                    kind, body, origin = await self.route(url.path, urllib.parse.parse_qs(url.query))
+                    status = 200
+                except HTTPError as error:
+                    kind, status, origin = 'json', error.status, '-'
+                    body = json.dumps({'error': str(error)}, ensure_ascii=False).encode('utf-8')
+                except Exception:
+                    kind, status, origin = 'json', 500, '-'
+                    body = json.dumps({'error': traceback.format_exc().strip().splitlines()[-1]},
+                                      ensure_ascii=False).encode('utf-8')
+
+                keep_alive = (version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close')
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: {CONTENT_TYPES[kind]}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    f"X-Cache: {origin}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + body)
+                await writer.drain()
+                print(f"{method} {target} {status} {origin} {(time.perf_counter() - started) * 1000:.1f} ms")
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8765):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"🌐 Service pharmacopée sur http://{host}:{port} "
+              f"({self.workers} processus, graine par défaut {self.seed})")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Service HTTP local de la pharmacopée des huiles essentielles")
+    parser.add_argument('--host', default='127.0.0.1', help="adresse d'écoute (défaut: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=8765, help="port d'écoute (défaut: 8765)")
+    parser.add_argument('--workers', type=int, help="processus de calcul (défaut: nombre de CPU)")
+    parser.add_argument('--seed', type=int, default=0, help="graine par défaut des requêtes (défaut: 0)")
+    parser.add_argument('--cache-mb', type=int, default=256, help="taille du cache mémoire (défaut: 256 Mo)")
+    parser.add_argument('--registry', help="registre JSON d'huiles (défaut: oil_registry.json)")
+    args = parser.parse_args(argv)
+
+    service = PharmacopoeiaService(args.workers, args.seed, args.cache_mb * 2**20, args.registry)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+"""Tests de non-régression de Pharmac.py"""
+import contextlib
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import Pharmac  # noqa: E402
+
+
+def _quiet(function, *args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+# Table des régimes (formules d'origine, métrique par métrique)
+
+def _piecewise(year, i, pieces):
+    """Formule d'origine par paliers : (dernière année, ordonnée, pente, décalage de l'indice)"""
+    for last, intercept, slope, offset in pieces:
+        if last is None or year <= last:
+            return intercept + slope * (i - offset)
+
+
+def _since(year, start, base, slope):
+    return base * (1 + slope * (year - start)) if year >= start else base
+
+
+# Partie déterministe des _simulate_<métrique> d'origine (i = indice de l'année depuis 2000)
+ORIGINAL_FORMULAS = {
+    'Production_Mondiale': (0.10, lambda c, y, i: c['production_base'] * _piecewise(
+        y, i, [(2005, 1, 0.08, 0), (2015, 1, 0.12, 5), (2020, 1, 0.15, 15), (None, 1, 0.10, 20)])),
+    'Prix_Moyen': (0.08, lambda c, y, i: c['price_base'] * _piecewise(
+        y, i, [(2005, 1, 0.03, 0), (2012, 1, 0.05, 5), (2018, 1, 0.08, 12), (None, 1, 0.06, 18)])),
+    'Demande_Mondiale': (0.12, lambda c, y, i: c['production_base'] * 0.9 * _piecewise(
+        y, i, [(2010, 1, 0.10, 0), (2020, 1, 0.14, 10), (None, 1, 0.12, 20)])),
+    'Surface_Cultivee': (0.15, lambda c, y, i: c['production_base'] / c['rendement'] * 10 * (1 + 0.09 * i)),
+    'Teneur_Principes_Actifs': (0.04, lambda c, y, i: _since(y, 2010, 85, 0.005)),
+    'Pureté_Chimique': (0.03, lambda c, y, i: _since(y, 2008, 92, 0.008)),
+    'Qualite_Bio': (0.06, lambda c, y, i: _since(y, 2015, 60, 0.025)),
+    'Efficacite_Therapeutique': (0.05, lambda c, y, i: _since(y, 2010, 75, 0.012)),
+    'Etudes_Scientifiques': (0.20, lambda c, y, i: _piecewise(
+        y, i, [(2005, 5, 2, 0), (2015, 15, 5, 5), (None, 65, 8, 15)])),
+    'Demande_Therapeutique': (0.07, lambda c, y, i: _since(y, 2012, 60, 0.018)),
+    'Usage_Aromatherapie': (0.06, lambda c, y, i: _since(y, 2008, 70, 0.015)),
+    'Usage_Cosmetique': (0.08, lambda c, y, i: _since(y, 2010, 65, 0.020)),
+    'Usage_Pharmaceutique': (0.10, lambda c, y, i: _since(y, 2015, 40, 0.025)),
+    'Usage_Alimentaire': (0.12, lambda c, y, i: _since(y, 2018, 30, 0.030)),
+    'Valeur_Marche': (0.13, lambda c, y, i: c['production_base'] * c['price_base'] / 1000 * (1 + 0.11 * i)),
+    'Croissance_Marche': (0.15, lambda c, y, i: _piecewise(
+        y, i, [(2005, 8.0, 0, 0), (2015, 12.0, 0, 0), (2020, 15.0, 0, 0), (None, 11.0, 0, 0)])),
+    'Exportations': (0.14, lambda c, y, i: c['production_base'] * 0.7 * (1 + 0.10 * i)),
+    'Impact_Environnemental': (0.08, lambda c, y, i: _since(y, 2010, 45, -0.010)),
+    'Durabilite_Production': (0.07, lambda c, y, i: _since(y, 2012, 65, 0.015)),
+    'Rareté_Ressource': (0.10, lambda c, y, i: _since(y, 2015, 30, 0.008)),
+}
+
+
+@pytest.mark.parametrize('oil', ['Lavande', 'Ravintsara', 'Citron'])
+def test_regime_table_reproduces_original_formulas(oil):
+    assert list(ORIGINAL_FORMULAS) == Pharmac.METRIC_COLUMNS
+    config = Pharmac.get_oil_config(oil)
+    years = np.arange(2000, 2026)
+    curves = Pharmac._deterministic_curves(Pharmac._config_params([config]), years.astype(float))[0]
+    for m, (column, (sigma, formula)) in enumerate(ORIGINAL_FORMULAS.items()):
+        expected = [formula(config, year, year - 2000) for year in years]
+        np.testing.assert_allclose(curves[m], expected, rtol=1e-12, err_msg=column)
+        assert Pharmac.METRIC_TABLE['sigmas'][m] == sigma, column
+
+    # Sans graine, le bruit est tiré de np.random métrique par métrique, comme à l'origine
+    analyzer = Pharmac.EssentialOilPharmacopoeiaAnalyzer(oil)
+    np.random.seed(11)
+    values = analyzer._simulate_all(Pharmac._date_grid(2000, 2025))[0]
+    np.random.seed(11)
+    for m, (sigma, _) in enumerate(ORIGINAL_FORMULAS.values()):
+        np.testing.assert_allclose(values[m], curves[m] * np.random.normal(1, sigma, len(years)), rtol=1e-12)
+
+
+# Flux de bruit reproductibles
+
+@pytest.mark.parametrize('chunk_oils, split', [(1, 4), (3, 7), (64, 1)])
+def test_seeded_streams_do_not_depend_on_chunking(chunk_oils, split):
+    oils = ['Lavande', 'Citron', 'Ravintsara', 'Arbre à Thé']
+    catalogue = Pharmac.EssentialOilCatalogueAnalyzer(oils, seed=9, freq='M')
+    cube, _ = _quiet(catalogue.generate_catalogue_data, chunk_oils=chunk_oils)
+
+    # Réplicats de part et d'autre d'une frontière de bloc, en une fois ou en deux tranches
+    first = Pharmac.REPLICATE_BLOCK - 4
+    whole = catalogue.simulate_replicates(first, 10)
+    parts = np.concatenate([catalogue.simulate_replicates(first, split),
+                            catalogue.simulate_replicates(first + split, 10 - split)])
+    np.testing.assert_array_equal(whole, parts)
+    np.testing.assert_array_equal(catalogue.simulate_replicates(0, 1)[0], cube)
+
+    for o, oil in enumerate(oils):
+        single = _quiet(Pharmac.EssentialOilPharmacopoeiaAnalyzer(oil, seed=9, freq='M').generate_pharmacopoeia_data)
+        np.testing.assert_array_equal(single[Pharmac.METRIC_COLUMNS].to_numpy(), cube[o])
+
+
+# Cache disque
+
+def test_cache_hits_misses_and_lru_eviction(tmp_path):
+    cache = Pharmac.PharmacopoeiaCache(str(tmp_path), max_bytes=2**30)
+
+    def generate(seed=4, **config):
+        analyzer = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande', seed=seed, cache=cache, freq='M')
+        analyzer.config = dict(analyzer.config, **config)
+        return _quiet(analyzer.generate_pharmacopoeia_data)
+
+    first = generate()
+    assert (cache.hits, cache.misses, cache.stores) == (0, 1, 1)
+    assert generate().equals(first)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Une autre graine ou une autre configuration est un nouveau jeu de données
+    generate(seed=5)
+    changed = generate(production_base=200)
+    assert (cache.hits, cache.misses, cache.stores) == (1, 3, 3)
+    assert not changed.equals(first)
+
+    # Plafond à trois entrées : la moins récemment utilisée part la première
+    config = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande').config
+    paths = {name: tmp_path / f"{cache.key('Lavande', entry_config, 2000, 2025, 'M', seed)}.npy"
+             for name, entry_config, seed in [('seed4', config, 4), ('seed5', config, 5),
+                                              ('config', dict(config, production_base=200), 4),
+                                              ('seed6', config, 6)]}
+    for age, name in enumerate(['seed4', 'seed5', 'config']):
+        os.utime(paths[name], (1000 + age, 1000 + age))
+    cache.max_bytes = 3 * os.path.getsize(paths['seed4'])
+    assert generate().equals(first)            # relue : devient la plus récente
+    generate(seed=6)
+    assert cache.evictions == 1
+    assert sorted(os.listdir(tmp_path)) == sorted(paths[name].name for name in ('seed4', 'config', 'seed6'))
+
+
+# Mode ajout (points de reprise)
+
+def _csv_bytes(directory, oil, end_year):
+    with open(os.path.join(directory, f'{oil}_pharmacopoeia_data_2000_{end_year}.csv'), 'rb') as f:
+        return f.read()
+
+
+def test_append_rerun_with_same_end_year(tmp_path):
+    appended, full = str(tmp_path / 'ajout'), str(tmp_path / 'complet')
+    _quiet(Pharmac.run_data_only, ['Lavande'], seed=3, output_dir=appended, freq='M')
+    _quiet(Pharmac.run_data_only, ['Lavande'], seed=3, output_dir=appended, freq='M', end_year=2026, append=True)
+    first = _csv_bytes(appended, 'Lavande', 2026)
+
+    # Une seconde extension jusqu'à la même année n'ajoute rien et ne touche pas au fichier
+    _quiet(Pharmac.run_data_only, ['Lavande'], seed=3, output_dir=appended, freq='M', end_year=2026, append=True)
+    assert _csv_bytes(appended, 'Lavande', 2026) == first
+
+    _quiet(Pharmac.run_data_only, ['Lavande'], seed=3, output_dir=full, freq='M', end_year=2026)
+    assert first == _csv_bytes(full, 'Lavande', 2026)
+
+
+def test_append_without_new_periods_returns_empty_frame():
+    analyzer = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Citron', seed=1, freq='M')
+    history = _quiet(analyzer.generate_pharmacopoeia_data)
+    checkpoint = analyzer.checkpoint
+
+    rerun = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Citron', seed=1, freq='M')
+    new_rows = _quiet(rerun.generate_pharmacopoeia_data, checkpoint)
+    assert new_rows.empty
+    assert list(new_rows.columns) == list(history.columns)
+    assert rerun.checkpoint == checkpoint
+
+
+
+def test_catalogue_sweep_and_sensitivity_follow_end_year():
+    analyzer = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande', seed=2, end_year=2027)
+    single = _quiet(analyzer.generate_pharmacopoeia_data)
+    catalogue = Pharmac.EssentialOilCatalogueAnalyzer(['Lavande', 'Citron'], seed=2, end_year=2027)
+    _, data = _quiet(catalogue.generate_catalogue_data)
+    np.testing.assert_array_equal(data.loc['Lavande'].to_numpy(), single.drop(columns='Annee').to_numpy())
+
+    sweep = Pharmac.ScenarioSweep(['Lavande'], seed=2, end_year=2027)
+    assert sweep.dates.year[-1] == 2027
+    assert _quiet(sweep.run).cube.shape[1] == len(single)
+    assert len(Pharmac.SensitivityAnalysis(['Lavande'], end_year=2027).t) == len(single)
+
+
+# Ensembles Monte-Carlo
+
+def test_ensemble_bands_match_exact_percentiles_with_tiny_chunks():
+    catalogue = Pharmac.EssentialOilCatalogueAnalyzer(['Lavande'], seed=5)
+    t = Pharmac._time_coordinate(catalogue.dates)
+    replicates = catalogue.simulate_replicates(0, 4000)[:, 0]
+
+    # Budget à peine au-dessus de l'état : lots de quelques réplicats seulement
+    stats = Pharmac._simulate_ensemble(catalogue.oils, catalogue.params, t, 4000, memory_budget_mb=0.62, seed=5)
+    for name, q in Pharmac.ENSEMBLE_PERCENTILES.items():
+        exact = np.percentile(replicates, q, axis=0)
+        assert np.abs(stats[name][0] / exact - 1).max() < 0.01, name
+    np.testing.assert_allclose(stats['mean'][0], replicates.mean(axis=0), rtol=1e-12)
+
+
+def test_ensemble_state_counts_against_memory_budget():
+    analyzer = Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande', seed=1, freq='D')
+    with pytest.raises(ValueError, match='memory_budget_mb'):
+        _quiet(analyzer.generate_ensemble, 100, memory_budget_mb=64)
+
+
+# Scénarios
+
+def test_moved_breakpoints_keep_growth_before_first_breakpoint():
+    i = Pharmac.METRIC_COLUMNS.index('Production_Mondiale')
+    first = min(Pharmac._breakpoints({}, 'Production_Mondiale'))
+    sweep = Pharmac.ScenarioSweep(['Lavande'], {'ruptures': [0, 2]}, scenarios=[
+        {}, {'ruptures:Production_Mondiale': {first: first + 3}}])
+    results = _quiet(sweep.run, noise=False)
+    before = sweep.dates.year <= first
+    for scenario in results.cube[1:]:
+        np.testing.assert_array_equal(scenario[before], results.cube[0][before])
+    assert results.cube[0, 0, i] == 150
+
+    # Le régime suivant démarre plus tard, avec sa forme inchangée
+    moved = results.query({'ruptures:Production_Mondiale:2005': 3})
+    np.testing.assert_allclose(results.cube[moved[0], 9:12, i], results.cube[0, 6:9, i])
+
+
+def test_moved_breakpoints_must_stay_ordered():
+    sweep = Pharmac.ScenarioSweep(['Lavande'], scenarios=[{'ruptures:Production_Mondiale': [2016, 2015, 2020]}])
+    with pytest.raises(ValueError, match='non croissantes'):
+        _quiet(sweep.run, noise=False)
+
+
+# Calibration
+
+def test_calibration_reproduces_positive_series():
+    catalogue = Pharmac.EssentialOilCatalogueAnalyzer(seed=42)
+    _, observations = _quiet(catalogue.generate_catalogue_data)
+    registry, report = _quiet(Pharmac.calibrate_registry, observations, catalogue.registry)
+
+    t = Pharmac._time_coordinate(catalogue.dates)
+    assert (Pharmac._deterministic_curves(registry.params(catalogue.oils), t) > 0).all()
+    regimes = registry.config('Lavande')['calibration']['Etudes_Scientifiques']['regimes']
+    assert regimes[0][1] > 0 and all(slope >= 0 for _, _, slope, _ in regimes)
+
+
+def test_calibration_recovers_noise_free_regimes():
+    t = np.arange(2000, 2026, dtype=float)
+    truth = np.where(t <= 2010, 5 + 2 * (t - 2000), 20 + 4 * (t - 2010))
+    fit = Pharmac._fit_regimes(t, truth[None], 3)
+    assert fit['regimes'][0] == 2 and fit['ends'][0, 0] == 2010
+    np.testing.assert_allclose(fit['intercepts'][0, :2], [5, 20], atol=1e-9)
+    np.testing.assert_allclose(fit['slopes'][0, :2], [2, 4], atol=1e-9)
+
+
+# Grilles de dates
+
+@pytest.mark.parametrize('freq', Pharmac.FREQUENCIES)
+def test_supported_frequencies_start_periods_within_their_year(freq):
+    t = Pharmac._time_coordinate(Pharmac._date_grid(2000, 2001, freq))
+    assert (np.diff(t) > 0).all() and t[0] == 2000 and np.floor(t[-1]) == 2001
+
+
+@pytest.mark.parametrize('freq', ['SM', 'min', 'h', 'YS'])
+def test_unsupported_frequency_is_rejected(freq):
+    with pytest.raises(ValueError, match='fréquence non prise en charge'):
+        Pharmac.EssentialOilPharmacopoeiaAnalyzer('Lavande', freq=freq).generate_pharmacopoeia_data()
+
+
+
+# Profilage
+
+def test_profiler_only_stops_tracing_it_started():
+    import tracemalloc
+
+    profiler = Pharmac.PharmacopoeiaProfiler(memory=True)
+    assert tracemalloc.is_tracing()
+    profiler.close()
+    assert not tracemalloc.is_tracing()
+
+    tracemalloc.start()
+    try:
+        profiler = Pharmac.PharmacopoeiaProfiler(memory=True)
+        with profiler.span('allocation'):
+            block = np.ones(2**17)
+        profiler.close()
+        assert tracemalloc.is_tracing()
+        assert profiler.events[0]['alloc_net'] >= block.nbytes
+    finally:
+        tracemalloc.stop()
+
+
+# Service HTTP
+
+@pytest.mark.parametrize('freq', ['min', 's', 'SM', 'YE'])
+def test_service_rejects_unsupported_frequencies(freq):
+    import pharmac_service
+
+    service = pharmac_service.PharmacopoeiaService(workers=1)
+    try:
+        with pytest.raises(pharmac_service.HTTPError) as error:
+            service._params({'freq': [freq]})
+        assert error.value.status == 400
+        assert service._params({'freq': ['D'], 'seed': ['7']}) == (7, 'D')
+    finally:
+        service.close()
+
+
+
+def test_service_coalesces_identical_requests():
+    import asyncio
+    import concurrent.futures
+    import threading
+    import pharmac_service
+
+    service = pharmac_service.PharmacopoeiaService(workers=1)
+    service.pool.shutdown()
+    service.pool = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    release = threading.Event()
+    calls = []
+
+    def task(value):
+        calls.append(value)
+        release.wait(5)
+        return value.encode()
+
+    async def scenario():
+        first = asyncio.ensure_future(service.fetch('key', task, 'body'))
+        second = asyncio.ensure_future(service.fetch('key', task, 'body'))
+        await asyncio.sleep(0.05)
+        assert len(service.inflight) == 1
+        release.set()
+        results = await asyncio.gather(first, second)
+        return results, await service.fetch('key', task, 'body')
+
+    try:
+        results, repeated = asyncio.run(scenario())
+    finally:
+        service.close()
+    assert results == [(b'body', 'miss'), (b'body', 'coalesced')]
+    assert repeated == (b'body', 'hit')
+    assert calls == ['body'] and service.computed == 1 and service.coalesced == 1
+    assert not service.inflight
+
+
+def test_response_cache_evicts_least_recently_used():
+    import pharmac_service
+
+    cache = pharmac_service.ResponseCache(max_bytes=30)
+    for key in 'abc':
+        cache.put(key, key.encode() * 10)
+    assert cache.get('a') == b'a' * 10          # relue : devient la plus récente
+    cache.put('d', b'd' * 10)
+    assert list(cache.entries) == ['c', 'a', 'd']
+    assert cache.get('b') is None
+    cache.put('big', b'x' * 31)                 # plus grande que le cache : jamais stockée
+    assert cache.stats() == {'entries': 3, 'bytes': 30, 'max_bytes': 30, 'hits': 1, 'misses': 1,
+                             'evictions': 1, 'hit_rate': 0.5}
+
+
+def test_service_renderer_is_shared_across_resolutions():
+    import pharmac_service
+    from PIL import Image
+
+    widths = []
+    for dpi in (10, 20):
+        png = pharmac_service._render_task('Lavande', 4, Pharmac.ANNUAL_FREQ, None, dpi)
+        widths.append(Image.open(io.BytesIO(png)).size[0])
+    assert pharmac_service._RENDERER.renders == 2
+    assert 1.8 < widths[1] / widths[0] < 2.2
+
+
+# Export du catalogue
+
+@pytest.mark.parametrize('fmt', Pharmac.EXPORT_FORMATS)
+@pytest.mark.parametrize('freq', ['Y', 'M'])
+def test_export_round_trip_survives_re_export(tmp_path, fmt, freq):
+    catalogue = Pharmac.EssentialOilCatalogueAnalyzer(['Lavande', 'Citron'], seed=2, freq=freq)
+    cube, df = _quiet(catalogue.generate_catalogue_data)
+    path = str(tmp_path / fmt)
+    for _ in range(2):
+        Pharmac.export_catalogue_dataset(cube, catalogue.oils, df.index.levels[1], path, fmt)
+
+    metrics = ['Prix_Moyen', 'Exportations']
+    read = Pharmac.read_catalogue_dataset(path, metrics, ['Citron'])
+    expected = df.loc[['Citron'], metrics]
+    np.testing.assert_allclose(read.to_numpy(), expected.to_numpy(), rtol=1e-12)
+    assert list(read.index) == list(expected.index)
+
+
+def test_float32_workbook_writes_shortest_float32_values(tmp_path):
+    from openpyxl import load_workbook
+
+    cube = np.full((1, 2, len(Pharmac.METRIC_COLUMNS)), 0.1)
+    cube[0, 1] = 1 / 3
+    path = str(tmp_path / 'catalogue.xlsx')
+    Pharmac.export_catalogue_workbook(cube, ['Lavande'], [2000, 2001], path, float32=True)
+    rows = list(load_workbook(path, read_only=True)['Lavande'].iter_rows(min_row=2, values_only=True))
+    assert rows == [(2000,) + (0.1,) * cube.shape[2], (2001,) + (0.33333334,) * cube.shape[2]]
+    assert np.float32(rows[1][1]) == np.float32(1 / 3)        # la valeur float32 est conservée